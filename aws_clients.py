@@ -0,0 +1,89 @@
+# aws_clients.py
+
+# Import the 'threading' module to guard the shared client cache
+import threading
+
+# Import the 'boto3' library for creating AWS sessions and clients
+import boto3
+
+# Import the botocore 'Config' class to size each client's connection pool
+from botocore.config import Config
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    AWS_REGION,                # The AWS region where services are deployed
+    MEDIACONVERT_ENDPOINT,     # The endpoint URL for AWS MediaConvert service
+    AWS_MAX_POOL_CONNECTIONS   # The connection pool size of each shared client
+)
+
+# The process-wide boto3 session, created on first use
+_session = None
+
+# The shared clients, keyed by service name
+_clients = {}
+
+# Guards '_session' and '_clients' so worker threads never build duplicate clients
+_lock = threading.Lock()
+
+def get_session():
+    """
+    Return the process-wide boto3 session.
+
+    Creating a session resolves credentials and loads service models, so all
+    pipeline stages running in the same process share a single one.
+
+    Returns:
+        boto3.session.Session: The shared session.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session(region_name=AWS_REGION)
+        return _session
+
+def get_client(service_name, **kwargs):
+    """
+    Return a shared boto3 client for a service, creating it on first use.
+
+    Clients are thread-safe and keep their HTTP connections alive, so reusing
+    them avoids repeated TLS handshakes across stages and worker threads.
+
+    Args:
+        service_name (str): The AWS service name, e.g. 's3'.
+        **kwargs: Extra arguments passed to 'session.client' the first time the client is created.
+
+    Returns:
+        The boto3 client for the service.
+    """
+    session = get_session()
+    with _lock:
+        if service_name not in _clients:
+            _clients[service_name] = session.client(
+                service_name,
+                config=Config(max_pool_connections=AWS_MAX_POOL_CONNECTIONS),
+                **kwargs
+            )
+        return _clients[service_name]
+
+def set_client(service_name, client):
+    """
+    Replace the shared client for a service, e.g. with a local stand-in.
+
+    Args:
+        service_name (str): The AWS service name, e.g. 's3'.
+        client: The object to return from 'get_client' for this service.
+    """
+    with _lock:
+        _clients[service_name] = client
+
+def get_s3_client():
+    """
+    Return the shared S3 client.
+    """
+    return get_client("s3")
+
+def get_mediaconvert_client():
+    """
+    Return the shared MediaConvert client, bound to the account's MediaConvert endpoint.
+    """
+    return get_client("mediaconvert", endpoint_url=MEDIACONVERT_ENDPOINT)
@@ -0,0 +1,632 @@
+# benchmark.py
+
+# Import the 'argparse' module to read the benchmark options from the command line
+import argparse
+
+# Import the 'base64' module to combine part checksums the way S3 does
+import base64
+
+# Import the 'contextlib' module to send the pipeline's progress messages to stderr
+import contextlib
+
+# Import the 'hashlib' module to generate deterministic clip contents
+import hashlib
+
+# Import the 'importlib' module to load the pipeline after the environment is configured
+import importlib
+
+# Import the 'itertools' module to number fake MediaConvert jobs
+import itertools
+
+# Import the 'json' module to serve the fake API and print the results
+import json
+
+# Import the 'os' module to configure the pipeline through environment variables
+import os
+
+# Import the 'random' module to inject failures
+import random
+
+# Import the 'struct' module to build the MP4 header of the fake clips
+import struct
+
+# Import the 'sys' module to reload the pipeline modules between runs
+import sys
+
+# Import the 'threading' module to run the fake HTTP server in the background
+import threading
+
+# Import the 'time' module to inject latency and measure wall time
+import time
+
+# Import the 'tracemalloc' module to measure peak Python memory
+import tracemalloc
+
+# Import 'types' to expose boto3-style exception classes on the fake clients
+import types
+
+# Import the HTTP server used for the fake highlights API and video origin
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Import 'urlparse' and 'parse_qs' to read the fake API's query parameters
+from urllib.parse import urlparse, parse_qs
+
+# Import 'datetime' to give fake MediaConvert jobs realistic timing fields
+from datetime import datetime, timezone
+
+# Import the error raised by boto3 when an S3 request fails, so the fake behaves the same way
+from botocore.exceptions import ClientError
+
+# Objects larger than this are not kept in memory by the fake S3, so they do not distort peak memory
+FAKE_S3_MAX_STORED_BYTES = 1024 * 1024
+
+# The bytes kept from the start and the end of larger objects, so range reads of their MP4 index still work
+FAKE_S3_KEPT_BYTES = 64 * 1024
+
+# The properties announced by the MP4 header of every fake clip
+FAKE_CLIP_WIDTH = 1920
+FAKE_CLIP_HEIGHT = 1080
+FAKE_CLIP_SECONDS = 30
+
+###################################
+# Fake highlights API and video origin
+###################################
+
+class FakeOrigin:
+    """
+    Settings shared by the fake API/video request handler.
+    """
+
+    def __init__(self, clips, clip_bytes, latency, failure_rate):
+        self.clips = clips
+        self.clip_bytes = clip_bytes
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.base_url = None
+
+    def clip_chunk(self, clip_id, start, end):
+        """
+        Return bytes [start, end) of a clip; the content is derived from the clip id.
+
+        Every clip starts with a minimal MP4 header (see 'mp4_header'), so the
+        pipeline can probe it; the rest is the payload of its 'mdat' box.
+        """
+        header = mp4_header(self.clip_bytes)
+        block = hashlib.sha256(str(clip_id).encode("utf-8")).digest() * 2048
+        out = bytearray(header[start:end])
+        position = max(start, len(header))
+        while position < end:
+            offset = position % len(block)
+            piece = block[offset:offset + (end - position)]
+            out.extend(piece)
+            position += len(piece)
+        return bytes(out)
+
+def _box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+def mp4_header(total, width=FAKE_CLIP_WIDTH, height=FAKE_CLIP_HEIGHT, seconds=FAKE_CLIP_SECONDS):
+    """
+    Build the 'ftyp' and 'moov' boxes and the 'mdat' box header of a 'total'-byte clip.
+
+    The 'moov' box only holds what 'media_probe.probe_clip' reads: the duration
+    in 'mvhd', and one video track with its size in 'tkhd' and its handler in 'hdlr'.
+    """
+    mvhd = struct.pack(">B3xIIII", 0, 0, 0, 1000, seconds * 1000) + bytes(76)
+    tkhd = struct.pack(">B3x", 0) + bytes(72) + struct.pack(">II", width << 16, height << 16)
+    hdlr = struct.pack(">B3xI4s", 0, 0, b"vide") + bytes(12) + b"\0"
+    moov = _box(b"moov", _box(b"mvhd", mvhd) + _box(b"trak", _box(b"tkhd", tkhd) + _box(b"mdia", _box(b"hdlr", hdlr))))
+    head = _box(b"ftyp", b"isom" + struct.pack(">I", 512) + b"isommp41") + moov
+    return head + struct.pack(">I4s", total - len(head), b"mdat")
+
+def make_handler(origin):
+    """
+    Build the request handler class for the fake API and video origin.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            # Keep the benchmark output readable
+            pass
+
+        def _delay_or_fail(self):
+            time.sleep(origin.latency)
+            if origin.failure_rate and random.random() < origin.failure_rate:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                return True
+            return False
+
+        def _send_json(self, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_clip(self, head_only):
+            clip_id = self.path.rsplit("/", 1)[-1].split(".")[0]
+            total = origin.clip_bytes
+            start, end = 0, total
+            status = 200
+
+            # Honor simple 'bytes=start-end' Range requests
+            range_header = self.headers.get("Range")
+            if range_header and range_header.startswith("bytes="):
+                first, _, last = range_header[len("bytes="):].partition("-")
+                start = int(first)
+                end = min(total, int(last) + 1) if last else total
+                status = 206
+
+            self.send_response(status)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", f'"{clip_id}-{total}"')
+            self.send_header("Content-Length", str(end - start))
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{total}")
+            self.end_headers()
+            if head_only:
+                return
+
+            # Stream the clip in chunks, as a CDN would
+            position = start
+            while position < end:
+                chunk_end = min(end, position + 256 * 1024)
+                self.wfile.write(origin.clip_chunk(clip_id, position, chunk_end))
+                position = chunk_end
+
+        def do_HEAD(self):
+            if self.path.startswith("/videos/"):
+                self._send_clip(head_only=True)
+            else:
+                self.send_response(405)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        def do_GET(self):
+            if self._delay_or_fail():
+                return
+            if self.path.startswith("/videos/"):
+                self._send_clip(head_only=False)
+                return
+
+            # Serve one page of highlights
+            query = parse_qs(urlparse(self.path).query)
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", ["10"])[0])
+            ids = range(offset, min(origin.clips, offset + limit))
+            self._send_json({
+                "data": [
+                    {"id": f"clip{n}", "title": f"Highlight {n}", "url": f"{origin.base_url}/videos/clip{n}.mp4"}
+                    for n in ids
+                ],
+                "pagination": {"offset": offset, "limit": limit, "totalCount": origin.clips}
+            })
+
+    return Handler
+
+def start_origin(origin):
+    """
+    Start the fake API/video server on a free local port.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call 'shutdown()' when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(origin))
+    server.daemon_threads = True
+    origin.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+###################################
+# In-process stand-ins for S3 and MediaConvert
+###################################
+
+class FakeBody:
+    """
+    A minimal stand-in for botocore's StreamingBody.
+    """
+
+    def __init__(self, data):
+        self._data = data
+        self._position = 0
+
+    def read(self, amt=None):
+        if amt is None:
+            amt = len(self._data) - self._position
+        chunk = self._data[self._position:self._position + amt]
+        self._position += len(chunk)
+        return chunk
+
+    def iter_chunks(self, chunk_size=1024):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def iter_lines(self, chunk_size=1024, keepends=False):
+        for line in self._data.splitlines(keepends):
+            yield line
+
+    def close(self):
+        pass
+
+def _not_found(operation):
+    return ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, operation)
+
+class FakeS3:
+    """
+    An in-memory stand-in for the subset of the S3 client used by the pipeline.
+
+    Small objects are stored with their content; large ones (videos) only keep
+    their size and checksum, so the fake itself does not inflate peak memory.
+    Optional 'latency' is added to every call to mimic network round trips.
+    """
+
+    class NoSuchKey(ClientError):
+        # Like boto3's modeled exception, so both 'except ClientError' and 'except s3.exceptions.NoSuchKey' work
+        def __init__(self, key):
+            super().__init__({"Error": {"Code": "NoSuchKey", "Message": f"No such key: {key}"}}, "GetObject")
+
+    class NoSuchBucket(Exception):
+        pass
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}
+        self.uploads = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.exceptions = types.SimpleNamespace(NoSuchKey=self.NoSuchKey, NoSuchBucket=self.NoSuchBucket)
+        self.calls = 0
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _store(self, key, data, size, content_type, metadata, checksum=None, head=b"", tail=b""):
+        # Large objects only keep their first and last FAKE_S3_KEPT_BYTES
+        if data is not None:
+            head, tail = data[:FAKE_S3_KEPT_BYTES], data[-FAKE_S3_KEPT_BYTES:]
+        with self._lock:
+            self.objects[key] = {
+                "Body": data if size <= FAKE_S3_MAX_STORED_BYTES else None,
+                "Head": head,
+                "Tail": tail,
+                "Size": size,
+                "ContentType": content_type,
+                "Metadata": dict(metadata or {}),
+                "ChecksumSHA256": checksum,
+                "LastModified": datetime.now(timezone.utc)
+            }
+
+    def head_bucket(self, Bucket):
+        self._call()
+        return {}
+
+    def create_bucket(self, Bucket, **kwargs):
+        self._call()
+        return {}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, Metadata=None, **kwargs):
+        self._call()
+        data = Body.encode("utf-8") if isinstance(Body, str) else bytes(Body)
+        self._store(Key, data, len(data), ContentType, Metadata)
+        return {"ETag": '"' + hashlib.md5(data).hexdigest() + '"'}
+
+    def get_object(self, Bucket, Key, Range=None, **kwargs):
+        self._call()
+        obj = self.objects.get(Key)
+        if obj is None:
+            raise self.NoSuchKey(Key)
+
+        # Serve 'bytes=start-end' ranges, from the kept start or end of large objects
+        start, end = 0, obj["Size"]
+        if Range:
+            first, _, last = Range[len("bytes="):].partition("-")
+            start, end = int(first), min(obj["Size"], int(last) + 1)
+        if obj["Body"] is not None:
+            data = obj["Body"][start:end]
+        elif end <= len(obj["Head"]):
+            data = obj["Head"][start:end]
+        elif start >= obj["Size"] - len(obj["Tail"]):
+            offset = obj["Size"] - len(obj["Tail"])
+            data = obj["Tail"][start - offset:end - offset]
+        else:
+            raise ValueError(f"The benchmark does not keep bytes {start}-{end - 1} of large object {Key}")
+        return {"Body": FakeBody(data), "ContentLength": len(data), "Metadata": obj["Metadata"]}
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._call()
+        obj = self.objects.get(Key)
+        if obj is None:
+            raise _not_found("HeadObject")
+        response = {"ContentLength": obj["Size"], "Metadata": obj["Metadata"], "LastModified": obj["LastModified"]}
+        if obj["ChecksumSHA256"]:
+            response["ChecksumSHA256"] = obj["ChecksumSHA256"]
+        return response
+
+    def delete_object(self, Bucket, Key):
+        self._call()
+        with self._lock:
+            self.objects.pop(Key, None)
+        return {}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None, Metadata=None, **kwargs):
+        self._call()
+        upload_id = f"upload-{next(self._ids)}"
+        with self._lock:
+            self.uploads[upload_id] = {"Key": Key, "ContentType": ContentType, "Metadata": Metadata, "Parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ChecksumSHA256=None, **kwargs):
+        self._call()
+        data = bytes(Body)
+        with self._lock:
+            self.uploads[UploadId]["Parts"][PartNumber] = {
+                "Size": len(data),
+                "ETag": '"' + hashlib.md5(data).hexdigest() + '"',
+                "ChecksumSHA256": ChecksumSHA256,
+                "Body": data if len(data) <= FAKE_S3_MAX_STORED_BYTES else None,
+                "Head": data[:FAKE_S3_KEPT_BYTES],
+                "Tail": data[-FAKE_S3_KEPT_BYTES:]
+            }
+        return {"ETag": self.uploads[UploadId]["Parts"][PartNumber]["ETag"]}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._call()
+        with self._lock:
+            upload = self.uploads.pop(UploadId)
+        parts = [upload["Parts"][p["PartNumber"]] for p in MultipartUpload["Parts"]]
+        size = sum(part["Size"] for part in parts)
+        data = b"".join(part["Body"] or b"" for part in parts) if size <= FAKE_S3_MAX_STORED_BYTES else None
+        head = b"".join(part["Head"] for part in parts)[:FAKE_S3_KEPT_BYTES]
+        tail = b"".join(part["Tail"] for part in parts)[-FAKE_S3_KEPT_BYTES:]
+        checksum = None
+        if all(part["ChecksumSHA256"] for part in parts):
+            combined = hashlib.sha256(b"".join(base64.b64decode(part["ChecksumSHA256"]) for part in parts)).digest()
+            checksum = f"{base64.b64encode(combined).decode('ascii')}-{len(parts)}"
+        self._store(Key, data, size, upload["ContentType"], upload["Metadata"], checksum, head, tail)
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._call()
+        with self._lock:
+            self.uploads.pop(UploadId, None)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000, **kwargs):
+        self._call()
+        with self._lock:
+            keys = sorted(key for key in self.objects if key.startswith(Prefix))[:MaxKeys]
+            contents = [{"Key": key, "Size": self.objects[key]["Size"],
+                         "LastModified": self.objects[key]["LastModified"]} for key in keys]
+        return {"Contents": contents, "KeyCount": len(contents)}
+
+    def get_paginator(self, operation_name):
+        fake = self
+
+        class Paginator:
+            def paginate(self, **kwargs):
+                if operation_name == "list_objects_v2":
+                    yield fake.list_objects_v2(**kwargs)
+                elif operation_name == "list_parts":
+                    if kwargs["UploadId"] not in fake.uploads:
+                        raise ClientError({"Error": {"Code": "NoSuchUpload", "Message": "The upload does not exist"}},
+                                          "ListParts")
+                    parts = fake.uploads[kwargs["UploadId"]]["Parts"]
+                    yield {"Parts": [{"PartNumber": n, "ETag": p["ETag"], "Size": p["Size"],
+                                      "ChecksumSHA256": p["ChecksumSHA256"]} for n, p in sorted(parts.items())]}
+                else:
+                    # Fail like S3 does for a request it does not support
+                    raise ClientError({"Error": {"Code": "NotImplemented",
+                                                 "Message": f"The benchmark does not support '{operation_name}'"}},
+                                      operation_name)
+
+        return Paginator()
+
+class FakeMediaConvert:
+    """
+    An in-process stand-in for the MediaConvert client.
+
+    Every job completes 'transcode_seconds' after submission and then writes a
+    small placeholder output into the fake S3, so the pipeline sees the same
+    state as after a real transcode. 'failure_rate' makes some jobs end in ERROR.
+    """
+
+    def __init__(self, s3, bucket, transcode_seconds=0.5, failure_rate=0.0):
+        self.s3 = s3
+        self.bucket = bucket
+        self.transcode_seconds = transcode_seconds
+        self.failure_rate = failure_rate
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create_job(self, Role, Settings, **kwargs):
+        job_id = f"job-{next(self._ids)}"
+        group_settings = Settings["OutputGroups"][0]["OutputGroupSettings"]
+        destination = next(value["Destination"] for value in group_settings.values() if isinstance(value, dict))
+        with self._lock:
+            self.jobs[job_id] = {
+                "Id": job_id,
+                "Submitted": time.monotonic(),
+                "SubmitTime": datetime.now(timezone.utc),
+                "Destination": destination,
+                "Fails": random.random() < self.failure_rate,
+                "Settings": Settings
+            }
+        return {"Job": {"Id": job_id, "Status": "SUBMITTED"}}
+
+    def get_job(self, Id):
+        with self._lock:
+            job = self.jobs[Id]
+        timing = {"SubmitTime": job["SubmitTime"]}
+        if time.monotonic() - job["Submitted"] < self.transcode_seconds:
+            return {"Job": {"Id": Id, "Status": "PROGRESSING", "Timing": timing}}
+
+        if "FinishTime" not in job:
+            job["StartTime"] = job["SubmitTime"]
+            job["FinishTime"] = datetime.now(timezone.utc)
+            if not job["Fails"]:
+                # Write a placeholder rendition where MediaConvert would, e.g. 'clip0_720p.mp4'
+                prefix = job["Destination"][len(f"s3://{self.bucket}/"):]
+                clip_name = os.path.splitext(os.path.basename(job["Settings"]["Inputs"][0]["FileInput"]))[0]
+                for output in job["Settings"]["OutputGroups"][0]["Outputs"]:
+                    self.s3.put_object(Bucket=self.bucket, Key=f"{prefix}{clip_name}{output['NameModifier']}.mp4",
+                                       Body=b"transcoded", ContentType="video/mp4")
+        timing.update(StartTime=job["StartTime"], FinishTime=job["FinishTime"])
+        status = "ERROR" if job["Fails"] else "COMPLETE"
+        return {"Job": {"Id": Id, "Status": status, "Timing": timing,
+                        "ErrorMessage": "Injected failure" if job["Fails"] else None}}
+
+###################################
+# Benchmark runner
+###################################
+
+# The pipeline modules, reloaded for every run so that they pick up the benchmark configuration
+PIPELINE_MODULES = ("config", "aws_clients", "storage", "metrics", "http_client", "http_cache", "media_probe",
+                    "state_store", "feed", "filters", "fetch", "process_one_video", "mediaconvert_process", "transcoders", "pipeline_async")
+
+def load_pipeline(environment):
+    """
+    Configure the pipeline through environment variables and (re)import its modules.
+
+    'config.py' reads the environment at import time, so modules are dropped from
+    'sys.modules' first to make every run start from a clean configuration.
+
+    Returns:
+        dict: The freshly imported modules, by name.
+    """
+    os.environ.update(environment)
+    for name in PIPELINE_MODULES:
+        sys.modules.pop(name, None)
+    return {name: importlib.import_module(name) for name in PIPELINE_MODULES}
+
+def run_benchmark(clips=20, clip_size_mb=8, latency_ms=20, failure_rate=0.0, s3_latency_ms=5,
+                  transcode_seconds=0.5, mode="inprocess", concurrency=4):
+    """
+    Run the pipeline once against the local stand-ins and measure it.
+
+    Args:
+        clips (int, optional): The number of highlights served by the fake API. Defaults to 20.
+        clip_size_mb (float, optional): The size of each clip in MB. Defaults to 8.
+        latency_ms (int, optional): The latency added to every API/video request. Defaults to 20.
+        failure_rate (float, optional): The share of API/video requests and jobs that fail. Defaults to 0.
+        s3_latency_ms (int, optional): The latency added to every fake S3 call. Defaults to 5.
+        transcode_seconds (float, optional): How long each fake MediaConvert job runs. Defaults to 0.5.
+        mode (str, optional): 'inprocess' (sequential stages) or 'async' (overlapping stages).
+        concurrency (int, optional): The value of DOWNLOAD_CONCURRENCY. Defaults to 4.
+
+    Returns:
+        dict: The measured results and the pipeline's own run report.
+    """
+    origin = FakeOrigin(clips, int(clip_size_mb * 1_000_000), latency_ms / 1000, failure_rate)
+    server = start_origin(origin)
+    bucket = "benchmark-bucket"
+
+    try:
+        modules = load_pipeline({
+            "API_URL": f"{origin.base_url}/highlights",
+            "RAPIDAPI_KEY": "benchmark",
+            "S3_BUCKET_NAME": bucket,
+            "LIMIT": "25",
+            "DOWNLOAD_CONCURRENCY": str(concurrency),
+            "HTTP_CACHE_BACKEND": "none",
+            "TRANSCODER_BACKEND": "mediaconvert",
+            "JOB_POLL_INITIAL_DELAY": "1",
+            "JOB_POLL_MAX_DELAY": "2",
+            "METRICS_REPORT_PATH": "",
+            "METRICS_REPORT_PREFIX": ""
+        })
+
+        # Route every AWS call of the pipeline to the stand-ins
+        s3 = FakeS3(latency=s3_latency_ms / 1000)
+        mediaconvert = FakeMediaConvert(s3, bucket, transcode_seconds, failure_rate)
+        modules["aws_clients"].set_client("s3", s3)
+        modules["aws_clients"].set_client("mediaconvert", mediaconvert)
+
+        tracemalloc.start()
+        start = time.monotonic()
+
+        # Keep stdout for the results; the pipeline's own messages go to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            if mode == "async":
+                modules["pipeline_async"].run_pipeline()
+            else:
+                modules["fetch"].process_highlights()
+                modules["process_one_video"].process_all_videos()
+                modules["transcoders"].transcode_all()
+
+        elapsed = time.monotonic() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        server.shutdown()
+
+    report = modules["metrics"].get_report().to_dict()
+    transferred = report["totals"]["bytes"]
+    first_submit = min((job["Submitted"] for job in mediaconvert.jobs.values()), default=None)
+
+    return {
+        "mode": mode,
+        "clips": clips,
+        "clip_size_mb": clip_size_mb,
+        "end_to_end_seconds": round(elapsed, 3),
+        "first_job_submitted_after_seconds": round(first_submit - start, 3) if first_submit else None,
+        "bytes_transferred": transferred,
+        "throughput_mbps": round(transferred / elapsed / 1_000_000, 3) if elapsed else None,
+        "peak_python_memory_mb": round(peak_memory / 1_000_000, 3),
+        "jobs_submitted": len(mediaconvert.jobs),
+        "s3_calls": s3.calls,
+        "report": report
+    }
+
+def main():
+    """
+    Parse the command line, run the benchmark and print the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the highlights pipeline against local stand-ins.")
+    parser.add_argument("--clips", type=int, default=20, help="number of highlights served by the fake API")
+    parser.add_argument("--clip-size-mb", type=float, default=8, help="size of each clip in MB")
+    parser.add_argument("--latency-ms", type=int, default=20, help="latency added to every API/video request")
+    parser.add_argument("--s3-latency-ms", type=int, default=5, help="latency added to every fake S3 call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests and jobs that fail")
+    parser.add_argument("--transcode-seconds", type=float, default=0.5, help="duration of each fake transcode")
+    parser.add_argument("--concurrency", type=int, default=4, help="DOWNLOAD_CONCURRENCY for the run")
+    parser.add_argument("--mode", choices=("inprocess", "async", "both"), default="both",
+                        help="which pipeline runner to measure")
+    parser.add_argument("--full-report", action="store_true", help="include the pipeline's run report")
+    args = parser.parse_args()
+
+    modes = ("inprocess", "async") if args.mode == "both" else (args.mode,)
+    results = []
+    for mode in modes:
+        result = run_benchmark(
+            clips=args.clips,
+            clip_size_mb=args.clip_size_mb,
+            latency_ms=args.latency_ms,
+            failure_rate=args.failure_rate,
+            s3_latency_ms=args.s3_latency_ms,
+            transcode_seconds=args.transcode_seconds,
+            mode=mode,
+            concurrency=args.concurrency
+        )
+        if not args.full_report:
+            result.pop("report")
+        results.append(result)
+
+    print(json.dumps(results, indent=2))
+
+# Check if this script is being run as the main program
+if __name__ == "__main__":
+    main()
@@ -27,10 +27,77 @@ DATE = os.getenv("DATE", "2023-12-01")
 # If the 'LEAGUE_NAME' environment variable is not set, it defaults to 'NCAA'.
 LEAGUE_NAME = os.getenv("LEAGUE_NAME", "NCAA")
 
-# The maximum number of highlights to fetch. 
+# The leagues to fetch highlights for, as a comma-separated list (e.g. 'NCAA,WNBA,NBA').
+# Every (league, date) pair is fetched as a separate shard and saved under its own partitioned S3 prefix.
+# If the 'LEAGUE_NAMES' environment variable is not set, it defaults to LEAGUE_NAME.
+LEAGUE_NAMES = [name.strip() for name in os.getenv("LEAGUE_NAMES", LEAGUE_NAME).split(",") if name.strip()]
+
+# The maximum number of highlights to fetch per API request (the page size).
 # It converts the 'LIMIT' environment variable to an integer, defaulting to 10 if not set.
 LIMIT = int(os.getenv("LIMIT", "10"))
 
+# The first and last dates (inclusive, YYYY-MM-DD) of the range to fetch highlights for.
+# If the 'START_DATE' and 'END_DATE' environment variables are not set, both default to DATE.
+START_DATE = os.getenv("START_DATE", DATE)
+END_DATE = os.getenv("END_DATE", START_DATE)
+
+# The maximum number of pages requested per date, as a safeguard against endless pagination.
+# It converts the 'MAX_PAGES' environment variable to an integer, defaulting to 50 if not set.
+MAX_PAGES = int(os.getenv("MAX_PAGES", "50"))
+
+# The maximum number of (league, date) shards fetched from the API at the same time.
+# It converts the 'FETCH_WORKERS' environment variable to an integer, defaulting to 4 if not set.
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))
+
+# The maximum sustained rate (requests per second) of API requests, shared by every fetch worker.
+# Set it below the RapidAPI plan's quota; 0 disables the limit. Cached responses do not count.
+# It converts the 'API_RATE_LIMIT' environment variable to a float, defaulting to 5 requests per second if not set.
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "5"))
+
+# The number of API requests that may be sent at once before API_RATE_LIMIT applies.
+# It converts the 'API_RATE_BURST' environment variable to an integer, defaulting to 5 if not set.
+API_RATE_BURST = int(os.getenv("API_RATE_BURST", "5"))
+
+# The key (path) in the S3 bucket of the index of highlight ids that were already fetched.
+# Highlights listed in this index are skipped on later runs.
+# If the 'SEEN_INDEX_KEY' environment variable is not set, it defaults to 'highlights/seen_ids.json'.
+SEEN_INDEX_KEY = os.getenv("SEEN_INDEX_KEY", "highlights/seen_ids.json")
+
+# The format of the highlights feed saved to S3: 'ndjson' (one highlight per line) or 'json' (a single '{"data": [...]}' document).
+# Both are written and read as streams, so memory use does not grow with the size of the feed.
+# It sets the default INPUT_KEY and the format of the shard files; a feed set through INPUT_KEY uses its own extension.
+# If the 'HIGHLIGHTS_FORMAT' environment variable is not set, it defaults to 'ndjson'.
+HIGHLIGHTS_FORMAT = os.getenv("HIGHLIGHTS_FORMAT", "ndjson").lower()
+
+###################################
+# API Response Cache
+###################################
+
+# Where responses from the highlights API are cached: 'local' (a directory), 's3' (a bucket prefix) or 'none'.
+# If the 'HTTP_CACHE_BACKEND' environment variable is not set, it defaults to 'local'.
+HTTP_CACHE_BACKEND = os.getenv("HTTP_CACHE_BACKEND", "local").lower()
+
+# The local directory used by the 'local' cache backend.
+# If the 'HTTP_CACHE_DIR' environment variable is not set, it defaults to '/tmp/highlights-cache'.
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "/tmp/highlights-cache")
+
+# The key prefix (folder) in S3_BUCKET_NAME used by the 's3' cache backend.
+# If the 'HTTP_CACHE_PREFIX' environment variable is not set, it defaults to 'cache/http/'.
+HTTP_CACHE_PREFIX = os.getenv("HTTP_CACHE_PREFIX", "cache/http/")
+
+# The time (in seconds) a cached response is used without asking the API again.
+# Older entries are revalidated with ETag/Last-Modified conditional requests.
+# It converts the 'HTTP_CACHE_TTL' environment variable to an integer, defaulting to 300 seconds if not set.
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", "300"))
+
+# The maximum number of cached responses; the least recently used ones are evicted first.
+# It converts the 'HTTP_CACHE_MAX_ENTRIES' environment variable to an integer, defaulting to 256 if not set.
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "256"))
+
+# The maximum total size (in MiB) of the cached responses.
+# It converts the 'HTTP_CACHE_MAX_MB' environment variable to an integer, defaulting to 50 if not set.
+HTTP_CACHE_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB", "50"))
+
 ###################################
 # AWS & S3
 ###################################
@@ -43,6 +110,11 @@ S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 # If the 'AWS_REGION' environment variable is not set, it defaults to 'us-east-1'.
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 
+# The maximum number of pooled HTTP connections kept open by each shared boto3 client.
+# It should be at least DOWNLOAD_CONCURRENCY * UPLOAD_CONCURRENCY so parallel part uploads do not wait for a connection.
+# It converts the 'AWS_MAX_POOL_CONNECTIONS' environment variable to an integer, defaulting to 32 if not set.
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "32"))
+
 ###################################
 # MediaConvert
 ###################################
@@ -56,30 +128,279 @@ MEDIACONVERT_ENDPOINT = os.getenv("MEDIACONVERT_ENDPOINT")
 # Using the full ARN allows for more precise permissions and avoids hard-coding the account ID.
 MEDIACONVERT_ROLE_ARN = os.getenv("MEDIACONVERT_ROLE_ARN")
 
+# The initial delay (in seconds) between MediaConvert job status checks.
+# The delay doubles after every check that finds jobs still running, up to JOB_POLL_MAX_DELAY.
+# It converts the 'JOB_POLL_INITIAL_DELAY' environment variable to an integer, defaulting to 5 seconds if not set.
+JOB_POLL_INITIAL_DELAY = int(os.getenv("JOB_POLL_INITIAL_DELAY", "5"))
+
+# The maximum delay (in seconds) between MediaConvert job status checks.
+# It converts the 'JOB_POLL_MAX_DELAY' environment variable to an integer, defaulting to 60 seconds if not set.
+JOB_POLL_MAX_DELAY = int(os.getenv("JOB_POLL_MAX_DELAY", "60"))
+
+# The maximum time (in seconds) to wait for all MediaConvert jobs to finish.
+# It converts the 'JOB_POLL_TIMEOUT' environment variable to an integer, defaulting to 3600 seconds if not set.
+JOB_POLL_TIMEOUT = int(os.getenv("JOB_POLL_TIMEOUT", "3600"))
+
+# The renditions produced for every clip, as comma-separated 'height:maximum bitrate' pairs.
+# Renditions taller than the source clip are skipped, and bitrates are capped at the source bitrate.
+# If the 'OUTPUT_LADDER' environment variable is not set, it defaults to 1080p, 720p, 480p and 360p.
+OUTPUT_LADDER = os.getenv("OUTPUT_LADDER", "1080:6000000,720:3500000,480:1500000,360:800000")
+
+# The output written by MediaConvert: 'mp4' (one file per rendition), 'hls' (an adaptive HLS playlist) or 'both'.
+# If the 'OUTPUT_FORMAT' environment variable is not set, it defaults to 'mp4'.
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "mp4").lower()
+
+# The QVBR quality level (1-10) of the renditions; higher values keep more detail at a higher bitrate.
+# It converts the 'QVBR_QUALITY_LEVEL' environment variable to an integer, defaulting to 7 if not set.
+QVBR_QUALITY_LEVEL = int(os.getenv("QVBR_QUALITY_LEVEL", "7"))
+
+# The minimum clip duration (in seconds) for which accelerated transcoding is requested.
+# Shorter clips gain little from acceleration, so they are transcoded normally.
+# It converts the 'ACCELERATION_MIN_DURATION' environment variable to an integer, defaulting to 300 seconds if not set.
+ACCELERATION_MIN_DURATION = int(os.getenv("ACCELERATION_MIN_DURATION", "300"))
+
+###################################
+# Transcoding
+###################################
+
+# Which backend transcodes the clips: 'mediaconvert' (AWS Elemental MediaConvert) or 'ffmpeg' (local processes).
+# Both produce the same renditions under PROCESSED_PREFIX.
+# If the 'TRANSCODER_BACKEND' environment variable is not set, it defaults to 'mediaconvert'.
+TRANSCODER_BACKEND = os.getenv("TRANSCODER_BACKEND", "mediaconvert").lower()
+
+# The number of clips transcoded at the same time by the 'ffmpeg' backend.
+# 0 means one per CPU available to the container.
+# It converts the 'TRANSCODE_WORKERS' environment variable to an integer, defaulting to 0 if not set.
+TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", "0"))
+
+# The ffmpeg executable used by the 'ffmpeg' backend.
+# If the 'FFMPEG_PATH' environment variable is not set, it defaults to 'ffmpeg' (looked up on the PATH).
+FFMPEG_PATH = os.getenv("FFMPEG_PATH", "ffmpeg")
+
 ###################################
 # Video Paths in S3
 ###################################
 
 # The key (path) in the S3 bucket where input highlights JSON file is stored.
-# If the 'INPUT_KEY' environment variable is not set, it defaults to 'highlights/basketball_highlights.json'.
-INPUT_KEY = os.getenv("INPUT_KEY", "highlights/basketball_highlights.json")
+# The feed is written and read in the format its extension names ('.ndjson' or JSON otherwise).
+# If the 'INPUT_KEY' environment variable is not set, it defaults to 'highlights/basketball_highlights.ndjson'
+# ('highlights/basketball_highlights.json' when HIGHLIGHTS_FORMAT is 'json').
+INPUT_KEY = os.getenv("INPUT_KEY", "highlights/basketball_highlights." + ("ndjson" if HIGHLIGHTS_FORMAT == "ndjson" else "json"))
 
 # The key (path) in the S3 bucket where the output processed video will be stored.
 # If the 'OUTPUT_KEY' environment variable is not set, it defaults to 'videos/first_video.mp4'.
 OUTPUT_KEY = os.getenv("OUTPUT_KEY", "videos/first_video.mp4")
 
+# The key prefix (folder) in the S3 bucket where batch-downloaded videos are stored.
+# Each clip is saved as '<VIDEO_PREFIX><highlight id>.mp4'.
+# If the 'VIDEO_PREFIX' environment variable is not set, it defaults to 'videos/'.
+VIDEO_PREFIX = os.getenv("VIDEO_PREFIX", "videos/")
+
+# The key prefix (folder) in the S3 bucket where MediaConvert writes transcoded videos.
+# Each clip gets its own '<PROCESSED_PREFIX><clip name>/' folder.
+# If the 'PROCESSED_PREFIX' environment variable is not set, it defaults to 'processed_videos/'.
+PROCESSED_PREFIX = os.getenv("PROCESSED_PREFIX", "processed_videos/")
+
+###################################
+# Preview Assets
+###################################
+
+# Whether a poster frame, a thumbnail sprite and a short preview clip are generated for every transcoded clip.
+# The assets are written with ffmpeg next to the clip's renditions, and listed in PREVIEW_INDEX_KEY.
+# If the 'PREVIEW_ASSETS' environment variable is not set, it defaults to 'true'.
+PREVIEW_ASSETS = os.getenv("PREVIEW_ASSETS", "true").lower() in ("1", "true", "yes")
+
+# The time (in seconds) into the clip where the poster frame is taken and the preview clip starts.
+# Clips shorter than four times this value use a quarter of their duration instead.
+# It converts the 'PREVIEW_START' environment variable to a float, defaulting to 5 seconds if not set.
+PREVIEW_START = float(os.getenv("PREVIEW_START", "5"))
+
+# The length (in seconds) of the preview clip.
+# It converts the 'PREVIEW_SECONDS' environment variable to a float, defaulting to 6 seconds if not set.
+PREVIEW_SECONDS = float(os.getenv("PREVIEW_SECONDS", "6"))
+
+# The height (in pixels) of the preview clip; the width follows the clip's aspect ratio.
+# It converts the 'PREVIEW_HEIGHT' environment variable to an integer, defaulting to 240 if not set.
+PREVIEW_HEIGHT = int(os.getenv("PREVIEW_HEIGHT", "240"))
+
+# The width (in pixels) of the poster frame; the height follows the clip's aspect ratio.
+# It converts the 'POSTER_WIDTH' environment variable to an integer, defaulting to 640 if not set.
+POSTER_WIDTH = int(os.getenv("POSTER_WIDTH", "640"))
+
+# The layout of the thumbnail sprite, as 'columns x rows' tiles spread evenly over the clip.
+# If the 'SPRITE_GRID' environment variable is not set, it defaults to '5x5'.
+SPRITE_GRID = os.getenv("SPRITE_GRID", "5x5")
+
+# The width (in pixels) of each tile of the thumbnail sprite.
+# It converts the 'SPRITE_TILE_WIDTH' environment variable to an integer, defaulting to 160 if not set.
+SPRITE_TILE_WIDTH = int(os.getenv("SPRITE_TILE_WIDTH", "160"))
+
+# The key (path) in the S3 bucket of the index mapping each highlight to its renditions and preview assets.
+# If the 'PREVIEW_INDEX_KEY' environment variable is not set, it defaults to 'index.json' under PROCESSED_PREFIX.
+PREVIEW_INDEX_KEY = os.getenv("PREVIEW_INDEX_KEY", PROCESSED_PREFIX + "index.json")
+
+###################################
+# Batch Processing
+###################################
+
+# Whether process_one_video.py should process every highlight in the feed instead of only the first one.
+# If the 'BATCH_MODE' environment variable is not set, it defaults to 'true'.
+BATCH_MODE = os.getenv("BATCH_MODE", "true").lower() in ("1", "true", "yes")
+
+# The maximum number of highlights downloaded and uploaded at the same time in batch mode.
+# It converts the 'DOWNLOAD_CONCURRENCY' environment variable to an integer, defaulting to 4 if not set.
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "4"))
+
+# The size (in MiB) of each part when streaming a video into an S3 multipart upload.
+# S3 requires at least 5 MiB per part (except the last one), so smaller values are raised to 5.
+# It converts the 'MULTIPART_PART_SIZE_MB' environment variable to an integer, defaulting to 8 if not set.
+MULTIPART_PART_SIZE_MB = int(os.getenv("MULTIPART_PART_SIZE_MB", "8"))
+
+# The maximum number of parts of a single video uploaded to S3 at the same time.
+# Peak memory per video is roughly MULTIPART_PART_SIZE_MB * (UPLOAD_CONCURRENCY + 1).
+# It converts the 'UPLOAD_CONCURRENCY' environment variable to an integer, defaulting to 4 if not set.
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+
+# The maximum number of highlights waiting between two stages of the asyncio pipeline (PIPELINE_MODE 'async').
+# A full queue pauses the previous stage, which keeps memory and open connections bounded.
+# It converts the 'PIPELINE_QUEUE_SIZE' environment variable to an integer, defaulting to 16 if not set.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+
+# The number of MediaConvert jobs submitted at the same time by the asyncio pipeline.
+# It converts the 'SUBMIT_CONCURRENCY' environment variable to an integer, defaulting to 2 if not set.
+SUBMIT_CONCURRENCY = int(os.getenv("SUBMIT_CONCURRENCY", "2"))
+
+# Whether large clips are downloaded in parallel segments with HTTP Range requests when the origin supports it.
+# Each segment becomes one multipart upload part, so an interrupted transfer resumes from the missing segments.
+# If the 'RANGE_DOWNLOADS' environment variable is not set, it defaults to 'true'.
+RANGE_DOWNLOADS = os.getenv("RANGE_DOWNLOADS", "true").lower() in ("1", "true", "yes")
+
+# The number of attempts for each segment of a ranged download before the clip is reported as failed.
+# It converts the 'SEGMENT_RETRIES' environment variable to an integer, defaulting to 3 if not set.
+SEGMENT_RETRIES = int(os.getenv("SEGMENT_RETRIES", "3"))
+
+# The time (in seconds) to wait for a video origin to respond before giving up on a request.
+# It converts the 'DOWNLOAD_TIMEOUT' environment variable to an integer, defaulting to 60 seconds if not set.
+DOWNLOAD_TIMEOUT = int(os.getenv("DOWNLOAD_TIMEOUT", "60"))
+
+# The S3 prefix where the progress of interrupted ranged downloads is recorded.
+# Unfinished uploads that are never resumed are aborted by the bucket's lifecycle rule.
+# If the 'DOWNLOAD_STATE_PREFIX' environment variable is not set, it defaults to 'state/downloads/'.
+DOWNLOAD_STATE_PREFIX = os.getenv("DOWNLOAD_STATE_PREFIX", "state/downloads/")
+
+# Whether uploads whose content is already in S3 are skipped, together with their MediaConvert jobs.
+# Content is compared by SHA-256 (and, for videos, by the origin's ETag before downloading).
+# If the 'SKIP_UNCHANGED_UPLOADS' environment variable is not set, it defaults to 'true'.
+SKIP_UNCHANGED_UPLOADS = os.getenv("SKIP_UNCHANGED_UPLOADS", "true").lower() in ("1", "true", "yes")
+
+###################################
+# Highlight Filtering
+###################################
+
+# Whether highlights that repeat an earlier highlight's id or (normalized) video URL are dropped before download.
+# If the 'DEDUPE_HIGHLIGHTS' environment variable is not set, it defaults to 'true'.
+DEDUPE_HIGHLIGHTS = os.getenv("DEDUPE_HIGHLIGHTS", "true").lower() in ("1", "true", "yes")
+
+# The query parameters that identify a clip and are kept when video URLs are normalized for deduplication.
+# Every other parameter (tracking tags, signatures, cache busters) is ignored, so URLs differing only by those match.
+# If the 'DEDUPE_KEEP_QUERY_PARAMS' environment variable is not set, it defaults to 'v,id'.
+DEDUPE_KEEP_QUERY_PARAMS = [name.strip() for name in os.getenv("DEDUPE_KEEP_QUERY_PARAMS", "v,id").split(",") if name.strip()]
+
+# The maximum size (in MiB) of a clip; larger clips are skipped before any bytes are downloaded.
+# The size is taken from the origin's Content-Length, so clips of unknown size are not skipped.
+# It converts the 'MAX_CLIP_SIZE_MB' environment variable to an integer, defaulting to 0 (no limit) if not set.
+MAX_CLIP_SIZE_MB = int(os.getenv("MAX_CLIP_SIZE_MB", "0"))
+
+# The content types accepted from video origins, as a comma-separated list (e.g. 'video/mp4,video/quicktime').
+# Clips served with any other Content-Type are skipped before any bytes are downloaded.
+# If the 'ALLOWED_CONTENT_TYPES' environment variable is not set, every content type is accepted.
+ALLOWED_CONTENT_TYPES = [name.strip().lower() for name in os.getenv("ALLOWED_CONTENT_TYPES", "").split(",") if name.strip()]
+
+###################################
+# HTTP Client (API and video origins)
+###################################
+
+# The maximum number of pooled keep-alive connections per host (API or video CDN).
+# Ranged downloads open up to UPLOAD_CONCURRENCY connections per clip, so the default covers every worker.
+# It converts the 'HTTP_POOL_SIZE' environment variable to an integer, defaulting to DOWNLOAD_CONCURRENCY * UPLOAD_CONCURRENCY.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", str(DOWNLOAD_CONCURRENCY * UPLOAD_CONCURRENCY)))
+
+# The number of times a request is retried after a connection error or a 429/5xx response.
+# A 'Retry-After' header from the server is honored; otherwise the delay grows exponentially.
+# It converts the 'HTTP_RETRIES' environment variable to an integer, defaulting to 3 if not set.
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+
+# The base delay (in seconds) of the exponential backoff between HTTP retries.
+# It converts the 'HTTP_BACKOFF_FACTOR' environment variable to a float, defaulting to 0.5 seconds if not set.
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+
+# The time (in seconds) to wait for a TCP/TLS connection to an API or video host.
+# It converts the 'HTTP_CONNECT_TIMEOUT' environment variable to a float, defaulting to 5 seconds if not set.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+
+# The time (in seconds) to wait for the highlights API to send data once connected.
+# Video origins use DOWNLOAD_TIMEOUT instead.
+# It converts the 'HTTP_READ_TIMEOUT' environment variable to a float, defaulting to 120 seconds if not set.
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+
 ###################################
 # run_all.py Retry/Delay Config
 ###################################
 
+# How run_all.py executes the pipeline stages.
+# 'inprocess' calls each stage's function directly, sharing one boto3 session and client pool.
+# 'subprocess' runs each script in its own Python interpreter for isolation.
+# 'async' streams every highlight through fetch, download, upload and MediaConvert submission as soon as it is ready.
+# If the 'PIPELINE_MODE' environment variable is not set, it defaults to 'inprocess'.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "inprocess").lower()
+
 # The number of times to retry a failed operation. 
 # It converts the 'RETRY_COUNT' environment variable to an integer, defaulting to 3 if not set.
 RETRY_COUNT = int(os.getenv("RETRY_COUNT", "3"))
 
-# The delay (in seconds) between retry attempts. 
-# It converts the 'RETRY_DELAY' environment variable to an integer, defaulting to 30 seconds if not set.
-RETRY_DELAY = int(os.getenv("RETRY_DELAY", "30"))
+# The base delay (in seconds) between retry attempts.
+# The delay doubles after each failed attempt (with random jitter), up to RETRY_MAX_DELAY.
+# It converts the 'RETRY_DELAY' environment variable to an integer, defaulting to 5 seconds if not set.
+RETRY_DELAY = int(os.getenv("RETRY_DELAY", "5"))
+
+# The maximum delay (in seconds) between retry attempts.
+# It converts the 'RETRY_MAX_DELAY' environment variable to an integer, defaulting to 60 seconds if not set.
+RETRY_MAX_DELAY = int(os.getenv("RETRY_MAX_DELAY", "60"))
+
+###################################
+# Pipeline State
+###################################
+
+# Where the progress of every highlight (fetched, uploaded, submitted, complete) is recorded so failed runs can resume:
+# 's3' (a JSON object in S3_BUCKET_NAME), 'sqlite' (a local SQLite file) or 'none'.
+# If the 'STATE_BACKEND' environment variable is not set, it defaults to 's3'.
+STATE_BACKEND = os.getenv("STATE_BACKEND", "s3").lower()
+
+# The key (path) in the S3 bucket of the state object used by the 's3' backend.
+# If the 'STATE_KEY' environment variable is not set, it defaults to 'state/highlights_state.json'.
+STATE_KEY = os.getenv("STATE_KEY", "state/highlights_state.json")
+
+# The SQLite file used by the 'sqlite' backend.
+# If the 'STATE_DB_PATH' environment variable is not set, it defaults to '/tmp/highlights-state.sqlite3'.
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "/tmp/highlights-state.sqlite3")
+
+###################################
+# Run Report & Metrics
+###################################
+
+# The local file where the JSON run report (per-stage and per-clip timings, bytes and throughput) is written.
+# Set 'METRICS_REPORT_PATH' to an empty string to skip the local file. Defaults to '/tmp/run_report.json'.
+METRICS_REPORT_PATH = os.getenv("METRICS_REPORT_PATH", "/tmp/run_report.json")
+
+# The key prefix (folder) in the S3 bucket where each run report is uploaded as 'run-<run id>.json'.
+# Set 'METRICS_REPORT_PREFIX' to an empty string to skip the upload. Defaults to 'reports/'.
+METRICS_REPORT_PREFIX = os.getenv("METRICS_REPORT_PREFIX", "reports/")
+
+# Whether metrics are also printed as CloudWatch Embedded Metric Format (EMF) lines.
+# The ECS task ships stdout to the 'GameHighlightsLogs' log group, where EMF lines become CloudWatch metrics.
+# If the 'METRICS_EMF' environment variable is not set, it defaults to 'false'.
+METRICS_EMF = os.getenv("METRICS_EMF", "false").lower() in ("1", "true", "yes")
 
-# The waiting time (in seconds) between the execution of different scripts within the pipeline.
-# It converts the 'WAIT_TIME_BETWEEN_SCRIPTS' environment variable to an integer, defaulting to 60 seconds if not set.
-WAIT_TIME_BETWEEN_SCRIPTS = int(os.getenv("WAIT_TIME_BETWEEN_SCRIPTS", "60"))
\ No newline at end of file
+# The CloudWatch namespace used for EMF metrics.
+# If the 'METRICS_NAMESPACE' environment variable is not set, it defaults to 'GameHighlights'.
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "GameHighlights")
@@ -0,0 +1,226 @@
+# feed.py
+
+# Import the 'json' module to decode and encode highlight records
+import json
+
+# Import the 'codecs' module to decode UTF-8 across chunk boundaries
+import codecs
+
+# Import the 're' module to find the start of the highlights array
+import re
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME,      # The name of the Amazon S3 bucket used for input/output data
+    INPUT_KEY,           # The S3 key (path) of the highlights feed
+    HIGHLIGHTS_FORMAT    # Whether the feed is stored as 'ndjson' or 'json'
+)
+
+# The size of each chunk read from an S3 body while parsing
+FEED_CHUNK_SIZE = 64 * 1024
+
+# The characters kept while looking for the start of the array, so a split opening is still found
+OPENING_TAIL = 256
+
+# S3 rejects multipart parts smaller than 5 MiB (except for the last part)
+UPLOAD_PART_SIZE = 5 * 1024 * 1024
+
+# The MIME type of each feed format
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "json": "application/json"}
+
+def feed_extension(fmt=HIGHLIGHTS_FORMAT):
+    """
+    Return the file extension of a feed format, e.g. 'ndjson'.
+    """
+    return "ndjson" if fmt == "ndjson" else "json"
+
+def feed_format(key):
+    """
+    Return the format of the feed stored at 'key', from its extension: 'ndjson' or 'json'.
+
+    Writers and readers both use this, so a feed is always read in the format it was written in.
+    """
+    return "ndjson" if key.endswith(".ndjson") else "json"
+
+def iter_json_array(chunks, field="data"):
+    """
+    Yield the items of the '<field>' array of a JSON document, parsing it incrementally.
+
+    Only the item being decoded is kept in memory, so a feed of any size is
+    read with constant memory and the first item is available as soon as its
+    bytes arrive. The document must be an object whose '<field>' key is
+    reached before any other array of that name, as in '{"data": [...]}'.
+
+    Args:
+        chunks (iterable of bytes): The document, e.g. 'body.iter_chunks()'.
+        field (str, optional): The key of the array to read. Defaults to 'data'.
+
+    Yields:
+        The decoded array items.
+
+    Raises:
+        ValueError: If the document is not valid JSON or has no '<field>' array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    opening = re.compile(re.escape(json.dumps(field)) + r"\s*:\s*\[")
+    buffer = ""
+    in_array = False
+    chunks = iter(chunks)
+
+    def more():
+        # Append the next chunk to the buffer; False at the end of the stream
+        nonlocal buffer
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buffer += text_decoder.decode(chunk)
+        return True
+
+    while True:
+        if not in_array:
+            # Find the opening '"<field>": [' of the array
+            match = opening.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                in_array = True
+                continue
+            # Keep a short tail in case the opening is split across chunks
+            buffer = buffer[-OPENING_TAIL:]
+            if not more():
+                raise ValueError(f"No '{field}' array found")
+            continue
+
+        # Skip separators between items
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        if not buffer:
+            if not more():
+                raise ValueError(f"Unterminated '{field}' array")
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # The item is not complete yet
+            if not more():
+                raise
+            continue
+
+        # A number or literal is only complete once the ',' or ']' after it has arrived;
+        # otherwise '1500.' or '12' may continue in the next chunk as '1500.0' or '125'
+        if not isinstance(item, (dict, list, str)):
+            rest = buffer[end:].lstrip()
+            if not rest or rest[0] not in ",]":
+                if more():
+                    continue
+                raise ValueError(f"Unterminated '{field}' array")
+
+        buffer = buffer[end:]
+        yield item
+
+def iter_ndjson(lines):
+    """
+    Yield the records of an NDJSON stream (one JSON document per line).
+
+    Args:
+        lines (iterable of bytes or str): The lines, e.g. 'body.iter_lines()'.
+    """
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+def iter_highlights(s3, key=INPUT_KEY):
+    """
+    Stream the highlight records of a feed stored in S3.
+
+    NDJSON feeds ('.ndjson') are read line by line, JSON feeds with
+    'iter_json_array'; either way records are yielded as they are downloaded.
+    The object is opened before this function returns, so a missing feed
+    raises here rather than on the first iteration.
+
+    Args:
+        s3: The boto3 S3 client.
+        key (str, optional): The S3 key (path) of the feed. Defaults to INPUT_KEY.
+
+    Returns:
+        iterator of dict: The highlight records.
+    """
+    body = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key)["Body"]
+    if feed_format(key) == "ndjson":
+        return iter_ndjson(body.iter_lines())
+    return iter_json_array(body.iter_chunks(FEED_CHUNK_SIZE))
+
+def encode_highlights(entries, fmt=HIGHLIGHTS_FORMAT):
+    """
+    Serialize highlight records one at a time.
+
+    The 'json' format produces exactly 'json.dumps({"data": entries})', so
+    content hashes match those of feeds written before NDJSON was supported.
+
+    Args:
+        entries (iterable of dict): The highlight records.
+        fmt (str, optional): 'ndjson' or 'json'. Defaults to HIGHLIGHTS_FORMAT.
+
+    Yields:
+        bytes: The encoded feed, in pieces.
+    """
+    if fmt == "ndjson":
+        for entry in entries:
+            yield (json.dumps(entry) + "\n").encode("utf-8")
+        return
+
+    yield b'{"data": ['
+    for index, entry in enumerate(entries):
+        yield ((", " if index else "") + json.dumps(entry)).encode("utf-8")
+    yield b"]}"
+
+def upload_stream(s3, key, chunks, content_type, metadata=None, part_size=UPLOAD_PART_SIZE):
+    """
+    Upload a stream of byte chunks to S3 while holding at most one part in memory.
+
+    Streams smaller than one part are uploaded with a single 'put_object';
+    larger ones become a multipart upload, which is aborted if anything fails.
+
+    Args:
+        s3: The boto3 S3 client.
+        key (str): The S3 key (path) to write.
+        chunks (iterable of bytes): The content.
+        content_type (str): The MIME type of the object.
+        metadata (dict, optional): User metadata stored on the object.
+        part_size (int, optional): The size of each part in bytes. Defaults to 5 MiB.
+    """
+    buffer = bytearray()
+    upload_id = None
+    parts = []
+    try:
+        for chunk in chunks:
+            buffer.extend(chunk)
+            if len(buffer) < part_size:
+                continue
+
+            if upload_id is None:
+                upload_id = s3.create_multipart_upload(
+                    Bucket=S3_BUCKET_NAME, Key=key, ContentType=content_type, Metadata=metadata or {}
+                )["UploadId"]
+            response = s3.upload_part(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id,
+                                      PartNumber=len(parts) + 1, Body=bytes(buffer))
+            parts.append({"PartNumber": len(parts) + 1, "ETag": response["ETag"]})
+            buffer = bytearray()
+
+        if upload_id is None:
+            s3.put_object(Bucket=S3_BUCKET_NAME, Key=key, Body=bytes(buffer),
+                          ContentType=content_type, Metadata=metadata or {})
+            return
+
+        if buffer:
+            response = s3.upload_part(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id,
+                                      PartNumber=len(parts) + 1, Body=bytes(buffer))
+            parts.append({"PartNumber": len(parts) + 1, "ETag": response["ETag"]})
+        s3.complete_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id,
+                                     MultipartUpload={"Parts": parts})
+    except Exception:
+        if upload_id is not None:
+            s3.abort_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id)
+        raise
@@ -3,8 +3,20 @@
 # Import the 'json' module for handling JSON data
 import json
 
-# Import the 'boto3' library for interacting with AWS services like S3
-import boto3
+# Import the 'sys' module to report failure through the exit status
+import sys
+
+# Import the 'hashlib' module to detect unchanged uploads by content hash
+import hashlib
+
+# Import the 'datetime' module to walk through a range of dates
+from datetime import date, timedelta
+
+# Import the 'quote' function to escape league names in S3 partition keys
+from urllib.parse import quote
+
+# Import the thread pool used to fetch several (league, date) shards at the same time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import the 'requests' library for making HTTP requests to external APIs
 import requests
@@ -16,18 +28,49 @@ from config import (
     RAPIDAPI_KEY,        # The API key for authenticating with RapidAPI
     DATE,                # The date for which to fetch highlights
     LEAGUE_NAME,         # The name of the basketball league (e.g., NCAA)
-    LIMIT,               # The maximum number of highlights to fetch
+    LEAGUE_NAMES,        # The leagues to fetch highlights for
+    LIMIT,               # The maximum number of highlights to fetch per request
+    START_DATE,          # The first date of the range to fetch
+    END_DATE,            # The last date of the range to fetch
+    MAX_PAGES,           # The maximum number of pages requested per date
+    FETCH_WORKERS,       # The number of (league, date) shards fetched at the same time
+    SEEN_INDEX_KEY,      # The S3 key of the index of already-fetched highlight ids
+    INPUT_KEY,           # The S3 key of the feed read by the next stage
+    SKIP_UNCHANGED_UPLOADS,  # Whether uploads of content already in S3 are skipped
     S3_BUCKET_NAME,      # The name of the S3 bucket where data will be stored
-    AWS_REGION,          # The AWS region where the S3 bucket is located
 )
 
-def fetch_highlights():
+# Import the shared S3 helpers (cached client, bucket validation, object lookup)
+from storage import get_s3_client, ensure_bucket, head_object, get_object
+
+# Import the API response cache
+from http_cache import get_cache
+
+# Import the rate limiter shared by every API request
+from http_client import get_api_rate_limiter
+
+# Import the streaming feed encoder and uploader
+from feed import encode_highlights, upload_stream, feed_extension, feed_format, CONTENT_TYPES
+
+# Import the deduplication of repeated highlights
+from filters import Deduplicator
+
+# Import the state store that records each highlight's progress through the pipeline
+from state_store import get_state_store, FETCHED
+
+def fetch_highlights(day=DATE, offset=0, limit=LIMIT, league=LEAGUE_NAME):
     """
     Fetch basketball highlights from the API.
     
     This function makes a GET request to the specified API endpoint with the necessary
     headers and query parameters to retrieve basketball highlights. It handles any
     request-related exceptions and returns the fetched highlights as a JSON object.
+
+    Args:
+        day (str, optional): The date (YYYY-MM-DD) to fetch highlights for. Defaults to DATE.
+        offset (int, optional): The number of highlights to skip (for pagination). Defaults to 0.
+        limit (int, optional): The maximum number of highlights to return. Defaults to LIMIT.
+        league (str, optional): The league to fetch highlights for. Defaults to LEAGUE_NAME.
     
     Returns:
         dict or None: The fetched highlights as a JSON dictionary if successful; otherwise, None.
@@ -35,9 +78,10 @@ def fetch_highlights():
     try:
         # Define the query parameters for the API request
         query_params = {
-            "date": DATE,            # The specific date for which to fetch highlights
-            "leagueName": LEAGUE_NAME,  # The name of the league (e.g., NCAA)
-            "limit": LIMIT            # The maximum number of highlights to retrieve
+            "date": day,             # The specific date for which to fetch highlights
+            "leagueName": league,     # The name of the league (e.g., NCAA)
+            "limit": limit,           # The maximum number of highlights to retrieve
+            "offset": offset          # The number of highlights to skip
         }
         
         # Define the headers for the API request, including authentication details
@@ -46,18 +90,15 @@ def fetch_highlights():
             "X-RapidAPI-Host": RAPIDAPI_HOST     # Hostname for the RapidAPI service
         }
 
-        # Make a GET request to the API endpoint with the specified headers and query parameters
-        # Set a timeout of 120 seconds to prevent hanging requests
-        response = requests.get(API_URL, headers=headers, params=query_params, timeout=120)
-        
-        # Raise an HTTPError if the HTTP request returned an unsuccessful status code
-        response.raise_for_status()
-        
-        # Parse the JSON response from the API
-        highlights = response.json()
+        # Make a GET request to the API endpoint through the response cache
+        # Fresh cached responses are reused and stale ones are revalidated with ETag/Last-Modified
+        # The shared HTTP session keeps the connection alive and retries 429/5xx responses
+        # The shared rate limiter keeps all fetch workers together within the API quota
+        highlights = get_cache().get_json(API_URL, params=query_params, headers=headers,
+                                          limiter=get_api_rate_limiter())
         
         # Print a success message to indicate that highlights were fetched successfully
-        print("Highlights fetched successfully!")
+        print(f"Highlights fetched successfully for {league} on {day} (offset {offset})!")
         
         # Return the parsed highlights data
         return highlights
@@ -69,83 +110,364 @@ def fetch_highlights():
         # Return None to indicate that fetching highlights failed
         return None
 
-def save_to_s3(data, file_name):
+def date_range(start, end):
+    """
+    List every date between two dates, inclusive.
+
+    Args:
+        start (str): The first date (YYYY-MM-DD).
+        end (str): The last date (YYYY-MM-DD).
+
+    Returns:
+        list of str: The dates in YYYY-MM-DD format.
+    """
+    first = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+    return [(first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
+
+def shards(leagues=LEAGUE_NAMES, start=START_DATE, end=END_DATE):
+    """
+    List every (league, date) pair to fetch.
+
+    Args:
+        leagues (list of str, optional): The leagues. Defaults to LEAGUE_NAMES.
+        start (str, optional): The first date (YYYY-MM-DD). Defaults to START_DATE.
+        end (str, optional): The last date (YYYY-MM-DD). Defaults to END_DATE.
+
+    Returns:
+        list of tuple: The (league, date) pairs, ordered by league and then by date.
+    """
+    return [(league, day) for league in leagues for day in date_range(start, end)]
+
+def fetch_shard(league, day, limit=LIMIT, max_pages=MAX_PAGES):
+    """
+    Fetch every highlight of one league on one date, following pagination.
+
+    Pages of 'limit' highlights are requested with an increasing offset until
+    the API returns a short page, reports that all highlights have been
+    returned, or 'max_pages' is reached.
+
+    Args:
+        league (str): The league to fetch highlights for.
+        day (str): The date (YYYY-MM-DD).
+        limit (int, optional): The page size. Defaults to LIMIT.
+        max_pages (int, optional): The maximum number of pages. Defaults to MAX_PAGES.
+
+    Returns:
+        list or None: The highlight entries, or None if not even the first page could be fetched.
+    """
+    entries = None
+    for page in range(max_pages):
+        # Request the next page for this shard
+        highlights = fetch_highlights(day=day, offset=page * limit, limit=limit, league=league)
+        if highlights is None:
+            # Keep what was fetched so far; the rest is picked up on the next run
+            break
+
+        data = highlights.get("data", [])
+        entries = entries if entries is not None else []
+        entries.extend(data)
+
+        # Stop when the API has nothing more for this shard
+        total = highlights.get("pagination", {}).get("totalCount")
+        if len(data) < limit or (total is not None and (page + 1) * limit >= total):
+            break
+
+    return entries
+
+def iter_shards(leagues=LEAGUE_NAMES, start=START_DATE, end=END_DATE, limit=LIMIT, max_pages=MAX_PAGES,
+                max_workers=FETCH_WORKERS):
+    """
+    Fetch every (league, date) shard concurrently and yield each one as soon as it is complete.
+
+    Shards are spread over a pool of 'max_workers' threads that share one HTTP
+    session, response cache and API rate limiter (see API_RATE_LIMIT), so the
+    whole slate takes about as long as its slowest shard while the RapidAPI
+    quota is still respected. Shards that could not be fetched are skipped.
+
+    Args:
+        leagues (list of str, optional): The leagues. Defaults to LEAGUE_NAMES.
+        start (str, optional): The first date (YYYY-MM-DD). Defaults to START_DATE.
+        end (str, optional): The last date (YYYY-MM-DD). Defaults to END_DATE.
+        limit (int, optional): The page size. Defaults to LIMIT.
+        max_pages (int, optional): The maximum number of pages per shard. Defaults to MAX_PAGES.
+        max_workers (int, optional): The number of shards fetched at the same time. Defaults to FETCH_WORKERS.
+
+    Yields:
+        tuple: The shard's league, its date and its list of highlight entries.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(fetch_shard, league, day, limit, max_pages): (league, day)
+                   for league, day in shards(leagues, start, end)}
+        for future in as_completed(futures):
+            entries = future.result()
+            if entries is not None:
+                league, day = futures[future]
+                yield league, day, entries
+
+def fetch_all_highlights(leagues=LEAGUE_NAMES, start=START_DATE, end=END_DATE, limit=LIMIT, max_pages=MAX_PAGES):
+    """
+    Fetch every highlight for a set of leagues and a range of dates.
+
+    See 'iter_shards' for how the (league, date) shards are fetched.
+
+    Args:
+        leagues (list of str, optional): The leagues. Defaults to LEAGUE_NAMES.
+        start (str, optional): The first date (YYYY-MM-DD). Defaults to START_DATE.
+        end (str, optional): The last date (YYYY-MM-DD). Defaults to END_DATE.
+        limit (int, optional): The page size. Defaults to LIMIT.
+        max_pages (int, optional): The maximum number of pages per shard. Defaults to MAX_PAGES.
+
+    Returns:
+        dict or None: The highlight entries of each fetched shard keyed by (league, date),
+            in shard order, or None if no shard could be fetched.
+    """
+    fetched = {(league, day): entries for league, day, entries in iter_shards(leagues, start, end, limit, max_pages)}
+    if not fetched:
+        return None
+
+    # Return the shards in a stable order, whichever finished first
+    return {shard: fetched[shard] for shard in shards(leagues, start, end) if shard in fetched}
+
+def shard_file_name(league, day):
+    """
+    Return the file name (without extension) of a shard's feed, under a Hive-style partitioned prefix.
+
+    Args:
+        league (str): The shard's league.
+        day (str): The shard's date (YYYY-MM-DD).
+
+    Returns:
+        str: e.g. 'league=NCAA/date=2023-12-01/basketball_highlights'.
+    """
+    return f"league={quote(league, safe='')}/date={day}/basketball_highlights"
+
+def highlight_id(entry):
+    """
+    Return the identifier used to recognize a highlight across runs.
+
+    Args:
+        entry (dict): A single highlight entry.
+
+    Returns:
+        str: The highlight id, or its URL if the API did not provide an id.
+    """
+    entry_id = entry.get("id")
+    return str(entry_id if entry_id is not None else entry.get("url"))
+
+def load_seen_ids(s3):
+    """
+    Load the index of already-fetched highlight ids from S3.
+
+    Args:
+        s3: The boto3 S3 client.
+
+    Returns:
+        set of str: The ids in the index, or an empty set if no index exists yet.
+    """
+    response = get_object(s3, SEEN_INDEX_KEY)
+    if response is None:
+        # The first run has not seen anything yet
+        return set()
+    return set(json.loads(response["Body"].read().decode("utf-8")))
+
+def save_seen_ids(s3, seen_ids):
+    """
+    Save the index of already-fetched highlight ids to S3.
+
+    Args:
+        s3: The boto3 S3 client.
+        seen_ids (set of str): The ids to store.
+    """
+    s3.put_object(
+        Bucket=S3_BUCKET_NAME,
+        Key=SEEN_INDEX_KEY,
+        Body=json.dumps(sorted(seen_ids)),
+        ContentType="application/json"
+    )
+
+def stored_sha256(s3, key):
+    """
+    Return the SHA-256 recorded on an S3 object when it was saved by 'save_to_s3'.
+
+    Args:
+        s3: The boto3 S3 client.
+        key (str): The S3 key (path) to look up.
+
+    Returns:
+        str or None: The hex digest, or None if the object does not exist or has no digest.
+    """
+    response = head_object(s3, key)
+    return response.get("Metadata", {}).get("sha256") if response else None
+
+def save_to_s3(data, s3_key):
     """
     Save data to an S3 bucket.
     
     This function uploads the provided data to a specified S3 bucket. It first checks
-    whether the bucket exists and creates it if it does not. The data is then serialized
-    to JSON and uploaded to the S3 bucket with the specified file name.
+    whether the bucket exists and creates it if it does not (once per process, see
+    'storage.ensure_bucket'). The highlights are then serialized in the format given
+    by the key's extension (NDJSON for '.ndjson', JSON otherwise, see 'feed.feed_format')
+    and streamed to the S3 bucket, one record at a time, so memory use does not grow
+    with the size of the feed.
+
+    The SHA-256 of the serialized data is stored as object metadata. With
+    SKIP_UNCHANGED_UPLOADS enabled, the upload is skipped when the object already
+    holds the same digest.
     
     Args:
-        data (dict): The data to be saved to S3.
-        file_name (str): The name of the file (without extension) to be created in S3.
+        data (dict): The data to be saved to S3, with the highlights under 'data'.
+        s3_key (str): The S3 key (path) of the file to be created, e.g. INPUT_KEY.
+
+    Returns:
+        str or None: The S3 key the data was saved to, or None if saving failed.
     """
     try:
-        # Initialize the S3 client using the specified AWS region
-        s3 = boto3.client("s3", region_name=AWS_REGION)
-
-        # Attempt to check if the specified S3 bucket exists by calling 'head_bucket'
-        try:
-            s3.head_bucket(Bucket=S3_BUCKET_NAME)
-            # If the bucket exists, print a confirmation message
-            print(f"Bucket {S3_BUCKET_NAME} exists.")
-        except Exception:
-            # If the bucket does not exist, print a message indicating creation
-            print(f"Bucket {S3_BUCKET_NAME} does not exist. Creating...")
-            if AWS_REGION == "us-east-1":
-                # For the 'us-east-1' region, the 'LocationConstraint' is not required
-                s3.create_bucket(Bucket=S3_BUCKET_NAME)
-            else:
-                # For other regions, specify the 'LocationConstraint' during bucket creation
-                s3.create_bucket(
-                    Bucket=S3_BUCKET_NAME,
-                    CreateBucketConfiguration={"LocationConstraint": AWS_REGION}
-                )
-            # Print a success message after creating the bucket
-            print(f"Bucket {S3_BUCKET_NAME} created successfully.")
-
-        # Define the S3 key (path) where the JSON data will be stored
-        s3_key = f"highlights/{file_name}.json"
-
-        # Upload the JSON data to the specified S3 bucket and key
-        s3.put_object(
-            Bucket=S3_BUCKET_NAME,                     # The target S3 bucket
-            Key=s3_key,                                # The S3 key (path) for the uploaded file
-            Body=json.dumps(data),                      # The JSON-serialized data to upload
-            ContentType="application/json"             # The MIME type of the uploaded file
+        # Reuse the shared S3 client
+        s3 = get_s3_client()
+
+        # Make sure the bucket exists, creating it if needed (checked once per process)
+        ensure_bucket(s3, create=True)
+
+        # Serialize the feed in the format its key names, so readers of the key parse it the same way
+        fmt = feed_format(s3_key)
+
+        # Hash the serialized feed to detect unchanged content, without holding it in memory
+        digest = hashlib.sha256()
+        for chunk in encode_highlights(data["data"], fmt):
+            digest.update(chunk)
+        digest = digest.hexdigest()
+
+        # Skip the upload if S3 already holds exactly this content
+        if SKIP_UNCHANGED_UPLOADS and stored_sha256(s3, s3_key) == digest:
+            print(f"Highlights unchanged, skipped upload: s3://{S3_BUCKET_NAME}/{s3_key}")
+            return s3_key
+
+        # Stream the serialized feed to the specified S3 key
+        upload_stream(
+            s3,
+            s3_key,                                    # The S3 key (path) for the uploaded file
+            encode_highlights(data["data"], fmt),      # The serialized highlights, one record at a time
+            CONTENT_TYPES[fmt],                        # The MIME type of the uploaded file
+            metadata={"sha256": digest}                # The content hash used to skip unchanged uploads
         )
         
         # Print a success message indicating where the data was saved in S3
         print(f"Highlights saved to S3: s3://{S3_BUCKET_NAME}/{s3_key}")
+
+        # Return the key so callers know the save succeeded
+        return s3_key
     
     except Exception as e:
         # Catch any exceptions related to S3 operations and print an error message
         print(f"Error saving to S3: {e}")
 
+        # Return None to indicate that saving failed
+        return None
+
+def save_shards(shard_entries, max_workers=FETCH_WORKERS):
+    """
+    Save the highlights of every shard to its partitioned prefix (see 'shard_file_name').
+
+    Each partition holds everything the API returned for its league and date,
+    seen before or not, so a rerun rewrites the same content and 'save_to_s3'
+    skips the upload. Shards are saved concurrently.
+
+    Args:
+        shard_entries (dict): The highlight entries of each shard, keyed by (league, date).
+        max_workers (int, optional): The number of shards saved at the same time. Defaults to FETCH_WORKERS.
+
+    Returns:
+        bool: True if every shard was saved; otherwise, False.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        keys = executor.map(lambda item: save_to_s3({"data": item[1]},
+                                                    f"highlights/{shard_file_name(*item[0])}.{feed_extension()}"),
+                            shard_entries.items())
+        return all(key is not None for key in list(keys))
+
 def process_highlights():
     """
     Main function to fetch and process basketball highlights.
     
     This function orchestrates the workflow of fetching basketball highlights from the API
-    and saving them to an S3 bucket. It first calls 'fetch_highlights' to retrieve the data,
-    and if successful, proceeds to call 'save_to_s3' to store the data in S3.
+    and saving them to an S3 bucket. It fetches every page of every league in LEAGUE_NAMES
+    for each date between START_DATE and END_DATE (see 'iter_shards'), drops the highlights
+    already listed in the seen-id index or repeating another highlight's id or video URL
+    (see 'filters.Deduplicator'), and saves only the new ones, so later stages never
+    re-process a clip. Each (league, date) shard is also saved in full under its partitioned
+    prefix (see 'save_shards'). The index is updated once the new highlights have been saved
+    and recorded in the state store.
+
+    Returns:
+        dict or None: The saved (new) highlights if both steps succeeded; otherwise, None.
     """
     # Print a message indicating the start of the highlights fetching process
-    print("Fetching highlights...")
+    print(f"Fetching {', '.join(LEAGUE_NAMES)} highlights from {START_DATE} to {END_DATE}...")
     
-    # Call the 'fetch_highlights' function to retrieve highlights data from the API
-    highlights = fetch_highlights()
+    # Fetch every page of highlights for each league and date
+    shard_entries = fetch_all_highlights()
     
     # Check if highlights were successfully fetched
-    if highlights:
-        # Print a message indicating the start of the S3 saving process
-        print("Saving highlights to S3...")
-        
-        # Call the 'save_to_s3' function to upload the fetched highlights to S3
-        save_to_s3(highlights, "basketball_highlights")
+    if shard_entries is None:
+        return None
+
+    try:
+        # Make sure the bucket exists, then load the ids of the highlights stored by earlier runs
+        s3 = get_s3_client()
+        ensure_bucket(s3, create=True)
+        seen_ids = load_seen_ids(s3)
+    except Exception as e:
+        print(f"Error loading seen highlight index: {e}")
+        return None
+
+    # Keep only highlights that have not been seen before, dropping repeats of the same clip
+    # Every entry is shown to the deduplicator, so a new id for an already-seen clip is dropped too
+    new_entries = []
+    deduplicator = Deduplicator()
+    for entries in shard_entries.values():
+        for entry in entries:
+            entry_id = highlight_id(entry)
+            duplicate = deduplicator.is_duplicate(entry)
+            if entry_id in seen_ids:
+                continue
+            seen_ids.add(entry_id)
+            if duplicate:
+                print(f"Skipping duplicate highlight: {entry.get('url')}")
+                continue
+            new_entries.append(entry)
+
+    print(f"Fetched {sum(len(entries) for entries in shard_entries.values())} highlights "
+          f"in {len(shard_entries)} shards, {len(new_entries)} are new.")
+    highlights = {"data": new_entries}
+
+    # Print a message indicating the start of the S3 saving process
+    print("Saving highlights to S3...")
+
+    # Save every shard under its partitioned prefix, then the new highlights as the feed for the next stage
+    if not save_shards(shard_entries) or not save_to_s3(highlights, INPUT_KEY):
+        return None
+
+    try:
+        # Record the new highlights so a failed run can resume them later
+        store = get_state_store()
+        for entry in new_entries:
+            store.record(highlight_id(entry), FETCHED, entry=entry)
+        store.flush()
+    except Exception as e:
+        print(f"Error recording pipeline state: {e}")
+        return None
+
+    try:
+        # Remember the new highlights only once they have been saved
+        save_seen_ids(s3, seen_ids)
+    except Exception as e:
+        print(f"Error saving seen highlight index: {e}")
+        return None
+
+    return highlights
 
 # Check if this script is being run as the main program
-# If so, execute the 'process_highlights' function
+# If so, execute the 'process_highlights' function and exit with a non-zero status on failure
 if __name__ == "__main__":
-    process_highlights()
\ No newline at end of file
+    sys.exit(0 if process_highlights() is not None else 1)
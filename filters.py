@@ -0,0 +1,120 @@
+# filters.py
+
+# Import the URL helpers used to normalize video URLs
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    DEDUPE_HIGHLIGHTS,          # Whether repeated highlights are dropped before download
+    DEDUPE_KEEP_QUERY_PARAMS,   # The query parameters that identify a clip
+    MAX_CLIP_SIZE_MB,           # The maximum size (in MiB) of a clip, or 0 for no limit
+    ALLOWED_CONTENT_TYPES       # The content types accepted from video origins
+)
+
+# The ports implied by each scheme, dropped from normalized URLs
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def normalize_url(url, keep_params=DEDUPE_KEEP_QUERY_PARAMS):
+    """
+    Normalize a video URL so that links to the same clip compare equal.
+
+    The scheme and host are lowercased, default ports, fragments and trailing
+    slashes are dropped, and only the query parameters listed in 'keep_params'
+    are kept (sorted), so URLs that differ only by tracking tags, signatures or
+    cache busters normalize to the same string. The result is only used for
+    comparison; clips are always downloaded from their original URL.
+
+    Args:
+        url (str): The video URL.
+        keep_params (list of str, optional): The query parameters that identify a clip.
+            Defaults to DEDUPE_KEEP_QUERY_PARAMS.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name in keep_params)
+    return urlunsplit((scheme, host, parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+class Deduplicator:
+    """
+    Recognizes highlights already seen in this run by id or by normalized video URL.
+
+    The feed often lists the same clip more than once, under another id or with
+    a slightly different URL; only the first occurrence is kept.
+    """
+
+    def __init__(self):
+        self.ids = set()
+        self.urls = set()
+
+    def is_duplicate(self, entry):
+        """
+        Return True if 'entry' repeats a highlight seen before; otherwise, remember it and return False.
+
+        Args:
+            entry (dict): A single highlight entry.
+        """
+        entry_id = entry.get("id")
+        url = normalize_url(entry["url"]) if entry.get("url") else None
+
+        duplicate = (entry_id is not None and str(entry_id) in self.ids) or (url is not None and url in self.urls)
+
+        if entry_id is not None:
+            self.ids.add(str(entry_id))
+        if url is not None:
+            self.urls.add(url)
+        return DEDUPE_HIGHLIGHTS and duplicate
+
+def dedupe(entries):
+    """
+    Yield the highlights of 'entries' that do not repeat an earlier one (see 'Deduplicator').
+
+    Args:
+        entries (iterable of dict): The highlight entries.
+
+    Yields:
+        dict: The first occurrence of every highlight.
+    """
+    deduplicator = Deduplicator()
+    for entry in entries:
+        if deduplicator.is_duplicate(entry):
+            print(f"Skipping duplicate highlight: {entry.get('url')}")
+            continue
+        yield entry
+
+def source_checks_enabled():
+    """
+    Return True if any rule of 'source_rejection' is configured.
+    """
+    return bool(MAX_CLIP_SIZE_MB or ALLOWED_CONTENT_TYPES)
+
+def source_rejection(length, content_type):
+    """
+    Apply the MAX_CLIP_SIZE_MB and ALLOWED_CONTENT_TYPES rules to a clip's response headers.
+
+    The rules are checked against a HEAD response (or the headers of the GET,
+    before its body is read), so rejected clips cost no download, no S3 write
+    and no transcode. A missing header never rejects a clip.
+
+    Args:
+        length (int or None): The clip's Content-Length in bytes.
+        content_type (str or None): The clip's Content-Type header.
+
+    Returns:
+        str or None: Why the clip should be skipped, or None if it passes every rule.
+    """
+    if MAX_CLIP_SIZE_MB and length is not None and length > MAX_CLIP_SIZE_MB * 1024 * 1024:
+        return f"size {length} bytes exceeds {MAX_CLIP_SIZE_MB} MiB"
+
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if ALLOWED_CONTENT_TYPES and media_type and media_type not in ALLOWED_CONTENT_TYPES:
+        return f"content type '{media_type}' is not allowed"
+
+    return None
@@ -0,0 +1,380 @@
+# http_cache.py
+
+# Import the 'json' module for serializing cache entries
+import json
+
+# Import the 'os' module to manage cache files on disk
+import os
+
+# Import the 'time' module to timestamp cache entries
+import time
+
+# Import the 'hashlib' module to derive cache keys from request parameters
+import hashlib
+
+# Import the 'threading' module to guard the shared cache instance
+import threading
+
+# Import the 'atexit' module to save the S3 access times when the process exits
+import atexit
+
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME,          # The name of the S3 bucket used by the 's3' backend
+    HTTP_CACHE_BACKEND,      # Which backend stores the cached responses
+    HTTP_CACHE_DIR,          # The directory used by the 'local' backend
+    HTTP_CACHE_PREFIX,       # The S3 prefix used by the 's3' backend
+    HTTP_CACHE_TTL,          # How long (in seconds) a response is used without revalidation
+    HTTP_CACHE_MAX_ENTRIES,  # The maximum number of cached responses
+    HTTP_CACHE_MAX_MB        # The maximum total size (in MiB) of the cached responses
+)
+
+# Import the shared S3 client and the lookup of objects that may not exist
+from storage import get_s3_client, get_object
+
+# Import the shared HTTP session and the API timeouts
+from http_client import get_http_session, API_TIMEOUT
+
+# Import the run report that counts the requests sent and the responses served from the cache
+from metrics import get_report
+
+class NullCacheBackend:
+    """
+    A cache backend that stores nothing, used when caching is disabled.
+    """
+
+    def load(self, key):
+        return None
+
+    def store(self, key, entry):
+        pass
+
+    def touch(self, key):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def list_entries(self):
+        return []
+
+    def flush(self):
+        pass
+
+class LocalCacheBackend:
+    """
+    A cache backend that keeps one JSON file per entry in a local directory.
+
+    The file modification time records the last use of an entry, so eviction
+    removes the least recently used responses first.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def store(self, key, entry):
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+    def touch(self, key):
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list_entries(self):
+        """
+        Returns:
+            list of tuple: (key, size in bytes, last use timestamp) for every entry.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((name[:-len(".json")], stat.st_size, stat.st_mtime))
+        return entries
+
+    def flush(self):
+        pass
+
+class S3CacheBackend:
+    """
+    A cache backend that keeps one JSON object per entry under a prefix in S3.
+
+    This lets the cache survive across ECS task runs. S3 objects cannot be
+    touched cheaply, so the last use of each entry is kept in memory and saved
+    to one small index object by 'flush()'; eviction then removes the least
+    recently used entries first, as with the local backend.
+    """
+
+    # The object (under the prefix) that records the last use of each entry
+    INDEX_NAME = "access-times.idx"
+
+    def __init__(self, prefix, s3=None):
+        self.prefix = prefix
+        self.s3 = s3 or get_s3_client()
+        self._lock = threading.Lock()
+        self._access = None
+        self._access_changed = False
+
+    def _key(self, key):
+        return f"{self.prefix}{key}.json"
+
+    def _access_times(self):
+        # Read the index on first use; the caller holds the lock
+        if self._access is None:
+            response = get_object(self.s3, f"{self.prefix}{self.INDEX_NAME}")
+            self._access = json.loads(response["Body"].read().decode("utf-8")) if response else {}
+        return self._access
+
+    def load(self, key):
+        response = get_object(self.s3, self._key(key))
+        if response is None:
+            return None
+        return json.loads(response["Body"].read().decode("utf-8"))
+
+    def store(self, key, entry):
+        self.s3.put_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=self._key(key),
+            Body=json.dumps(entry),
+            ContentType="application/json"
+        )
+
+    def touch(self, key):
+        with self._lock:
+            self._access_times()[key] = time.time()
+            self._access_changed = True
+
+    def delete(self, key):
+        self.s3.delete_object(Bucket=S3_BUCKET_NAME, Key=self._key(key))
+        with self._lock:
+            if self._access_times().pop(key, None) is not None:
+                self._access_changed = True
+
+    def list_entries(self):
+        with self._lock:
+            access = dict(self._access_times())
+
+        entries = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(self.prefix):]
+                if name.endswith(".json"):
+                    key = name[:-len(".json")]
+                    last_use = max(obj["LastModified"].timestamp(), access.get(key, 0))
+                    entries.append((key, obj["Size"], last_use))
+        return entries
+
+    def flush(self):
+        """
+        Save the access times recorded since the last flush.
+        """
+        with self._lock:
+            if not self._access_changed:
+                return
+            body = json.dumps(self._access)
+            self._access_changed = False
+
+        self.s3.put_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=f"{self.prefix}{self.INDEX_NAME}",
+            Body=body,
+            ContentType="application/json"
+        )
+
+class ResponseCache:
+    """
+    A TTL cache for JSON API responses with conditional revalidation.
+
+    Responses younger than 'ttl' seconds are served without any request. Older
+    responses are revalidated with 'If-None-Match'/'If-Modified-Since', so an
+    unchanged feed costs a '304 Not Modified' instead of a full response. When
+    the cache grows past 'max_entries' or 'max_bytes', the least recently used
+    entries are evicted. Cache errors never fail a request; they are reported
+    and the API is queried directly.
+
+    The size and last use of every entry are kept in an in-memory index, built
+    from one backend listing the first time an entry is stored, so the limits
+    are checked without listing the backend on every store. Entries written by
+    other processes in the meantime are picked up by the next process.
+    """
+
+    def __init__(self, backend, ttl=HTTP_CACHE_TTL, max_entries=HTTP_CACHE_MAX_ENTRIES,
+                 max_bytes=HTTP_CACHE_MAX_MB * 1024 * 1024):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def cache_key(url, params):
+        """
+        Derive the cache key from the URL and query parameters (headers such as API keys are excluded).
+        """
+        raw = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _load(self, key):
+        try:
+            return self.backend.load(key)
+        except Exception as e:
+            print(f"Warning: could not read response cache: {e}")
+            return None
+
+    def _touch(self, key):
+        try:
+            self.backend.touch(key)
+        except Exception as e:
+            print(f"Warning: could not update response cache: {e}")
+        with self._lock:
+            if self._index is not None and key in self._index:
+                self._index[key][1] = time.time()
+
+    def _save(self, key, entry):
+        try:
+            self.backend.store(key, entry)
+            with self._lock:
+                if self._index is None:
+                    # Build the index once; it already includes the entry just stored
+                    self._index = {name: [size, last_use] for name, size, last_use in self.backend.list_entries()}
+                    self._total_bytes = sum(size for size, _ in self._index.values())
+                size = len(json.dumps(entry).encode("utf-8"))
+                self._total_bytes += size - self._index.get(key, [0, 0])[0]
+                self._index[key] = [size, time.time()]
+                self._evict()
+        except Exception as e:
+            print(f"Warning: could not write response cache: {e}")
+
+    def _evict(self):
+        # Drop the least recently used entries until both limits are respected; the caller holds the lock
+        if len(self._index) <= self.max_entries and self._total_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if len(self._index) <= self.max_entries and self._total_bytes <= self.max_bytes:
+                break
+            self.backend.delete(key)
+            del self._index[key]
+            self._total_bytes -= size
+
+    def flush(self):
+        """
+        Save what the backend keeps in memory (the S3 access times); errors are only reported.
+        """
+        try:
+            self.backend.flush()
+        except Exception as e:
+            print(f"Warning: could not save response cache index: {e}")
+
+    def get_json(self, url, params=None, headers=None, timeout=API_TIMEOUT, limiter=None):
+        """
+        GET a JSON resource, using and refreshing the cache.
+
+        Every request actually sent is counted as 'api_requests' in the run report,
+        and every response served from the cache (fresh or confirmed by a 304) as
+        'api_cache_hits'.
+
+        Args:
+            url (str): The URL to request.
+            params (dict, optional): The query parameters. They are part of the cache key.
+            headers (dict, optional): The request headers. They are not part of the cache key.
+            timeout (optional): The (connect, read) timeouts in seconds. Defaults to API_TIMEOUT.
+            limiter (RateLimiter, optional): Waited on before each request sent to the server;
+                responses served from the cache do not count against it.
+
+        Returns:
+            The parsed JSON response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails and no cached copy can be used.
+        """
+        key = self.cache_key(url, params)
+        entry = self._load(key)
+        now = time.time()
+
+        # Serve fresh entries without contacting the API
+        if entry and now - entry["stored_at"] < self.ttl:
+            print("Using cached API response.")
+            get_report().increment("api_cache_hits")
+            self._touch(key)
+            return json.loads(entry["body"])
+
+        # Ask the API to confirm that a stale entry is still valid
+        request_headers = dict(headers or {})
+        if entry and entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+        if limiter is not None:
+            limiter.acquire()
+        get_report().increment("api_requests")
+        response = get_http_session().get(url, headers=request_headers, params=params, timeout=timeout)
+
+        if response.status_code == 304 and entry:
+            # The cached response is still valid; restart its TTL
+            print("API response not modified, using cached copy.")
+            get_report().increment("api_cache_hits")
+            entry["stored_at"] = now
+            self._save(key, entry)
+            return json.loads(entry["body"])
+
+        # Raise an HTTPError if the HTTP request returned an unsuccessful status code
+        response.raise_for_status()
+
+        # Store the new response together with its validators
+        self._save(key, {
+            "stored_at": now,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "body": response.text
+        })
+        return response.json()
+
+# The process-wide cache, created on first use
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """
+    Return the process-wide response cache configured by HTTP_CACHE_BACKEND.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if HTTP_CACHE_BACKEND == "s3":
+                backend = S3CacheBackend(HTTP_CACHE_PREFIX)
+            elif HTTP_CACHE_BACKEND == "local":
+                backend = LocalCacheBackend(HTTP_CACHE_DIR)
+            else:
+                backend = NullCacheBackend()
+            _cache = ResponseCache(backend)
+
+            # Save the recorded access times once the process is done with the cache
+            atexit.register(_cache.flush)
+        return _cache
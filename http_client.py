@@ -0,0 +1,139 @@
+# http_client.py
+
+# Import the 'threading' module to guard the shared session
+import threading
+
+# Import the 'time' module to refill the rate limiter's tokens
+import time
+
+# Import the 'requests' library for making HTTP requests to external URLs
+import requests
+
+# Import the adapter that pools connections per host
+from requests.adapters import HTTPAdapter
+
+# Import the urllib3 retry policy used by the adapter
+from urllib3.util.retry import Retry
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    HTTP_POOL_SIZE,         # The maximum number of pooled connections per host
+    HTTP_RETRIES,           # The number of retries after a connection error or 429/5xx response
+    HTTP_BACKOFF_FACTOR,    # The base delay of the exponential backoff between retries
+    HTTP_CONNECT_TIMEOUT,   # The timeout (in seconds) for opening a connection
+    HTTP_READ_TIMEOUT,      # The timeout (in seconds) for API responses
+    DOWNLOAD_TIMEOUT,       # The timeout (in seconds) for video origin responses
+    API_RATE_LIMIT,         # The maximum sustained rate (requests per second) of API requests
+    API_RATE_BURST          # The number of API requests that may be sent at once
+)
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# The number of hosts (API, CDNs) whose connection pools are kept
+POOLED_HOSTS = 10
+
+# Connect and read timeouts for the highlights API
+API_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+# Connect and read timeouts for video origins
+DOWNLOAD_TIMEOUTS = (HTTP_CONNECT_TIMEOUT, DOWNLOAD_TIMEOUT)
+
+# The process-wide session, created on first use
+_session = None
+
+# Guards '_session' so worker threads never build duplicate sessions
+_lock = threading.Lock()
+
+# The process-wide API rate limiter, created on first use
+_api_limiter = None
+
+def build_session(pool_size=HTTP_POOL_SIZE, retries=HTTP_RETRIES, backoff_factor=HTTP_BACKOFF_FACTOR):
+    """
+    Build a requests session with pooled keep-alive connections and retries.
+
+    Connections are kept open per host, so the many clips served by the same
+    CDN reuse a few TCP/TLS connections instead of opening one per request.
+    Idempotent requests (GET/HEAD) are retried by urllib3 after connection
+    errors and 429/5xx responses, waiting as long as the server's 'Retry-After'
+    header asks and backing off exponentially otherwise.
+
+    Args:
+        pool_size (int, optional): The maximum connections kept per host. Defaults to HTTP_POOL_SIZE.
+        retries (int, optional): The number of retries per request. Defaults to HTTP_RETRIES.
+        backoff_factor (float, optional): The base backoff delay in seconds. Defaults to HTTP_BACKOFF_FACTOR.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False  # Hand the last response back so 'raise_for_status' reports it
+    )
+    adapter = HTTPAdapter(pool_connections=POOLED_HOSTS, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_http_session():
+    """
+    Return the process-wide HTTP session shared by the API client and video downloads.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = build_session()
+        return _session
+
+class RateLimiter:
+    """
+    A thread-safe token bucket that spaces out requests to respect an API quota.
+
+    The bucket holds up to 'burst' tokens and refills at 'rate' tokens per
+    second. Every request takes one token, waiting for the next one when the
+    bucket is empty, so all threads together never exceed 'rate' requests per
+    second after an initial burst.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, blocking until one is available. Does nothing when 'rate' is 0.
+        """
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+
+            # Sleep outside the lock so other threads can check the bucket too
+            time.sleep(delay)
+
+def get_api_rate_limiter():
+    """
+    Return the process-wide rate limiter shared by every request to the highlights API.
+    """
+    global _api_limiter
+    with _lock:
+        if _api_limiter is None:
+            _api_limiter = RateLimiter(API_RATE_LIMIT, API_RATE_BURST)
+        return _api_limiter
@@ -0,0 +1,159 @@
+# media_probe.py
+
+# Import the 'struct' module to decode the binary MP4 box headers
+import struct
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME  # The name of the Amazon S3 bucket where the clips are stored
+)
+
+# Import the shared S3 helpers
+from storage import head_object
+
+# The largest 'moov' box read into memory; it only holds the clip's index, not its media
+MAX_MOOV_SIZE = 16 * 1024 * 1024
+
+# Boxes inside 'moov' that only group other boxes and must be descended into
+CONTAINER_BOXES = (b"trak", b"mdia")
+
+def _read_range(s3, key, start, length):
+    """
+    Read 'length' bytes of an S3 object starting at 'start'.
+    """
+    response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=key, Range=f"bytes={start}-{start + length - 1}")
+    return response["Body"].read()
+
+def _iter_boxes(data):
+    """
+    Yield (type, payload) for every box in a buffer of consecutive MP4 boxes.
+    """
+    offset = 0
+    while offset + 8 <= len(data):
+        size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header:
+            return
+        yield box_type, data[offset + header:offset + size]
+        offset += size
+
+def _find_moov(s3, key, size):
+    """
+    Walk the top-level boxes of an MP4 object with range reads and return the 'moov' payload.
+
+    Only box headers are read until 'moov' is found, so the probe costs a few
+    small requests whether the index is at the start or at the end of the file.
+    """
+    offset = 0
+    while offset + 8 <= size:
+        header = _read_range(s3, key, offset, 16)
+        box_size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < header_size:
+            return None
+
+        if box_type == b"moov":
+            if box_size > MAX_MOOV_SIZE:
+                return None
+            return _read_range(s3, key, offset + header_size, box_size - header_size)
+
+        offset += box_size
+    return None
+
+def _parse_mvhd(payload):
+    """
+    Return the duration (in seconds) stored in an 'mvhd' box.
+    """
+    version = payload[0]
+    if version == 1:
+        timescale, duration = struct.unpack(">IQ", payload[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", payload[12:20])
+    return duration / timescale if timescale else None
+
+def _parse_tkhd(payload):
+    """
+    Return the (width, height) stored in a 'tkhd' box; they are 16.16 fixed-point numbers at its end.
+    """
+    width, height = struct.unpack(">II", payload[-8:])
+    return width >> 16, height >> 16
+
+def _video_dimensions(moov):
+    """
+    Return the (width, height) of the first video track of a 'moov' payload, or None.
+    """
+    for box_type, trak in _iter_boxes(moov):
+        if box_type != b"trak":
+            continue
+
+        dimensions = None
+        handler = None
+        pending = [trak]
+        while pending:
+            for child_type, child in _iter_boxes(pending.pop()):
+                if child_type == b"tkhd":
+                    dimensions = _parse_tkhd(child)
+                elif child_type == b"hdlr":
+                    # The handler type follows version/flags and 'pre_defined'
+                    handler = child[8:12]
+                elif child_type in CONTAINER_BOXES:
+                    pending.append(child)
+
+        if handler == b"vide" and dimensions and all(dimensions):
+            return dimensions
+    return None
+
+def probe_clip(s3, key):
+    """
+    Read the resolution, duration and average bitrate of an MP4 clip stored in S3.
+
+    Only the clip's 'moov' index is downloaded, using range reads, so probing a
+    large clip costs a few small requests instead of a full download.
+
+    Args:
+        s3: The boto3 S3 client.
+        key (str): The S3 key (path) of the clip.
+
+    Returns:
+        dict or None: The 'width', 'height' (pixels), 'duration' (seconds), 'bitrate'
+            (bits per second) and 'size' (bytes) of the clip, or None if the clip could
+            not be probed. Values missing from the clip are None.
+    """
+    try:
+        head = head_object(s3, key)
+        if head is None:
+            return None
+        size = head["ContentLength"]
+
+        moov = _find_moov(s3, key, size)
+        if moov is None:
+            print(f"Could not find the MP4 index of {key}.")
+            return None
+
+        duration = None
+        for box_type, payload in _iter_boxes(moov):
+            if box_type == b"mvhd":
+                duration = _parse_mvhd(payload)
+                break
+        width, height = _video_dimensions(moov) or (None, None)
+    except Exception as e:
+        print(f"Error probing {key}: {e}")
+        return None
+
+    return {
+        "width": width,
+        "height": height,
+        "duration": duration,
+        "bitrate": int(size * 8 / duration) if duration else None,
+        "size": size
+    }
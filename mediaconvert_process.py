@@ -3,115 +3,592 @@
 # Import the 'json' module for handling JSON data serialization and deserialization
 import json
 
-# Import the 'boto3' library for interacting with AWS services like MediaConvert and S3
-import boto3
+# Import the 'time' module to wait between job status checks
+import time
+
+# Import the 'posixpath' module to split S3 keys into folder and file names
+import posixpath
+
+# Import the 're' module to recognize rendition file names
+import re
+
+# Import the 'sys' module to report failure through the exit status
+import sys
 
 # Import specific configuration variables from the 'config.py' module
 from config import (
-    AWS_REGION,               # AWS region where services are deployed (e.g., 'us-east-1')
-    MEDIACONVERT_ENDPOINT,    # The endpoint URL for AWS MediaConvert service
     MEDIACONVERT_ROLE_ARN,    # The Amazon Resource Name (ARN) for the IAM role used by MediaConvert
-    S3_BUCKET_NAME            # The name of the Amazon S3 bucket used for input/output data
+    S3_BUCKET_NAME,           # The name of the Amazon S3 bucket used for input/output data
+    VIDEO_PREFIX,             # The S3 prefix where downloaded videos are stored
+    PROCESSED_PREFIX,         # The S3 prefix where transcoded videos are written
+    JOB_POLL_INITIAL_DELAY,   # The initial delay (in seconds) between job status checks
+    JOB_POLL_MAX_DELAY,       # The maximum delay (in seconds) between job status checks
+    JOB_POLL_TIMEOUT,         # The maximum time (in seconds) to wait for all jobs
+    OUTPUT_LADDER,            # The renditions (height:maximum bitrate) produced for every clip
+    OUTPUT_FORMAT,            # Whether MP4 files, an HLS playlist or both are written
+    QVBR_QUALITY_LEVEL,       # The QVBR quality level of the renditions
+    ACCELERATION_MIN_DURATION,  # The clip duration from which accelerated transcoding is requested
+    SKIP_UNCHANGED_UPLOADS    # Whether clips that were not re-uploaded are skipped
 )
 
-def create_job():
+# Import the shared AWS client pool
+from aws_clients import get_mediaconvert_client
+
+# Import the shared S3 helpers (cached client, bucket validation)
+from storage import get_s3_client, ensure_bucket
+
+# Import the run report used to record queue and transcode durations
+from metrics import get_report
+
+# Import the MP4 probe used to adapt the job settings to each clip
+from media_probe import probe_clip
+
+# Import the state store that records each highlight's progress through the pipeline
+from state_store import get_state_store, UPLOADED, SUBMITTED, COMPLETE
+
+# MediaConvert job states after which a job will not change anymore
+FINAL_JOB_STATES = ("COMPLETE", "ERROR", "CANCELED")
+
+# The preview assets written next to the renditions (see 'previews.py'); they are not transcoder output
+POSTER_NAME = "poster.jpg"
+SPRITE_NAME = "sprite.jpg"
+PREVIEW_NAME = "preview.mp4"
+
+# The name modifier of an MP4 rendition, e.g. '_720p', or '_source' when the clip could not be probed
+RENDITION_SUFFIX = r"_(\d+p|source)\.mp4"
+
+def parse_ladder(spec=OUTPUT_LADDER):
+    """
+    Parse an output ladder specification such as '1080:6000000,720:3500000'.
+
+    Args:
+        spec (str, optional): Comma-separated 'height:maximum bitrate' pairs. Defaults to OUTPUT_LADDER.
+
+    Returns:
+        list of tuple: (height, maximum bitrate) pairs, tallest first.
     """
-    Create a MediaConvert job to process a video.
-    
-    This function initializes the MediaConvert client, defines the job settings,
-    and submits a job to AWS MediaConvert for processing a video file stored in S3.
+    ladder = []
+    for item in spec.split(","):
+        if item.strip():
+            height, bitrate = item.split(":")
+            ladder.append((int(height), int(bitrate)))
+    return sorted(ladder, reverse=True)
+
+def select_renditions(source, ladder=None):
     """
-    try:
-        # Initialize the MediaConvert client with specified region and endpoint
-        mediaconvert = boto3.client(
-            "mediaconvert",                    # AWS MediaConvert service
-            region_name=AWS_REGION,            # AWS region from configuration
-            endpoint_url=MEDIACONVERT_ENDPOINT  # MediaConvert endpoint URL from configuration
-        )
-
-        # Define the S3 URL for the input video file to be processed
-        input_s3_url = f"s3://{S3_BUCKET_NAME}/videos/first_video.mp4"
-
-        # Define the S3 URL where the processed videos will be saved
-        output_s3_url = f"s3://{S3_BUCKET_NAME}/processed_videos/"
-
-        # Define the job settings for MediaConvert
-        job_settings = {
-            "Inputs": [  # List of input sources for the MediaConvert job
+    Choose the renditions to produce for a clip from its probed properties.
+
+    Renditions taller than the source are dropped, since upscaling only wastes
+    bytes, and every maximum bitrate is capped at the source's own bitrate. The
+    width of each rendition follows the source's aspect ratio. When the source
+    could not be probed, a single rendition at the source resolution is produced.
+
+    Args:
+        source (dict or None): The result of 'media_probe.probe_clip'.
+        ladder (list of tuple, optional): (height, maximum bitrate) pairs. Defaults to OUTPUT_LADDER.
+
+    Returns:
+        list of dict: The 'width', 'height' (None to keep the source size), 'max_bitrate'
+            and output 'name_modifier' of each rendition.
+    """
+    ladder = ladder or parse_ladder()
+
+    if not source or not source.get("width") or not source.get("height"):
+        return [{"width": None, "height": None, "max_bitrate": ladder[0][1], "name_modifier": "_source"}]
+
+    # Never upscale; a source smaller than every rung keeps its own size, rounded down to an even height
+    rungs = [(height, bitrate) for height, bitrate in ladder if height <= source["height"]]
+    if not rungs:
+        rungs = [(max(2, source["height"] // 2 * 2), ladder[-1][1])]
+
+    renditions = []
+    for height, bitrate in rungs:
+        if source.get("bitrate"):
+            bitrate = min(bitrate, source["bitrate"])
+        # H.264 needs even dimensions
+        width = int(round(source["width"] * height / source["height"] / 2)) * 2
+        renditions.append({"width": width, "height": height, "max_bitrate": bitrate,
+                           "name_modifier": f"_{height}p"})
+    return renditions
+
+def acceleration_mode(source):
+    """
+    Return the MediaConvert acceleration mode for a clip.
+
+    Clips of at least ACCELERATION_MIN_DURATION seconds request 'PREFERRED', which
+    uses accelerated transcoding when MediaConvert supports it for the job and
+    falls back to normal transcoding otherwise. Shorter or unprobed clips are
+    transcoded normally.
+    """
+    if source and source.get("duration") and source["duration"] >= ACCELERATION_MIN_DURATION:
+        return "PREFERRED"
+    return "DISABLED"
+
+def _video_description(rendition):
+    """
+    Build the H.264 QVBR video settings of one rendition.
+    """
+    description = {
+        "CodecSettings": {  # Codec configuration for video
+            "Codec": "H_264",  # Video codec to use (H.264)
+            "H264Settings": {  # Specific settings for H.264 codec
+                "RateControlMode": "QVBR",  # Quality-defined variable bitrate: spend bits only where needed
+                "QvbrSettings": {"QvbrQualityLevel": QVBR_QUALITY_LEVEL},  # Target quality level
+                "MaxBitrate": rendition["max_bitrate"],  # Upper bound in bits per second
+                "QualityTuningLevel": "SINGLE_PASS_HQ",  # Quality tuning level
+                "CodecProfile": "MAIN",  # H.264 codec profile
+                "GopSize": 2,  # Keyframe every 2 seconds, so HLS segments can be cut cleanly
+                "GopSizeUnits": "SECONDS"
+            }
+        },
+        "ScalingBehavior": "DEFAULT",  # Behavior for scaling video resolution
+        "TimecodeInsertion": "DISABLED"  # Disable timecode insertion
+    }
+    if rendition["height"]:
+        description["Width"] = rendition["width"]
+        description["Height"] = rendition["height"]
+    return description
+
+def _audio_descriptions():
+    """
+    Build the audio settings shared by every rendition.
+    """
+    return [  # List of audio configurations
+        {
+            "CodecSettings": {  # Codec configuration for audio
+                "Codec": "AAC",  # Audio codec to use (AAC)
+                "AacSettings": {  # Specific settings for AAC codec
+                    "Bitrate": 64000,           # Bitrate in bits per second
+                    "CodingMode": "CODING_MODE_2_0",  # Audio coding mode (2.0 channels)
+                    "SampleRate": 48000        # Audio sample rate in Hz
+                }
+            }
+        }
+    ]
+
+def build_job_settings(input_s3_url, output_s3_url, source=None):
+    """
+    Build the MediaConvert job settings for a single clip.
+
+    One output is produced per rendition chosen by 'select_renditions'. With
+    OUTPUT_FORMAT 'mp4' the renditions are MP4 files, with 'hls' they form an
+    adaptive HLS playlist, and with 'both' both groups are written to the same folder.
+
+    Args:
+        input_s3_url (str): The S3 URL of the source video.
+        output_s3_url (str): The S3 URL (folder) where the transcoded video is written.
+        source (dict, optional): The clip's probed properties (see 'media_probe.probe_clip').
+
+    Returns:
+        dict: The 'Settings' payload for 'mediaconvert.create_job'.
+    """
+    renditions = select_renditions(source)
+    output_groups = []
+
+    if OUTPUT_FORMAT != "hls":
+        output_groups.append({
+            "Name": "File Group",  # Name identifier for the output group
+            "OutputGroupSettings": {  # Settings specific to the output group
+                "Type": "FILE_GROUP_SETTINGS",  # Type of output group
+                "FileGroupSettings": {  # Settings related to file group outputs
+                    "Destination": output_s3_url  # S3 destination URL for processed videos
+                }
+            },
+            "Outputs": [  # One MP4 file per rendition
                 {
-                    "AudioSelectors": {  # Define audio selection settings
-                        "Audio Selector 1": {"DefaultSelection": "DEFAULT"}  # Select default audio track
+                    "NameModifier": rendition["name_modifier"],  # Suffix of the file name, e.g. '_720p'
+                    "ContainerSettings": {  # Container format settings
+                        "Container": "MP4",       # Output container format (MP4)
+                        "Mp4Settings": {}         # Additional MP4-specific settings (empty for defaults)
                     },
-                    "FileInput": input_s3_url,  # Specify the input video file S3 URL
-                    "VideoSelector": {}         # Video selection settings (empty means default)
+                    "VideoDescription": _video_description(rendition),
+                    "AudioDescriptions": _audio_descriptions()
                 }
-            ],
-            "OutputGroups": [  # Define output group settings
+                for rendition in renditions
+            ]
+        })
+
+    if OUTPUT_FORMAT in ("hls", "both"):
+        output_groups.append({
+            "Name": "Apple HLS",  # Name identifier for the output group
+            "OutputGroupSettings": {  # Settings specific to the output group
+                "Type": "HLS_GROUP_SETTINGS",  # Type of output group
+                "HlsGroupSettings": {  # Settings related to HLS outputs
+                    "Destination": output_s3_url,  # S3 destination URL for the playlists and segments
+                    "SegmentLength": 6,            # Target segment duration in seconds
+                    "MinSegmentLength": 0          # Allow a short final segment
+                }
+            },
+            "Outputs": [  # One variant stream per rendition
                 {
-                    "Name": "File Group",  # Name identifier for the output group
-                    "OutputGroupSettings": {  # Settings specific to the output group
-                        "Type": "FILE_GROUP_SETTINGS",  # Type of output group
-                        "FileGroupSettings": {  # Settings related to file group outputs
-                            "Destination": output_s3_url  # S3 destination URL for processed videos
-                        }
+                    "NameModifier": rendition["name_modifier"],  # Suffix of the variant playlist name
+                    "ContainerSettings": {  # Container format settings
+                        "Container": "M3U8",  # Output container format (HLS transport stream)
+                        "M3u8Settings": {}    # Additional M3U8-specific settings (empty for defaults)
                     },
-                    "Outputs": [  # List of output configurations within the output group
-                        {
-                            "ContainerSettings": {  # Container format settings
-                                "Container": "MP4",       # Output container format (MP4)
-                                "Mp4Settings": {}         # Additional MP4-specific settings (empty for defaults)
-                            },
-                            "VideoDescription": {  # Description of video settings
-                                "CodecSettings": {  # Codec configuration for video
-                                    "Codec": "H_264",  # Video codec to use (H.264)
-                                    "H264Settings": {  # Specific settings for H.264 codec
-                                        "Bitrate": 5000000,              # Bitrate in bits per second
-                                        "RateControlMode": "CBR",        # Constant Bit Rate control mode
-                                        "QualityTuningLevel": "SINGLE_PASS",  # Quality tuning level
-                                        "CodecProfile": "MAIN"            # H.264 codec profile
-                                    }
-                                },
-                                "ScalingBehavior": "DEFAULT",  # Behavior for scaling video resolution
-                                "TimecodeInsertion": "DISABLED"  # Disable timecode insertion
-                            },
-                            "AudioDescriptions": [  # List of audio configurations
-                                {
-                                    "CodecSettings": {  # Codec configuration for audio
-                                        "Codec": "AAC",  # Audio codec to use (AAC)
-                                        "AacSettings": {  # Specific settings for AAC codec
-                                            "Bitrate": 64000,           # Bitrate in bits per second
-                                            "CodingMode": "CODING_MODE_2_0",  # Audio coding mode (2.0 channels)
-                                            "SampleRate": 48000        # Audio sample rate in Hz
-                                        }
-                                    }
-                                }
-                            ]
-                        }
-                    ]
+                    "OutputSettings": {"HlsSettings": {}},
+                    "VideoDescription": _video_description(rendition),
+                    "AudioDescriptions": _audio_descriptions()
                 }
+                for rendition in renditions
             ]
-        }
+        })
+
+    return {
+        "Inputs": [  # List of input sources for the MediaConvert job
+            {
+                "AudioSelectors": {  # Define audio selection settings
+                    "Audio Selector 1": {"DefaultSelection": "DEFAULT"}  # Select default audio track
+                },
+                "FileInput": input_s3_url,  # Specify the input video file S3 URL
+                "VideoSelector": {}         # Video selection settings (empty means default)
+            }
+        ],
+        "OutputGroups": output_groups  # Define output group settings
+    }
+
+def list_objects(s3, prefix):
+    """
+    List every object under a prefix in S3.
+
+    Args:
+        s3: The boto3 S3 client used for the listing.
+        prefix (str): The S3 key prefix to list.
+
+    Returns:
+        list of dict: The 'Contents' entries (Key, LastModified, Size, ...) of all objects.
+    """
+    objects = []
+
+    # Use a paginator so slates with more than 1000 clips are listed completely
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=prefix):
+        objects.extend(page.get("Contents", []))
+
+    return objects
+
+def list_clips(s3):
+    """
+    List every downloaded clip under VIDEO_PREFIX in S3.
+
+    Args:
+        s3: The boto3 S3 client used for the listing.
+
+    Returns:
+        list of str: The S3 keys of all '.mp4' objects under VIDEO_PREFIX.
+    """
+    return [obj["Key"] for obj in list_objects(s3, VIDEO_PREFIX) if obj["Key"].lower().endswith(".mp4")]
+
+def is_rendition(name, clip_name):
+    """
+    Return True if 'name' is a rendition of 'clip_name' rather than another file of its output folder.
+
+    Renditions are the MP4 files ('<clip>_720p.mp4') and the HLS master playlist
+    ('<clip>.m3u8'). HLS variant playlists and segments, and the preview assets
+    written by 'previews.py', are not.
+
+    Args:
+        name (str): The file name, without its folder.
+        clip_name (str): The clip name, i.e. the name of its output folder.
+    """
+    return name == f"{clip_name}.m3u8" or re.fullmatch(re.escape(clip_name) + RENDITION_SUFFIX, name) is not None
+
+def list_changed_clips(s3):
+    """
+    List the downloaded clips that are newer than their transcoded outputs.
+
+    Unchanged clips are never re-uploaded (see 'process_one_video.transfer_video'),
+    so a clip whose renditions were written after the clip itself has already
+    been transcoded and can be skipped. Only renditions count (see 'is_rendition'):
+    the preview assets, which 'previews.py' generates from the source clip at any
+    time, and HLS segments do not mark a clip as transcoded.
 
-        # Submit the MediaConvert job with the defined settings and additional parameters
-        response = mediaconvert.create_job(
-            Role=MEDIACONVERT_ROLE_ARN,                 # IAM role ARN that MediaConvert assumes
-            Settings=job_settings,                      # Job settings defined above
-            AccelerationSettings={"Mode": "DISABLED"},  # Disable acceleration settings
-            StatusUpdateInterval="SECONDS_60",           # Interval for status updates (every 60 seconds)
-            Priority=0                                   # Priority of the job (0 is default)
-        )
+    Args:
+        s3: The boto3 S3 client used for the listing.
 
-        # Print a success message indicating the job was created
-        print("MediaConvert job created successfully:")
+    Returns:
+        list of str: The S3 keys of the clips that need a MediaConvert job.
+    """
+    # Find the most recent rendition written for each clip
+    latest_output = {}
+    for obj in list_objects(s3, PROCESSED_PREFIX):
+        prefix, name = posixpath.split(obj["Key"])
+        if not is_rendition(name, posixpath.basename(prefix)):
+            continue
+        prefix = f"{prefix}/"
+        if prefix not in latest_output or obj["LastModified"] > latest_output[prefix]:
+            latest_output[prefix] = obj["LastModified"]
+
+    keys = []
+    for obj in list_objects(s3, VIDEO_PREFIX):
+        if not obj["Key"].lower().endswith(".mp4"):
+            continue
+        output_time = latest_output.get(output_prefix_for(obj["Key"]))
+        if output_time is None or output_time < obj["LastModified"]:
+            keys.append(obj["Key"])
+
+    return keys
+
+def output_prefix_for(key):
+    """
+    Build the per-clip output prefix for a source video key.
+
+    For example, 'videos/abc123.mp4' is transcoded into 'processed_videos/abc123/'.
+
+    Args:
+        key (str): The S3 key of the source video.
+
+    Returns:
+        str: The S3 key prefix (folder) for the clip's transcoded outputs.
+    """
+    # Use the file name without its extension as the clip name
+    clip_name = posixpath.splitext(posixpath.basename(key))[0]
+    return f"{PROCESSED_PREFIX}{clip_name}/"
+
+def submit_job(mediaconvert, key, s3=None):
+    """
+    Submit a MediaConvert job for a single clip.
+
+    The clip is probed first, so the job's renditions and acceleration mode
+    match its resolution, bitrate and duration.
+
+    Args:
+        mediaconvert: The boto3 MediaConvert client.
+        key (str): The S3 key of the source video.
+        s3 (optional): The S3 client used to probe the clip. Defaults to the shared S3 client.
+
+    Returns:
+        str: The id of the created MediaConvert job.
+    """
+    # Define the S3 URLs for the input video and the clip's output folder
+    input_s3_url = f"s3://{S3_BUCKET_NAME}/{key}"
+    output_s3_url = f"s3://{S3_BUCKET_NAME}/{output_prefix_for(key)}"
+
+    # Read the clip's resolution, bitrate and duration from its MP4 index
+    source = probe_clip(s3 or get_s3_client(), key)
+
+    # Submit the MediaConvert job with the clip's settings and additional parameters
+    response = mediaconvert.create_job(
+        Role=MEDIACONVERT_ROLE_ARN,                 # IAM role ARN that MediaConvert assumes
+        Settings=build_job_settings(input_s3_url, output_s3_url, source),  # Job settings for this clip
+        AccelerationSettings={"Mode": acceleration_mode(source)},  # Accelerate long clips only
+        StatusUpdateInterval="SECONDS_60",           # Interval for status updates (every 60 seconds)
+        Priority=0,                                  # Priority of the job (0 is default)
+        UserMetadata={"source_key": key}             # Record the source clip on the job itself
+    )
+
+    return response["Job"]["Id"]
+
+def _job_duration(job):
+    """
+    Compute the wall time (in seconds) between a job's submission and completion.
+
+    Returns:
+        float or None: The duration, or None if MediaConvert did not report timing.
+    """
+    timing = job.get("Timing", {})
+    if "SubmitTime" in timing and "FinishTime" in timing:
+        return (timing["FinishTime"] - timing["SubmitTime"]).total_seconds()
+    return None
+
+def wait_for_jobs(mediaconvert, job_ids, initial_delay=JOB_POLL_INITIAL_DELAY,
+                  max_delay=JOB_POLL_MAX_DELAY, timeout=JOB_POLL_TIMEOUT):
+    """
+    Poll a set of MediaConvert jobs until all of them reach a final state.
+
+    All pending jobs are checked together on every round. The delay between
+    rounds starts at 'initial_delay' and doubles up to 'max_delay', so short
+    jobs are noticed quickly while long ones do not cause a flood of API calls.
+
+    Args:
+        mediaconvert: The boto3 MediaConvert client.
+        job_ids (list of str): The ids of the jobs to wait for.
+        initial_delay (int, optional): The first delay in seconds. Defaults to JOB_POLL_INITIAL_DELAY.
+        max_delay (int, optional): The largest delay in seconds. Defaults to JOB_POLL_MAX_DELAY.
+        timeout (int, optional): The maximum total wait in seconds. Defaults to JOB_POLL_TIMEOUT.
+
+    Returns:
+        dict: The final job description for each job id. Jobs that did not finish
+            before the timeout keep their last known description.
+    """
+    jobs = {}
+    pending = set(job_ids)
+    delay = initial_delay
+    deadline = time.monotonic() + timeout
+
+    while pending:
+        # Check the status of every job that has not finished yet
+        for job_id in list(pending):
+            job = mediaconvert.get_job(Id=job_id)["Job"]
+            jobs[job_id] = job
+            if job["Status"] in FINAL_JOB_STATES:
+                pending.discard(job_id)
+
+        if not pending:
+            break
+
+        # Give up once the overall timeout is reached
+        if time.monotonic() + delay > deadline:
+            print(f"Timed out waiting for {len(pending)} MediaConvert jobs.")
+            break
+
+        # Inform the user and back off before the next round
+        print(f"{len(pending)} MediaConvert jobs still running, checking again in {delay} seconds...")
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+    return jobs
+
+class MediaConvertTranscoder:
+    """
+    Transcodes clips with AWS MediaConvert.
+
+    Transcoders share a small interface, so 'create_job' and the asyncio pipeline
+    can use any backend (see 'transcoders.py'):
+
+    - 'submit(key)' starts transcoding a clip and returns a job id.
+    - 'wait(job_ids)' blocks until the jobs finish and returns a MediaConvert-style
+      job description ('Id', 'Status', 'Timing', 'ErrorMessage') for each id.
+    - 'close()' releases the backend's resources.
+
+    'resumable' tells whether 'wait' accepts the ids of jobs submitted by an earlier run.
+    """
+
+    name = "MediaConvert"
+    resumable = True
+
+    def __init__(self, mediaconvert=None, s3=None):
+        # Reuse the shared clients unless others are given
+        self.mediaconvert = mediaconvert or get_mediaconvert_client()
+        self.s3 = s3 or get_s3_client()
+
+    def submit(self, key):
+        return submit_job(self.mediaconvert, key, self.s3)
+
+    def wait(self, job_ids):
+        return wait_for_jobs(self.mediaconvert, job_ids)
+
+    def close(self):
+        pass
+
+def create_job(mediaconvert=None, s3=None, transcoder=None):
+    """
+    Create one transcode job per downloaded clip and wait for all of them.
+
+    This function discovers every clip under VIDEO_PREFIX, submits a job for each
+    one with its own output folder under PROCESSED_PREFIX, then waits for all jobs
+    together until they finish. With SKIP_UNCHANGED_UPLOADS enabled, clips that
+    have not changed since their last transcode are skipped.
+
+    Jobs are recorded in the state store. Clips whose job was submitted by an
+    earlier run that did not see it finish are awaited instead of submitted again.
+
+    Args:
+        mediaconvert (optional): The MediaConvert client to use. Defaults to the shared client.
+        s3 (optional): The S3 client to use. Defaults to the shared S3 client.
+        transcoder (optional): The transcoder to submit the jobs to. Defaults to a
+            'MediaConvertTranscoder' using 'mediaconvert'.
+
+    Returns:
+        dict or None: A summary with the submitted 'jobs' (id, source key, status and
+            duration) and the 'failed' clips, or None if no jobs could be submitted.
+    """
+    try:
+        # Reuse the shared S3 client to discover the clips
+        s3 = s3 or get_s3_client()
+
+        # Transcode with MediaConvert unless another backend is given
+        transcoder = transcoder or MediaConvertTranscoder(mediaconvert, s3)
+
+        # Validate the bucket once, so permission problems are reported clearly
+        ensure_bucket(s3)
 
-        # Pretty-print the JSON response from MediaConvert
-        print(json.dumps(response, indent=4))
+        # Discover every clip that has been downloaded (and changed since its last transcode)
+        keys = list_changed_clips(s3) if SKIP_UNCHANGED_UPLOADS else list_clips(s3)
+        print(f"Found {len(keys)} clips to transcode under s3://{S3_BUCKET_NAME}/{VIDEO_PREFIX}")
 
+        # Load the progress recorded by earlier runs, indexed by clip key
+        store = get_state_store()
+        records = store.by_video_key()
     except Exception as e:
-        # Catch any exceptions that occur during job creation and print an error message
-        print(f"Error creating MediaConvert job: {e}")
+        # Catch any exceptions that occur during setup and print an error message
+        print(f"Error creating transcode job: {e}")
+        return None
+
+    submitted = {}
+    failed = []
+
+    try:
+        # Submit one job per clip; a rejected clip must not stop the others
+        for key in keys:
+            record = records.get(key, {"id": key})
+
+            # Pick up a job submitted by an earlier run instead of transcoding the clip twice
+            if transcoder.resumable and record.get("state") == SUBMITTED and record.get("job_id"):
+                submitted[record["job_id"]] = key
+                print(f"Resuming {transcoder.name} job {record['job_id']} for {key}")
+                continue
+
+            try:
+                job_id = transcoder.submit(key)
+                submitted[job_id] = key
+                store.record(record["id"], SUBMITTED, video_key=key, job_id=job_id)
+                print(f"{transcoder.name} job {job_id} created for {key}")
+            except Exception as e:
+                print(f"Error creating {transcoder.name} job for {key}: {e}")
+                failed.append({"key": key, "error": str(e)})
+
+        if not submitted:
+            return None if failed else {"jobs": [], "failed": []}
+
+        # Persist the submitted jobs before the (long) wait, so a crash can resume them
+        store.flush()
+
+        # Wait for every submitted job to finish
+        jobs = transcoder.wait(list(submitted))
+    except Exception as e:
+        # Keep the submitted jobs recorded, so the next run waits for them instead of submitting them again
+        print(f"Error waiting for {transcoder.name} jobs: {e}")
+        store.flush()
+        return None
+    finally:
+        transcoder.close()
+
+    # Build the run summary
+    summary = {"jobs": [], "failed": failed}
+    for job_id, key in submitted.items():
+        job = jobs.get(job_id, {})
+        status = job.get("Status", "UNKNOWN")
+        if job:
+            get_report().record_job(job)
+        summary["jobs"].append({
+            "id": job_id,
+            "key": key,
+            "status": status,
+            "duration_seconds": _job_duration(job)
+        })
+        if status != "COMPLETE":
+            failed.append({"key": key, "job_id": job_id, "status": status,
+                           "error": job.get("ErrorMessage")})
+
+        # Finished jobs are done for good; failed ones go back to 'uploaded' for the next run
+        record_id = records.get(key, {"id": key})["id"]
+        if status == "COMPLETE":
+            store.record(record_id, COMPLETE, video_key=key, job_id=job_id, error=None)
+        elif status in FINAL_JOB_STATES:
+            store.record(record_id, UPLOADED, video_key=key, job_id=None, error=job.get("ErrorMessage"))
+
+    # Persist the outcome of the jobs
+    store.flush()
+
+    # Pretty-print the summary
+    print(f"{transcoder.name} jobs finished:")
+    print(json.dumps(summary, indent=4))
+
+    return summary
 
 # Check if this script is being run as the main program
 if __name__ == "__main__":
-    # Call the 'create_job' function to initiate the MediaConvert job
-    create_job()
\ No newline at end of file
+    # Call the 'create_job' function to transcode every downloaded clip
+    # and exit with a non-zero status on failure
+    sys.exit(0 if create_job() is not None else 1)
@@ -0,0 +1,247 @@
+# metrics.py
+
+# Import the 'json' module to serialize the run report and EMF lines
+import json
+
+# Import the 'time' module to measure wall time
+import time
+
+# Import the 'uuid' module to give every run a unique id
+import uuid
+
+# Import the 'threading' module because clips are recorded from worker threads
+import threading
+
+# Import 'contextmanager' to time stages with a 'with' block
+from contextlib import contextmanager
+
+# Import 'datetime' to timestamp the report
+from datetime import datetime, timezone
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME,         # The name of the S3 bucket where reports are uploaded
+    METRICS_REPORT_PATH,    # The local file where the run report is written
+    METRICS_REPORT_PREFIX,  # The S3 prefix where the run report is uploaded
+    METRICS_EMF,            # Whether metrics are printed as CloudWatch EMF lines
+    METRICS_NAMESPACE       # The CloudWatch namespace of the EMF metrics
+)
+
+def _throughput(num_bytes, seconds):
+    """
+    Return the throughput in MB/s, or None if it cannot be computed.
+    """
+    if not num_bytes or not seconds:
+        return None
+    return round(num_bytes / seconds / 1_000_000, 3)
+
+class RunReport:
+    """
+    Collects timings, byte counts and retries for one pipeline run.
+
+    Stages are timed with 'stage()', clips with 'record_clip()', MediaConvert
+    jobs with 'record_job()'. 'to_dict()' turns everything into the JSON run
+    report and 'emit_emf()' prints the same numbers as CloudWatch Embedded
+    Metric Format lines. All methods are safe to call from worker threads.
+    """
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.clips = []
+        self.jobs = []
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a pipeline stage. The stage is marked 'failed' if the block raises.
+        """
+        start = time.monotonic()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            with self._lock:
+                entry = self.stages.setdefault(name, {"seconds": 0.0, "attempts": 0, "retries": 0})
+                entry["seconds"] = round(entry["seconds"] + time.monotonic() - start, 3)
+                entry["attempts"] += 1
+                entry["status"] = status
+
+    def record_retry(self, name):
+        """
+        Count a retry of a stage (e.g. 'fetch') or of an operation (e.g. 'segment').
+        """
+        with self._lock:
+            if name in self.stages:
+                self.stages[name]["retries"] += 1
+            self.counters[f"{name}_retries"] = self.counters.get(f"{name}_retries", 0) + 1
+
+    def increment(self, name, amount=1):
+        """
+        Add to a named counter, e.g. 'api_requests'.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_clip(self, key, seconds, num_bytes, status="uploaded"):
+        """
+        Record the transfer of one clip.
+
+        Args:
+            key (str): The S3 key of the clip.
+            seconds (float): The wall time of the download and upload.
+            num_bytes (int): The number of bytes downloaded.
+            status (str, optional): 'uploaded', 'unchanged', 'skipped' or 'failed'. Defaults to 'uploaded'.
+        """
+        with self._lock:
+            self.clips.append({
+                "key": key,
+                "status": status,
+                "seconds": round(seconds, 3),
+                "bytes": num_bytes,
+                "throughput_mbps": _throughput(num_bytes, seconds)
+            })
+
+    def record_job(self, job):
+        """
+        Record the queue and transcode durations of a finished MediaConvert job.
+
+        Args:
+            job (dict): The job description returned by 'mediaconvert.get_job'.
+        """
+        timing = job.get("Timing", {})
+        submit, start, finish = timing.get("SubmitTime"), timing.get("StartTime"), timing.get("FinishTime")
+        with self._lock:
+            self.jobs.append({
+                "id": job.get("Id"),
+                "status": job.get("Status"),
+                "queue_seconds": (start - submit).total_seconds() if submit and start else None,
+                "transcode_seconds": (finish - start).total_seconds() if start and finish else None
+            })
+
+    def to_dict(self):
+        """
+        Build the machine-readable run report.
+        """
+        with self._lock:
+            transferred = [clip for clip in self.clips if clip["status"] == "uploaded"]
+            total_bytes = sum(clip["bytes"] for clip in transferred)
+            transfer_seconds = self.stages.get("process_videos", self.stages.get("pipeline", {})).get("seconds")
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at.isoformat(),
+                "wall_seconds": round(time.monotonic() - self._start, 3),
+                "stages": dict(self.stages),
+                "clips": list(self.clips),
+                "jobs": list(self.jobs),
+                "counters": dict(self.counters),
+                "totals": {
+                    "clips": len(self.clips),
+                    "clips_uploaded": len(transferred),
+                    "clips_failed": sum(1 for clip in self.clips if clip["status"] == "failed"),
+                    "clips_skipped": sum(1 for clip in self.clips if clip["status"] == "skipped"),
+                    "bytes": total_bytes,
+                    "throughput_mbps": _throughput(total_bytes, transfer_seconds)
+                }
+            }
+
+    def emit_emf(self):
+        """
+        Print the stage and clip metrics as CloudWatch Embedded Metric Format lines.
+        """
+        report = self.to_dict()
+        timestamp = int(time.time() * 1000)
+
+        def emit(dimensions, metrics):
+            print(json.dumps({
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [list(dimensions)],
+                        "Metrics": [{"Name": name, "Unit": unit} for name, (_, unit) in metrics.items()]
+                    }]
+                },
+                "RunId": report["run_id"],
+                **dimensions,
+                **{name: value for name, (value, _) in metrics.items()}
+            }))
+
+        for name, stage in report["stages"].items():
+            emit({"Stage": name}, {
+                "StageDuration": (stage["seconds"], "Seconds"),
+                "StageRetries": (stage["retries"], "Count")
+            })
+
+        totals = report["totals"]
+        emit({"Pipeline": "GameHighlights"}, {
+            "RunDuration": (report["wall_seconds"], "Seconds"),
+            "ClipsUploaded": (totals["clips_uploaded"], "Count"),
+            "ClipsFailed": (totals["clips_failed"], "Count"),
+            "BytesTransferred": (totals["bytes"], "Bytes"),
+            "Throughput": (totals["throughput_mbps"] or 0, "Megabytes/Second")
+        })
+
+        for job in report["jobs"]:
+            if job["queue_seconds"] is not None and job["transcode_seconds"] is not None:
+                emit({"Pipeline": "GameHighlights"}, {
+                    "JobQueueDuration": (job["queue_seconds"], "Seconds"),
+                    "JobTranscodeDuration": (job["transcode_seconds"], "Seconds")
+                })
+
+    def write(self, s3=None):
+        """
+        Write the run report to METRICS_REPORT_PATH and upload it under METRICS_REPORT_PREFIX.
+
+        Failures are reported but never fail the pipeline.
+
+        Args:
+            s3 (optional): The S3 client to upload with. The upload is skipped if not given.
+        """
+        body = json.dumps(self.to_dict(), indent=2, default=str)
+
+        if METRICS_REPORT_PATH:
+            try:
+                with open(METRICS_REPORT_PATH, "w", encoding="utf-8") as f:
+                    f.write(body)
+                print(f"Run report written to {METRICS_REPORT_PATH}")
+            except OSError as e:
+                print(f"Error writing run report: {e}")
+
+        if METRICS_REPORT_PREFIX and s3 is not None:
+            key = f"{METRICS_REPORT_PREFIX}run-{self.run_id}.json"
+            try:
+                s3.put_object(Bucket=S3_BUCKET_NAME, Key=key, Body=body, ContentType="application/json")
+                print(f"Run report saved to S3: s3://{S3_BUCKET_NAME}/{key}")
+            except Exception as e:
+                print(f"Error saving run report to S3: {e}")
+
+        if METRICS_EMF:
+            self.emit_emf()
+
+# The report of the current run, shared by every module in the process
+_report = RunReport()
+
+def get_report():
+    """
+    Return the run report of the current process.
+    """
+    return _report
+
+def reset_report():
+    """
+    Start a new run report, e.g. before a benchmark iteration.
+
+    Returns:
+        RunReport: The new report.
+    """
+    global _report
+    _report = RunReport()
+    return _report
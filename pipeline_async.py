@@ -0,0 +1,298 @@
+# pipeline_async.py
+
+# Import the 'asyncio' module to run the pipeline stages concurrently
+import asyncio
+
+# Import the 'sys' module to report failure through the exit status
+import sys
+
+# Import the thread pool used to run the blocking boto3/requests calls
+from concurrent.futures import ThreadPoolExecutor
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME,         # The name of the S3 bucket used for input/output data
+    INPUT_KEY,              # The S3 key of the feed of new highlights
+    DOWNLOAD_CONCURRENCY,   # The number of highlights downloaded at the same time
+    SUBMIT_CONCURRENCY,     # The number of transcode jobs submitted at the same time
+    PIPELINE_QUEUE_SIZE     # The maximum number of highlights waiting between two stages
+)
+
+# Import the pipeline stages whose building blocks are reused here
+import fetch
+import process_one_video
+import mediaconvert_process
+import transcoders
+
+# Import the shared S3 helpers
+from storage import get_s3_client, ensure_bucket
+
+# Import the run report used to record transcode timings
+from metrics import get_report
+
+# Import the deduplication of repeated highlights
+from filters import Deduplicator
+
+# Import the state store that records each highlight's progress through the pipeline
+from state_store import get_state_store, FETCHED, UPLOADED, SUBMITTED, COMPLETE, SKIPPED
+
+# Marks the end of a queue; one is sent per consumer
+_DONE = None
+
+async def fetch_stage(download_queue, seen_ids, fetched, shard_entries, store, resume=(), done_ids=None):
+    """
+    Fetch the (league, date) shards and queue every new highlight for download as soon as its shard arrives.
+
+    Args:
+        download_queue (asyncio.Queue): The queue feeding the download workers.
+        seen_ids (set of str): The ids of highlights already handled or queued; updated in place.
+        fetched (list): Receives every new highlight entry.
+        shard_entries (dict): Receives every fetched highlight entry, keyed by (league, date).
+        store (StateStore): Records every queued highlight as 'fetched'.
+        resume (list, optional): Highlights fetched by an earlier run, queued before the first page.
+            They are already in the seen-id index, so they are only deduplicated against each other.
+        done_ids (set of str, optional): Receives the ids of dropped duplicates, so they are never fetched again.
+    """
+    deduplicator = Deduplicator()
+    resumed_ids = set()
+
+    async def queue_new(entries, resumed=False):
+        for entry in entries:
+            entry_id = fetch.highlight_id(entry)
+            duplicate = deduplicator.is_duplicate(entry)
+            # A sync fetch records new ids as seen before their downloads run, so resumed
+            # highlights must not be checked against the seen-id index
+            if entry_id in (resumed_ids if resumed else seen_ids) or not entry.get("url"):
+                continue
+            seen_ids.add(entry_id)
+            if resumed:
+                resumed_ids.add(entry_id)
+            if duplicate:
+                print(f"Skipping duplicate highlight: {entry['url']}")
+                if done_ids is not None:
+                    done_ids.add(entry_id)
+                continue
+            fetched.append(entry)
+            store.record(entry_id, FETCHED, entry=entry)
+
+            # Blocks while the download workers are busy (backpressure)
+            await download_queue.put(entry)
+
+    fetched_shards = fetch.iter_shards()
+    try:
+        await queue_new(resume, resumed=True)
+        while True:
+            # Wait for the next shard on a worker thread; None means every shard is done
+            shard = await asyncio.to_thread(next, fetched_shards, None)
+            if shard is None:
+                break
+            league, day, entries = shard
+            shard_entries[(league, day)] = entries
+            await queue_new(entries)
+    finally:
+        # Tell every download worker that no more highlights will arrive
+        for _ in range(DOWNLOAD_CONCURRENCY):
+            await download_queue.put(_DONE)
+
+async def download_worker(s3, download_queue, submit_queue, summary, store):
+    """
+    Download and upload queued highlights, then queue their videos for transcoding.
+    """
+    while True:
+        entry = await download_queue.get()
+        if entry is _DONE:
+            return
+
+        entry_id = fetch.highlight_id(entry)
+        key = process_one_video.video_key_for(entry)
+        try:
+            result = await asyncio.to_thread(process_one_video.transfer_and_record, s3, entry["url"], key)
+        except Exception as e:
+            print(f"Error processing {entry['url']}: {e}")
+            summary["failed"].append({"url": entry["url"], "key": key, "error": str(e)})
+            store.record(entry_id, FETCHED, error=str(e))
+            continue
+
+        summary["done_ids"].add(entry_id)
+        if result["skipped"]:
+            # Rejected clips are not retried by later runs
+            print(f"Video skipped, {result['skipped']}: {entry['url']}")
+            summary["skipped"].append({"url": entry["url"], "key": key, "reason": result["skipped"]})
+            store.record(entry_id, SKIPPED, reason=result["skipped"], error=None)
+            continue
+
+        store.record(entry_id, UPLOADED, video_key=key, unchanged=result["unchanged"], error=None)
+        if result["unchanged"]:
+            print(f"Video unchanged, skipped upload: s3://{S3_BUCKET_NAME}/{key}")
+            summary["unchanged"].append(key)
+            continue
+
+        print(f"Video uploaded successfully: s3://{S3_BUCKET_NAME}/{key}")
+        summary["uploaded"].append(key)
+
+        # Blocks while the submit workers are busy (backpressure)
+        await submit_queue.put((entry_id, key))
+
+async def submit_worker(transcoder, submit_queue, summary, store):
+    """
+    Submit a transcode job for every queued (highlight id, video key) pair.
+    """
+    while True:
+        item = await submit_queue.get()
+        if item is _DONE:
+            return
+
+        entry_id, key = item
+        try:
+            job_id = await asyncio.to_thread(transcoder.submit, key)
+        except Exception as e:
+            print(f"Error creating {transcoder.name} job for {key}: {e}")
+            summary["failed"].append({"key": key, "error": str(e)})
+            continue
+
+        print(f"{transcoder.name} job {job_id} created for {key}")
+        summary["jobs"][job_id] = key
+        summary["job_entries"][job_id] = entry_id
+        store.record(entry_id, SUBMITTED, job_id=job_id)
+
+async def requeue(submit_queue, items):
+    """
+    Queue videos uploaded by an earlier run for transcoding.
+    """
+    for item in items:
+        await submit_queue.put(item)
+
+async def run_pipeline_async():
+    """
+    Run fetch, download/upload and transcode submission as overlapping stages.
+
+    Each highlight moves to the next stage as soon as its previous step is done,
+    so the first transcode starts while later clips are still being fetched or
+    downloaded. Stages are connected by bounded queues of PIPELINE_QUEUE_SIZE, so
+    a slow stage pauses the ones before it instead of letting work pile up.
+    Once every job is submitted, all jobs are awaited together.
+
+    Unfinished work recorded in the state store by an earlier run is resumed:
+    fetched highlights are downloaded, uploaded videos are submitted and
+    submitted jobs are awaited again.
+
+    Returns:
+        dict or None: The 'uploaded', 'unchanged', 'skipped' and 'failed' items and the transcode
+            'jobs' summary, or None if the pipeline could not start.
+    """
+    loop = asyncio.get_running_loop()
+
+    # Size the thread pool so every worker can block on I/O at the same time
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=DOWNLOAD_CONCURRENCY + SUBMIT_CONCURRENCY + 2))
+
+    try:
+        s3 = get_s3_client()
+        transcoder = transcoders.get_transcoder(s3)
+        await asyncio.to_thread(ensure_bucket, s3, create=True)
+        seen_ids = await asyncio.to_thread(fetch.load_seen_ids, s3)
+        store = await asyncio.to_thread(get_state_store)
+    except Exception as e:
+        print(f"Error starting pipeline: {e}")
+        return None
+
+    download_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    submit_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    fetched = []
+    shard_entries = {}
+    summary = {"uploaded": [], "unchanged": [], "skipped": [], "failed": [], "jobs": {}, "job_entries": {}, "done_ids": set()}
+
+    # Collect the work an earlier run left unfinished
+    resume_fetched = [record["entry"] for record in store.in_state(FETCHED) if record.get("entry")]
+    resume_uploaded = [(record["id"], record["video_key"]) for record in store.in_state(UPLOADED)
+                       if record.get("video_key") and not record.get("unchanged")]
+    for record in store.in_state(SUBMITTED):
+        if transcoder.resumable and record.get("job_id"):
+            summary["jobs"][record["job_id"]] = record["video_key"]
+            summary["job_entries"][record["job_id"]] = record["id"]
+        elif record.get("video_key"):
+            resume_uploaded.append((record["id"], record["video_key"]))
+    if resume_fetched or resume_uploaded or summary["jobs"]:
+        print(f"Resuming {len(resume_fetched)} downloads, {len(resume_uploaded)} submissions "
+              f"and {len(summary['jobs'])} jobs from an earlier run.")
+
+    # Start the consumers first so the producer never waits on an idle queue
+    downloaders = [asyncio.create_task(download_worker(s3, download_queue, submit_queue, summary, store))
+                   for _ in range(DOWNLOAD_CONCURRENCY)]
+    submitters = [asyncio.create_task(submit_worker(transcoder, submit_queue, summary, store))
+                  for _ in range(SUBMIT_CONCURRENCY)]
+
+    # Run the producers and wait for the downloads to drain
+    await asyncio.gather(
+        fetch_stage(download_queue, set(seen_ids), fetched, shard_entries, store, resume_fetched,
+                    summary["done_ids"]),
+        requeue(submit_queue, resume_uploaded)
+    )
+    await asyncio.gather(*downloaders)
+
+    # Tell the submit workers that no more videos will arrive, then wait for them
+    for _ in range(SUBMIT_CONCURRENCY):
+        await submit_queue.put(_DONE)
+    await asyncio.gather(*submitters)
+
+    # Record the fetched shards and the new highlights, and remember the ones that made it to S3
+    await asyncio.to_thread(fetch.save_shards, shard_entries)
+    await asyncio.to_thread(fetch.save_to_s3, {"data": fetched}, INPUT_KEY)
+    await asyncio.to_thread(fetch.save_seen_ids, s3, seen_ids | summary["done_ids"])
+
+    # Persist the submitted jobs before the (long) wait, so a crash can resume them
+    await asyncio.to_thread(store.flush)
+
+    # Wait for every submitted job to finish
+    try:
+        jobs = await asyncio.to_thread(transcoder.wait, list(summary["jobs"]))
+    except Exception as e:
+        # The submitted jobs are already saved, so the next run waits for them instead of submitting them again
+        print(f"Error waiting for {transcoder.name} jobs: {e}")
+        return None
+    finally:
+        transcoder.close()
+    for job_id, key in summary["jobs"].items():
+        job = jobs.get(job_id, {"Id": job_id, "Status": "UNKNOWN"})
+        if job_id in jobs:
+            get_report().record_job(job)
+
+        # Report every job that did not complete, like 'mediaconvert_process.create_job' does
+        if job["Status"] != "COMPLETE":
+            summary["failed"].append({"key": key, "job_id": job_id, "status": job["Status"],
+                                      "error": job.get("ErrorMessage")})
+
+        # Finished jobs are done for good; failed ones go back to 'uploaded' for the next run
+        if job["Status"] == "COMPLETE":
+            store.record(summary["job_entries"][job_id], COMPLETE, error=None)
+        elif job["Status"] in mediaconvert_process.FINAL_JOB_STATES:
+            store.record(summary["job_entries"][job_id], UPLOADED, job_id=None, error=job.get("ErrorMessage"))
+    await asyncio.to_thread(store.flush)
+
+    print(f"Pipeline complete: {len(summary['uploaded'])} uploaded, {len(summary['unchanged'])} unchanged, "
+          f"{len(summary['skipped'])} skipped, {len(summary['jobs'])} jobs submitted, "
+          f"{len(summary['failed'])} failed.")
+
+    return {
+        "uploaded": summary["uploaded"],
+        "unchanged": summary["unchanged"],
+        "skipped": summary["skipped"],
+        "failed": summary["failed"],
+        "jobs": [
+            {"id": job_id, "key": key, "status": jobs.get(job_id, {}).get("Status", "UNKNOWN")}
+            for job_id, key in summary["jobs"].items()
+        ]
+    }
+
+def run_pipeline():
+    """
+    Run the asyncio pipeline to completion from synchronous code.
+
+    Returns:
+        dict or None: See 'run_pipeline_async'.
+    """
+    return asyncio.run(run_pipeline_async())
+
+# Check if this script is being run as the main program
+# If so, run the pipeline and exit with a non-zero status on failure
+if __name__ == "__main__":
+    sys.exit(0 if run_pipeline() is not None else 1)
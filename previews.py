@@ -0,0 +1,322 @@
+# previews.py
+
+# Import the 'json' module to read and write the asset index
+import json
+
+# Import the 'os' module to build local file paths
+import os
+
+# Import the 'sys' module to report failure through the exit status
+import sys
+
+# Import the 'shutil' module to check that ffmpeg is installed
+import shutil
+
+# Import the 'tempfile' module for the working directory of each clip
+import tempfile
+
+# Import the 'subprocess' module to run ffmpeg
+import subprocess
+
+# Import the 'posixpath' module to split S3 keys into folder and file names
+import posixpath
+
+# Import 'datetime' to timestamp the asset index
+from datetime import datetime, timezone
+
+# Import the thread pool used to generate the assets of several clips at the same time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME,       # The name of the Amazon S3 bucket used for input/output data
+    VIDEO_PREFIX,         # The S3 prefix where downloaded videos are stored
+    PROCESSED_PREFIX,     # The S3 prefix where transcoded videos are written
+    FFMPEG_PATH,          # The ffmpeg executable
+    TRANSCODE_WORKERS,    # The number of clips processed by ffmpeg at the same time
+    PREVIEW_START,        # Where (in seconds) the poster frame and the preview clip start
+    PREVIEW_SECONDS,      # The length (in seconds) of the preview clip
+    PREVIEW_HEIGHT,       # The height (in pixels) of the preview clip
+    POSTER_WIDTH,         # The width (in pixels) of the poster frame
+    SPRITE_GRID,          # The 'columns x rows' layout of the thumbnail sprite
+    SPRITE_TILE_WIDTH,    # The width (in pixels) of each sprite tile
+    PREVIEW_INDEX_KEY     # The S3 key of the index of every highlight's assets
+)
+
+# Import the shared S3 helpers (cached client, bucket validation, object lookup)
+from storage import get_s3_client, ensure_bucket, get_object
+
+# Import the MP4 probe used to read each clip's duration
+from media_probe import probe_clip
+
+# Import the helpers that locate clips and their transcoded outputs, and the asset file names
+from mediaconvert_process import list_objects, output_prefix_for, is_rendition, POSTER_NAME, SPRITE_NAME, PREVIEW_NAME
+
+# Import the CPU count that honors container limits
+from transcoders import available_cpus
+
+# Import the state store, which maps video keys back to their highlights
+from state_store import get_state_store
+
+# The content type of each asset written to a clip's output folder
+ASSET_CONTENT_TYPES = {POSTER_NAME: "image/jpeg", SPRITE_NAME: "image/jpeg", PREVIEW_NAME: "video/mp4"}
+
+# The time (in seconds) between sprite tiles when a clip's duration is unknown
+DEFAULT_SPRITE_INTERVAL = 10
+
+# How long (in seconds) the presigned URL handed to ffmpeg stays valid
+PRESIGNED_URL_EXPIRY = 3600
+
+def parse_grid(spec=SPRITE_GRID):
+    """
+    Parse a sprite layout such as '5x5' into (columns, rows).
+    """
+    columns, rows = spec.lower().split("x")
+    return int(columns), int(rows)
+
+def asset_commands(input_url, output_dir, duration=None):
+    """
+    Build the ffmpeg commands that produce a clip's poster frame, thumbnail sprite and preview clip.
+
+    The poster and the preview seek straight to their start time, so ffmpeg only
+    reads the bytes it needs from the clip. The sprite decodes keyframes only,
+    one tile every 'duration / tiles' seconds, so it covers the whole clip
+    without decoding every frame.
+
+    Args:
+        input_url (str): The URL (or local path) of the source clip.
+        output_dir (str): The local directory where the assets are written.
+        duration (float, optional): The clip's duration in seconds, if known.
+
+    Returns:
+        tuple: The list of (asset file name, ffmpeg command) pairs and the sprite layout
+            ('columns', 'rows', 'tile_width' and the 'interval' in seconds between tiles).
+    """
+    columns, rows = parse_grid()
+    interval = duration / (columns * rows) if duration else DEFAULT_SPRITE_INTERVAL
+
+    # Start a quarter of the way into short clips; at 0 when the duration is unknown
+    start = min(PREVIEW_START, duration / 4) if duration else 0
+
+    base = [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y"]
+    commands = [
+        (POSTER_NAME, base + [
+            "-ss", f"{start:.3f}", "-i", input_url,
+            "-frames:v", "1", "-vf", f"scale={POSTER_WIDTH}:-2", "-q:v", "3",
+            os.path.join(output_dir, POSTER_NAME)
+        ]),
+        (SPRITE_NAME, base + [
+            "-skip_frame", "nokey", "-i", input_url,
+            "-an", "-frames:v", "1", "-q:v", "5",
+            "-vf", f"fps={1 / interval:.6f},scale={SPRITE_TILE_WIDTH}:-2,tile={columns}x{rows}",
+            os.path.join(output_dir, SPRITE_NAME)
+        ]),
+        (PREVIEW_NAME, base + [
+            "-ss", f"{start:.3f}", "-i", input_url, "-t", f"{PREVIEW_SECONDS:.3f}",
+            "-map", "0:v:0", "-an",
+            "-vf", f"scale=-2:'min(ih,{PREVIEW_HEIGHT})'",
+            "-c:v", "libx264", "-profile:v", "main", "-preset", "veryfast", "-crf", "28",
+            "-pix_fmt", "yuv420p",  # The pixel format every browser can play
+            "-movflags", "+faststart",
+            os.path.join(output_dir, PREVIEW_NAME)
+        ])
+    ]
+    sprite = {"columns": columns, "rows": rows, "tile_width": SPRITE_TILE_WIDTH, "interval": round(interval, 3)}
+    return commands, sprite
+
+def generate_assets(s3, key):
+    """
+    Generate and upload the poster frame, thumbnail sprite and preview clip of one clip.
+
+    ffmpeg reads the clip from S3 through a presigned URL, so nothing is
+    downloaded up front. The assets are uploaded to the clip's output folder,
+    next to its renditions.
+
+    Args:
+        s3: The boto3 S3 client.
+        key (str): The S3 key of the source clip.
+
+    Returns:
+        dict: The S3 keys of the 'poster', 'sprite' and 'preview', the 'sprite_layout'
+            and the clip's 'duration' in seconds (None if unknown).
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+    """
+    source = probe_clip(s3, key)
+    duration = source.get("duration") if source else None
+    input_url = s3.generate_presigned_url("get_object", Params={"Bucket": S3_BUCKET_NAME, "Key": key},
+                                          ExpiresIn=PRESIGNED_URL_EXPIRY)
+    output_prefix = output_prefix_for(key)
+
+    with tempfile.TemporaryDirectory(prefix="previews-") as workdir:
+        commands, sprite = asset_commands(input_url, workdir, duration)
+
+        for name, command in commands:
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"ffmpeg failed on {name} with status {result.returncode}: "
+                                   f"{result.stderr.strip()[-500:]}")
+
+        for name, _ in commands:
+            s3.upload_file(os.path.join(workdir, name), S3_BUCKET_NAME, f"{output_prefix}{name}",
+                           ExtraArgs={"ContentType": ASSET_CONTENT_TYPES[name]})
+
+    return {
+        "poster": f"{output_prefix}{POSTER_NAME}",
+        "sprite": f"{output_prefix}{SPRITE_NAME}",
+        "preview": f"{output_prefix}{PREVIEW_NAME}",
+        "sprite_layout": sprite,
+        "duration": duration
+    }
+
+def list_clips_needing_assets(s3):
+    """
+    List the transcoded clips whose preview assets are missing or older than the clip.
+
+    A clip is only picked once its renditions (see 'mediaconvert_process.is_rendition')
+    are newer than the clip itself, so
+    a clip that was re-downloaded but not transcoded again yet waits for its
+    new renditions instead of getting assets next to stale ones.
+
+    Args:
+        s3: The boto3 S3 client used for the listing.
+
+    Returns:
+        dict: The keys of the rendition files of each clip that needs assets, keyed by clip key.
+    """
+    # Group the transcoded outputs by clip folder
+    outputs = {}
+    for obj in list_objects(s3, PROCESSED_PREFIX):
+        prefix, name = posixpath.split(obj["Key"])
+        outputs.setdefault(f"{prefix}/", {})[name] = obj["LastModified"]
+
+    clips = {}
+    for obj in list_objects(s3, VIDEO_PREFIX):
+        if not obj["Key"].lower().endswith(".mp4"):
+            continue
+        prefix = output_prefix_for(obj["Key"])
+        files = outputs.get(prefix, {})
+        clip_name = posixpath.splitext(posixpath.basename(obj["Key"]))[0]
+        names = [name for name in files if is_rendition(name, clip_name)]
+
+        # Clips that have not been (re)transcoded yet get their assets on a later run
+        if not names or max(files[name] for name in names) < obj["LastModified"]:
+            continue
+        renditions = sorted(f"{prefix}{name}" for name in names)
+        preview_time = files.get(PREVIEW_NAME)
+        if preview_time is None or preview_time < obj["LastModified"]:
+            clips[obj["Key"]] = renditions
+
+    return clips
+
+def update_index(s3, entries):
+    """
+    Merge the assets of the given highlights into the index at PREVIEW_INDEX_KEY.
+
+    The index maps each highlight id to its title, source video key, renditions
+    and preview assets, so a front end can render a grid of highlights from one
+    small JSON file and a few kilobytes of images per tile.
+
+    Args:
+        s3: The boto3 S3 client.
+        entries (dict): The index entries to add or replace, keyed by highlight id.
+    """
+    response = get_object(s3, PREVIEW_INDEX_KEY)
+    if response is None:
+        index = {"highlights": {}}
+    else:
+        index = json.loads(response["Body"].read().decode("utf-8"))
+
+    index["highlights"].update(entries)
+    index["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+    s3.put_object(
+        Bucket=S3_BUCKET_NAME,
+        Key=PREVIEW_INDEX_KEY,
+        Body=json.dumps(index, indent=2),
+        ContentType="application/json"
+    )
+
+def generate_all_previews(s3=None, max_workers=TRANSCODE_WORKERS):
+    """
+    Generate the preview assets of every transcoded clip that lacks them, then update the index.
+
+    Clips are processed by a pool of worker threads, each running ffmpeg, so
+    several clips are handled at the same time. A clip that fails is reported
+    and retried on the next run.
+
+    Args:
+        s3 (optional): The S3 client to use. Defaults to the shared S3 client.
+        max_workers (int, optional): The number of clips processed at the same time.
+            Defaults to TRANSCODE_WORKERS, or one per CPU if that is 0.
+
+    Returns:
+        dict or None: The S3 keys of the clips whose assets were 'generated' and the 'failed' clips,
+            or None if the stage could not run or every clip failed.
+    """
+    try:
+        # Reuse the shared S3 client unless one was provided
+        s3 = s3 or get_s3_client()
+
+        if shutil.which(FFMPEG_PATH) is None:
+            raise RuntimeError(f"ffmpeg executable '{FFMPEG_PATH}' not found")
+
+        # Validate the bucket once, so permission problems are reported clearly
+        ensure_bucket(s3)
+
+        # Find the clips that need assets and the highlights they belong to
+        clips = list_clips_needing_assets(s3)
+        records = get_state_store().by_video_key()
+        print(f"Generating preview assets for {len(clips)} clips...")
+    except Exception as e:
+        print(f"Error generating preview assets: {e}")
+        return None
+
+    generated = []
+    failed = []
+    entries = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers or available_cpus())) as executor:
+        futures = {executor.submit(generate_assets, s3, key): key for key in clips}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                assets = future.result()
+            except Exception as e:
+                # A failed clip must not stop the others; it is retried on the next run
+                print(f"Error generating preview assets for {key}: {e}")
+                failed.append({"key": key, "error": str(e)})
+                continue
+
+            print(f"Preview assets generated for {key}")
+            generated.append(key)
+
+            # Index the clip under its highlight id, or under its file name if the highlight is unknown
+            record = records.get(key, {})
+            highlight_id = record.get("id") or posixpath.splitext(posixpath.basename(key))[0]
+            entries[highlight_id] = {
+                "title": (record.get("entry") or {}).get("title"),
+                "video_key": key,
+                "renditions": clips[key],
+                **assets
+            }
+
+    if entries:
+        try:
+            update_index(s3, entries)
+            print(f"Preview index updated: s3://{S3_BUCKET_NAME}/{PREVIEW_INDEX_KEY}")
+        except Exception as e:
+            print(f"Error updating preview index: {e}")
+            return None
+
+    print(f"Preview assets complete: {len(generated)} generated, {len(failed)} failed.")
+
+    if failed and not generated:
+        return None
+    return {"generated": generated, "failed": failed}
+
+# Check if this script is being run as the main program
+# If so, generate the missing preview assets and exit with a non-zero status on failure
+if __name__ == "__main__":
+    sys.exit(0 if generate_all_previews() is not None else 1)
@@ -3,91 +3,767 @@
 # Import the 'json' module for handling JSON data serialization and deserialization
 import json
 
-# Import the 'boto3' library for interacting with AWS services like S3
-import boto3
+# Import the 'hashlib' module to derive stable S3 keys for highlights without an id
+import hashlib
+
+# Import the 're' module to sanitize highlight ids before using them in S3 keys
+import re
+
+# Import the 'sys' module to report failure through the exit status
+import sys
+
+# Import the 'time' module to pause between segment retries
+import time
 
 # Import the 'requests' library for making HTTP requests to external URLs
 import requests
 
-# Import 'BytesIO' from the 'io' module to handle in-memory binary streams
-from io import BytesIO
+# Import the 'threading' module to bound the number of multipart parts held in memory
+import threading
+
+# Import the 'base64' module to encode part checksums the way S3 expects them
+import base64
+
+# Import the 'itertools' module to chain the feed with the highlights left by earlier runs
+import itertools
+
+# Import the thread pool tools used to download several highlights at the same time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 # Import specific configuration variables from the 'config.py' module
 from config import (
-    S3_BUCKET_NAME,  # The name of the Amazon S3 bucket used for input/output data
-    AWS_REGION,      # The AWS region where the S3 bucket is located
-    INPUT_KEY,       # The S3 key (path) for the input JSON file containing video URLs
-    OUTPUT_KEY       # The S3 key (path) where the processed video will be saved
+    S3_BUCKET_NAME,        # The name of the Amazon S3 bucket used for input/output data
+    OUTPUT_KEY,            # The S3 key (path) where the processed video will be saved
+    VIDEO_PREFIX,          # The S3 prefix where batch-downloaded videos are stored
+    BATCH_MODE,            # Whether every highlight in the feed should be processed
+    DOWNLOAD_CONCURRENCY,  # The maximum number of highlights processed at the same time
+    MULTIPART_PART_SIZE_MB,  # The size (in MiB) of each multipart upload part
+    UPLOAD_CONCURRENCY,    # The maximum number of parts uploaded at the same time per video
+    SKIP_UNCHANGED_UPLOADS,  # Whether uploads of content already in S3 are skipped
+    RANGE_DOWNLOADS,       # Whether large clips are downloaded in parallel byte ranges
+    SEGMENT_RETRIES,       # The number of attempts for each segment of a ranged download
+    DOWNLOAD_STATE_PREFIX  # The S3 prefix where ranged download progress is recorded
 )
 
-def process_one_video():
+# Import the error raised by boto3 when an S3 request fails
+from botocore.exceptions import ClientError
+
+# Import the shared S3 helpers (cached client, bucket validation, object lookup)
+from storage import get_s3_client, ensure_bucket, head_object, get_object
+
+# Import the streaming reader of the highlights feed
+from feed import iter_highlights
+
+# Import the shared HTTP session and the video origin timeouts
+from http_client import get_http_session, DOWNLOAD_TIMEOUTS
+
+# Import the run report used to record per-clip timings
+from metrics import get_report
+
+# Import the pre-download filters (deduplication and source rules)
+from filters import dedupe, source_checks_enabled, source_rejection
+
+# Import the state store that records each highlight's progress through the pipeline
+from state_store import get_state_store, FETCHED, UPLOADED, SKIPPED
+
+# Import the fetch stage, whose 'highlight_id' identifies a highlight across runs
+import fetch
+
+# S3 rejects multipart parts smaller than 5 MiB (except for the last part)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+# The size of each chunk read from the HTTP response stream
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+class RangeNotSupported(Exception):
     """
-    Fetch a highlight URL from the JSON file in S3, download the video,
-    and save it back to S3.
-    
-    This function performs the following steps:
-    1. Connects to the specified S3 bucket.
-    2. Retrieves the input JSON file containing video URLs.
-    3. Extracts the first video URL from the JSON data.
-    4. Downloads the video from the extracted URL.
-    5. Uploads the downloaded video to the specified S3 location.
+    Raised when a video origin ignores a Range request and sends the whole file.
+    """
+
+def video_key_for(highlight):
+    """
+    Build the deterministic S3 key for a highlight's video.
+
+    The key is derived from the highlight id so that re-running the batch
+    overwrites the same object instead of creating duplicates. Highlights
+    without an id fall back to a hash of their URL.
+
+    Args:
+        highlight (dict): A single entry of the highlights 'data' list.
+
+    Returns:
+        str: The S3 key (path) where the highlight's video is stored.
+    """
+    # Prefer the highlight id provided by the API
+    highlight_id = highlight.get("id")
+
+    if highlight_id is None:
+        # Fall back to a short, stable hash of the video URL
+        highlight_id = hashlib.sha1(highlight["url"].encode("utf-8")).hexdigest()[:16]
+
+    # Replace any character that is not safe in an S3 key segment
+    safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", str(highlight_id))
+
+    return f"{VIDEO_PREFIX}{safe_id}.mp4"
+
+def head_existing(s3, key):
+    """
+    Describe an object already stored in S3, including its SHA-256 checksum.
+
+    Args:
+        s3: The boto3 S3 client.
+        key (str): The S3 key (path) to look up.
+
+    Returns:
+        dict or None: The 'head_object' response, or None if the object does not exist.
+    """
+    return head_object(s3, key, ChecksumMode="ENABLED")
+
+def composite_checksum(part_digests):
+    """
+    Combine per-part SHA-256 digests the same way S3 does for multipart objects.
+
+    The result matches the 'ChecksumSHA256' that S3 reports for an object uploaded
+    in parts of the same size, so it can be compared without downloading anything.
+
+    Args:
+        part_digests (list of bytes): The raw SHA-256 digest of each part, in order.
+
+    Returns:
+        str: The base64 checksum of the concatenated digests, suffixed with '-<part count>'.
+    """
+    combined = hashlib.sha256(b"".join(part_digests)).digest()
+    return f"{base64.b64encode(combined).decode('ascii')}-{len(part_digests)}"
+
+def _upload_part(s3, key, upload_id, part_number, data):
     """
+    Upload a single part of a multipart upload, with its SHA-256 checksum.
+
+    Returns:
+        tuple: The part description expected by 'complete_multipart_upload' and the raw part digest.
+    """
+    digest = hashlib.sha256(data).digest()
+    checksum = base64.b64encode(digest).decode("ascii")
+    response = s3.upload_part(
+        Bucket=S3_BUCKET_NAME,   # The target S3 bucket
+        Key=key,                 # The S3 key (path) of the object being assembled
+        UploadId=upload_id,      # The multipart upload this part belongs to
+        PartNumber=part_number,  # The 1-based position of the part in the object
+        Body=data,               # The binary data of the part
+        ChecksumSHA256=checksum  # Lets S3 verify the part and build the object checksum
+    )
+    part = {"PartNumber": part_number, "ETag": response["ETag"], "ChecksumSHA256": checksum}
+    return part, digest
+
+def stream_to_s3(s3, chunks, key, content_type="video/mp4",
+                 part_size=MULTIPART_PART_SIZE_MB * 1024 * 1024, max_workers=UPLOAD_CONCURRENCY,
+                 metadata=None, existing_checksum=None):
+    """
+    Stream an iterable of byte chunks into an S3 multipart upload.
+
+    Chunks are gathered into parts of 'part_size' bytes, and each part is uploaded
+    on a worker thread while the next one is being read. At most 'max_workers'
+    parts are in flight at once, so memory use stays flat regardless of the total
+    size of the stream. The upload is aborted if anything fails, so no partial
+    object or orphaned parts are left behind.
+
+    Every part is hashed while it is uploaded. If the resulting checksum equals
+    'existing_checksum', the content is already in S3 and the upload is aborted
+    instead of completed, so the stored object (and its LastModified) is untouched.
+
+    Args:
+        s3: The boto3 S3 client used for the upload.
+        chunks (iterable of bytes): The data to upload, e.g. 'response.iter_content()'.
+        key (str): The S3 key (path) where the object will be saved.
+        content_type (str, optional): The MIME type of the object. Defaults to 'video/mp4'.
+        part_size (int, optional): The size of each part in bytes. Defaults to MULTIPART_PART_SIZE_MB.
+        max_workers (int, optional): The maximum number of parts uploaded at once.
+            Defaults to UPLOAD_CONCURRENCY.
+        metadata (dict, optional): User metadata stored on the object.
+        existing_checksum (str, optional): The 'ChecksumSHA256' of the object currently stored at 'key'.
+
+    Returns:
+        dict: The number of 'bytes' read, the object's 'checksum', and whether the
+            content was 'unchanged' (in which case nothing was written).
+    """
+    # Never go below the S3 minimum part size
+    part_size = max(part_size, MIN_PART_SIZE)
+    max_workers = max(1, max_workers)
+
+    # Start the multipart upload and remember its id
+    upload_id = s3.create_multipart_upload(
+        Bucket=S3_BUCKET_NAME,
+        Key=key,
+        ContentType=content_type,
+        Metadata=metadata or {},
+        ChecksumAlgorithm="SHA256"
+    )["UploadId"]
+
+    # The semaphore blocks the reader while 'max_workers' parts are still uploading
+    slots = threading.BoundedSemaphore(max_workers)
+    futures = []
+    total_bytes = 0
+
     try:
-        # Initialize the S3 client with the specified AWS region
-        s3 = boto3.client("s3", region_name=AWS_REGION)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            def submit(data):
+                # Stop reading early if an earlier part has already failed
+                for future in futures:
+                    if future.done() and future.exception():
+                        raise future.exception()
+                slots.acquire()
+                future = executor.submit(_upload_part, s3, key, upload_id, len(futures) + 1, data)
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
 
-        # Inform the user that the JSON file retrieval process has started
-        print("Fetching JSON file from S3...")
+            buffer = bytearray()
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                buffer.extend(chunk)
+                total_bytes += len(chunk)
 
-        # Retrieve the JSON file from S3 using the specified bucket and key
-        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=INPUT_KEY)
+                # Hand off every full part as soon as it is available
+                while len(buffer) >= part_size:
+                    submit(bytes(buffer[:part_size]))
+                    del buffer[:part_size]
 
-        # Read the content of the retrieved object and decode it from bytes to a UTF-8 string
-        json_content = response['Body'].read().decode('utf-8')
+            # Upload the remainder (an empty object still needs one part)
+            if buffer or not futures:
+                submit(bytes(buffer))
 
-        # Parse the JSON string into a Python dictionary
-        highlights = json.loads(json_content)
+        # Gather the part descriptions in order; this re-raises any part failure
+        results = [future.result() for future in futures]
+        parts = [part for part, _ in results]
+        checksum = composite_checksum([digest for _, digest in results])
 
-        # Extract the first video URL from the JSON data
-        # Adjust the key path ('["data"][0]["url"]') based on the actual structure of your JSON
-        video_url = highlights["data"][0]["url"]
+        if existing_checksum == checksum:
+            # The same content is already stored; keep the existing object as it is
+            s3.abort_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id)
+            return {"bytes": total_bytes, "checksum": checksum, "unchanged": True}
 
-        # Inform the user about the video URL being processed
-        print(f"Processing video URL: {video_url}")
+        # Assemble the uploaded parts into the final object
+        s3.complete_multipart_upload(
+            Bucket=S3_BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts}
+        )
+    except BaseException:
+        # Discard the uploaded parts so they do not accrue storage charges
+        s3.abort_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id)
+        raise
+
+    return {"bytes": total_bytes, "checksum": checksum, "unchanged": False}
+
+def probe_source(video_url):
+    """
+    Ask a video origin for the size, version and range support of a clip.
+
+    Args:
+        video_url (str): The URL of the video.
+
+    Returns:
+        dict or None: The final 'url' (after redirects), the 'length' in bytes (or None),
+            whether byte 'ranges' are supported, the origin's 'etag' and 'content_type',
+            or None if the origin does not answer HEAD requests.
+    """
+    try:
+        response = get_http_session().head(video_url, allow_redirects=True, timeout=DOWNLOAD_TIMEOUTS)
+    except requests.exceptions.RequestException:
+        return None
 
-        # Inform the user that the video download process has started
-        print("Downloading video...")
+    # Some origins reject HEAD; the caller then falls back to a plain GET
+    if response.status_code >= 400:
+        return None
 
-        # Make a GET request to the video URL to download the video content
-        # 'stream=True' allows streaming the response content
-        video_response = requests.get(video_url, stream=True)
+    length = response.headers.get("Content-Length", "")
+    return {
+        "url": response.url,
+        "length": int(length) if length.isdigit() else None,
+        "ranges": response.headers.get("Accept-Ranges", "").lower() == "bytes",
+        "etag": response.headers.get("ETag"),
+        "content_type": response.headers.get("Content-Type")
+    }
 
+def _resume_key(key):
+    """
+    Return the S3 key of the object that records the multipart upload of an interrupted ranged download.
+
+    The record lives in the bucket rather than on the task's disk, so the next
+    ECS task can resume (or abort) an upload started by a task that was stopped.
+    """
+    return f"{DOWNLOAD_STATE_PREFIX}{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+def _save_resume_state(s3, key, state):
+    s3.put_object(
+        Bucket=S3_BUCKET_NAME,
+        Key=_resume_key(key),
+        Body=json.dumps(state),
+        ContentType="application/json"
+    )
+
+def _clear_resume_state(s3, key):
+    try:
+        s3.delete_object(Bucket=S3_BUCKET_NAME, Key=_resume_key(key))
+    except ClientError as e:
+        # A stale record only costs one failed 'list_parts' on the next attempt
+        print(f"Warning: could not clear the resume state of {key}: {e}")
+
+def _load_resume_state(s3, key, source, part_size):
+    """
+    Find the unfinished multipart upload of an earlier attempt at the same clip.
+
+    The upload is only reused if it was started for the same origin version
+    (ETag and length) with the same part size, so the completed parts line up
+    with the segments still to download.
+
+    Returns:
+        tuple or None: The upload id and a dict mapping each completed part number
+            to its (part description, raw digest), or None if there is nothing to resume.
+    """
+    response = get_object(s3, _resume_key(key))
+    if response is None:
+        return None
+    try:
+        state = json.loads(response["Body"].read().decode("utf-8"))
+    except ValueError:
+        return None
+
+    if (state.get("etag"), state.get("length"), state.get("part_size")) != \
+            (source["etag"], source["length"], part_size):
+        # The origin changed since the last attempt; start over
+        try:
+            s3.abort_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, UploadId=state["upload_id"])
+        except Exception:
+            pass
+        _clear_resume_state(s3, key)
+        return None
+
+    done = {}
+    try:
+        paginator = s3.get_paginator("list_parts")
+        for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Key=key, UploadId=state["upload_id"]):
+            for part in page.get("Parts", []):
+                if not part.get("ChecksumSHA256"):
+                    continue
+                done[part["PartNumber"]] = (
+                    {"PartNumber": part["PartNumber"], "ETag": part["ETag"],
+                     "ChecksumSHA256": part["ChecksumSHA256"]},
+                    base64.b64decode(part["ChecksumSHA256"])
+                )
+    except Exception:
+        # The upload expired or was aborted in the meantime
+        _clear_resume_state(s3, key)
+        return None
+
+    return state["upload_id"], done
+
+def _transfer_segment(s3, url, key, upload_id, part_number, start, end):
+    """
+    Download one byte range of a clip and upload it as one multipart part.
+
+    The segment is retried on its own up to SEGMENT_RETRIES times, so a dropped
+    connection only costs the bytes of this segment.
+
+    Returns:
+        tuple: The part description and raw digest (see '_upload_part').
+    """
+    for attempt in range(1, SEGMENT_RETRIES + 1):
+        try:
+            response = get_http_session().get(url, headers={"Range": f"bytes={start}-{end}"},
+                                              timeout=DOWNLOAD_TIMEOUTS)
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise RangeNotSupported(f"Origin answered a Range request with {response.status_code}")
+            if len(response.content) != end - start + 1:
+                raise requests.exceptions.ContentDecodingError(
+                    f"Segment {part_number} is {len(response.content)} bytes, expected {end - start + 1}"
+                )
+            return _upload_part(s3, key, upload_id, part_number, response.content)
+        except requests.exceptions.RequestException as e:
+            if attempt == SEGMENT_RETRIES:
+                raise
+            get_report().record_retry("segment")
+            print(f"Segment {part_number} of {key} failed ({e}), retrying...")
+            time.sleep(attempt)
+
+def ranged_transfer(s3, source, key, existing_checksum=None,
+                    part_size=MULTIPART_PART_SIZE_MB * 1024 * 1024, max_workers=UPLOAD_CONCURRENCY):
+    """
+    Download a clip in parallel byte ranges, uploading each range as a multipart part.
+
+    Segments use the same size as the parts of 'stream_to_s3', so the resulting
+    object and its checksum are identical to a streamed upload. If the transfer
+    fails, the multipart upload is kept and recorded under DOWNLOAD_STATE_PREFIX;
+    the next attempt reuses the parts already in S3 and downloads only the
+    missing segments.
+
+    Args:
+        s3: The boto3 S3 client used for the upload.
+        source (dict): The origin description returned by 'probe_source'.
+        key (str): The S3 key (path) where the video will be saved.
+        existing_checksum (str, optional): The 'ChecksumSHA256' of the object currently stored at 'key'.
+        part_size (int, optional): The size of each segment in bytes. Defaults to MULTIPART_PART_SIZE_MB.
+        max_workers (int, optional): The maximum number of segments in flight. Defaults to UPLOAD_CONCURRENCY.
+
+    Returns:
+        dict: The number of 'bytes' downloaded by this attempt, the object's 'checksum',
+            and whether the content was 'unchanged' (in which case nothing was written).
+
+    Raises:
+        RangeNotSupported: If the origin ignores Range requests (the upload is then aborted).
+    """
+    part_size = max(part_size, MIN_PART_SIZE)
+    length = source["length"]
+    part_count = (length + part_size - 1) // part_size
+
+    # Continue an interrupted attempt, or start a new multipart upload
+    resumed = _load_resume_state(s3, key, source, part_size)
+    if resumed:
+        upload_id, done = resumed
+        print(f"Resuming {key}: {len(done)}/{part_count} segments already uploaded.")
+    else:
+        upload_id = s3.create_multipart_upload(
+            Bucket=S3_BUCKET_NAME,
+            Key=key,
+            ContentType="video/mp4",
+            Metadata={"source-etag": source["etag"]} if source["etag"] else {},
+            ChecksumAlgorithm="SHA256"
+        )["UploadId"]
+        done = {}
+        _save_resume_state(s3, key, {"upload_id": upload_id, "etag": source["etag"],
+                                 "length": length, "part_size": part_size})
+
+    missing = [n for n in range(1, part_count + 1) if n not in done]
+    downloaded = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {}
+            for n in missing:
+                start = (n - 1) * part_size
+                end = min(length, start + part_size) - 1
+                futures[executor.submit(_transfer_segment, s3, source["url"], key, upload_id, n, start, end)] = (n, end - start + 1)
+
+            for future in as_completed(futures):
+                n, size = futures[future]
+                done[n] = future.result()
+                downloaded += size
+    except RangeNotSupported:
+        # Ranged downloads will never work for this origin; discard the upload
+        s3.abort_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id)
+        _clear_resume_state(s3, key)
+        raise
+
+    # All segments are in S3; combine their checksums in order
+    results = [done[n] for n in range(1, part_count + 1)]
+    checksum = composite_checksum([digest for _, digest in results])
+
+    if existing_checksum == checksum:
+        # The same content is already stored; keep the existing object as it is
+        s3.abort_multipart_upload(Bucket=S3_BUCKET_NAME, Key=key, UploadId=upload_id)
+        _clear_resume_state(s3, key)
+        return {"bytes": downloaded, "checksum": checksum, "unchanged": True}
+
+    # Assemble the uploaded parts into the final object
+    s3.complete_multipart_upload(
+        Bucket=S3_BUCKET_NAME,
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [part for part, _ in results]}
+    )
+    _clear_resume_state(s3, key)
+    return {"bytes": downloaded, "checksum": checksum, "unchanged": False}
+
+def transfer_video(s3, video_url, key):
+    """
+    Download a video from a URL and save it to S3.
+
+    Large clips from origins that support byte ranges are downloaded in parallel
+    segments (see 'ranged_transfer'); anything else is streamed with a single
+    GET. In both cases the body is never held in memory as a whole: data is
+    piped straight into a multipart upload (see 'stream_to_s3').
+
+    With SKIP_UNCHANGED_UPLOADS enabled, a clip already stored at 'key' is left
+    alone when either the origin's ETag matches the one recorded at upload time
+    (checked before any bytes are downloaded) or the downloaded content has the
+    same SHA-256 checksum as the stored object.
+
+    Clips that break the MAX_CLIP_SIZE_MB or ALLOWED_CONTENT_TYPES rules are
+    skipped as soon as the origin's headers arrive (see 'filters.source_rejection').
+
+    Args:
+        s3: The boto3 S3 client used for the upload.
+        video_url (str): The URL of the video to download.
+        key (str): The S3 key (path) where the video will be saved.
+
+    Returns:
+        dict: The number of 'bytes' transferred, whether the clip was 'unchanged',
+            and why it was 'skipped' (None unless a source rule rejected it).
+    """
+    # Look up the stored copy of this clip, if any
+    existing = head_existing(s3, key) if SKIP_UNCHANGED_UPLOADS else None
+    existing_etag = existing.get("Metadata", {}).get("source-etag") if existing else None
+    existing_checksum = existing.get("ChecksumSHA256") if existing else None
+
+    # Ask the origin about the clip before downloading anything
+    source = probe_source(video_url) if RANGE_DOWNLOADS or source_checks_enabled() else None
+
+    if source:
+        # Skip clips that break the size or content type rules
+        reason = source_rejection(source["length"], source["content_type"])
+        if reason:
+            return {"bytes": 0, "unchanged": False, "skipped": reason}
+
+        # Skip the download entirely if the origin still serves the version we stored
+        if existing_etag and source["etag"] == existing_etag:
+            return {"bytes": 0, "unchanged": True, "skipped": None}
+
+        # Download clips larger than one part in parallel segments
+        if source["ranges"] and source["length"] and source["length"] > max(MULTIPART_PART_SIZE_MB * 1024 * 1024, MIN_PART_SIZE):
+            try:
+                result = ranged_transfer(s3, source, key, existing_checksum=existing_checksum)
+                return {"bytes": result["bytes"], "unchanged": result["unchanged"], "skipped": None}
+            except RangeNotSupported as e:
+                print(f"{e}; falling back to a single download for {key}.")
+
+    # Make a GET request to the video URL to download the video content
+    # 'stream=True' allows streaming the response content instead of loading it at once
+    # The shared session reuses keep-alive connections to the origin and retries 429/5xx responses
+    with get_http_session().get(video_url, stream=True, timeout=DOWNLOAD_TIMEOUTS) as video_response:
         # Raise an HTTPError if the HTTP request returned an unsuccessful status code
         video_response.raise_for_status()
 
-        # Read the content of the video response and store it in a BytesIO object
-        # This allows handling the video data in memory without saving it to disk
-        video_data = BytesIO(video_response.content)
+        # Apply the size and content type rules before reading the body
+        length = video_response.headers.get("Content-Length", "")
+        reason = source_rejection(int(length) if length.isdigit() else None,
+                                  video_response.headers.get("Content-Type"))
+        if reason:
+            return {"bytes": 0, "unchanged": False, "skipped": reason}
 
-        # Inform the user that the video upload process has started
-        print("Uploading video to S3...")
+        # Skip the download entirely if the origin still serves the version we stored
+        source_etag = video_response.headers.get("ETag")
+        if existing_etag and source_etag == existing_etag:
+            return {"bytes": 0, "unchanged": True, "skipped": None}
 
-        # Upload the video data to S3 using the specified bucket and key
-        s3.put_object(
-            Bucket=S3_BUCKET_NAME,          # The target S3 bucket where the video will be stored
-            Key=OUTPUT_KEY,                  # The S3 key (path) for the uploaded video
-            Body=video_data,                 # The binary data of the video to upload
-            ContentType="video/mp4"          # The MIME type of the uploaded file
+        # Pipe the response chunks into an S3 multipart upload
+        result = stream_to_s3(
+            s3,
+            video_response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE),
+            key,
+            metadata={"source-etag": source_etag} if source_etag else None,
+            existing_checksum=existing_checksum
         )
+        return {"bytes": result["bytes"], "unchanged": result["unchanged"], "skipped": None}
+
+def transfer_and_record(s3, video_url, key):
+    """
+    Run 'transfer_video' and record its wall time, bytes and outcome in the run report.
+
+    Args:
+        s3: The boto3 S3 client used for the upload.
+        video_url (str): The URL of the video to download.
+        key (str): The S3 key (path) where the video will be saved.
+
+    Returns:
+        dict: The result of 'transfer_video'.
+    """
+    start = time.monotonic()
+    try:
+        result = transfer_video(s3, video_url, key)
+    except Exception:
+        get_report().record_clip(key, time.monotonic() - start, 0, status="failed")
+        raise
+    status = "skipped" if result["skipped"] else "unchanged" if result["unchanged"] else "uploaded"
+    get_report().record_clip(key, time.monotonic() - start, result["bytes"], status=status)
+    return result
+
+def process_one_video(s3=None):
+    """
+    Fetch a highlight URL from the JSON file in S3, download the video,
+    and save it back to S3.
+
+    This function performs the following steps:
+    1. Connects to the specified S3 bucket.
+    2. Opens the input feed containing video URLs.
+    3. Extracts the first video URL from the feed.
+    4. Downloads the video from the extracted URL.
+    5. Uploads the downloaded video to the specified S3 location.
+
+    Args:
+        s3 (optional): The S3 client to use. Defaults to the shared S3 client.
+
+    Returns:
+        str or None: The S3 key of the uploaded video, or None if processing failed.
+    """
+    try:
+        # Reuse the shared S3 client unless one was provided
+        s3 = s3 or get_s3_client()
+
+        # Validate the bucket once, so permission problems are reported clearly
+        ensure_bucket(s3)
+
+        # Inform the user that the feed retrieval process has started
+        print("Fetching highlights feed from S3...")
+
+        # Read only the first highlight of the feed
+        # Adjust the key path ('["url"]') based on the actual structure of your records
+        video_url = next(iter_highlights(s3))["url"]
+
+        # Inform the user about the video URL being processed
+        print(f"Processing video URL: {video_url}")
+
+        # Inform the user that the video download and upload process has started
+        print("Downloading video and uploading to S3...")
+
+        # Download the video and upload it to the fixed output key
+        result = transfer_and_record(s3, video_url, OUTPUT_KEY)
+        if result["skipped"]:
+            print(f"Video skipped: {result['skipped']}")
+            return None
 
         # Inform the user that the video was uploaded successfully, including the S3 URL
         print(f"Video uploaded successfully: s3://{S3_BUCKET_NAME}/{OUTPUT_KEY}")
 
+        # Return the key so callers know the upload succeeded
+        return OUTPUT_KEY
+
     except Exception as e:
         # Catch any exceptions that occur during the process and inform the user
         print(f"Error during video processing: {e}")
 
+        # Return None to indicate that processing failed
+        return None
+
+def process_all_videos(s3=None, max_workers=DOWNLOAD_CONCURRENCY):
+    """
+    Download every highlight in the feed in S3 and save each one back to S3.
+
+    Highlights are transferred concurrently by a bounded pool of worker threads,
+    so the wall-clock time for a full slate is close to that of the slowest clip
+    rather than the sum of all of them. Each clip is stored under a key derived
+    from its highlight id (see 'video_key_for').
+
+    The feed is parsed as it is downloaded (see 'feed.iter_highlights'), and at
+    most twice 'max_workers' highlights are queued at a time, so the first
+    transfer starts on the first record and memory use does not grow with the
+    size of the feed.
+
+    Highlights that repeat an earlier one are dropped (see 'filters.dedupe'),
+    and clips rejected by the size and content type rules are never downloaded.
+
+    Progress is recorded in the state store. Highlights fetched by earlier runs
+    that never reached S3 are retried, and highlights already uploaded are skipped.
+
+    Args:
+        s3 (optional): The S3 client to use. Defaults to the shared S3 client.
+        max_workers (int, optional): The maximum number of concurrent transfers.
+            Defaults to DOWNLOAD_CONCURRENCY.
+
+    Returns:
+        dict or None: A summary with the 'uploaded' and 'unchanged' keys and the 'skipped' and 'failed'
+            highlights, or None if the highlights file could not be read.
+    """
+    try:
+        # Reuse the shared S3 client unless one was provided
+        # boto3 clients are thread-safe, so a single client is shared by all workers
+        s3 = s3 or get_s3_client()
+
+        # Validate the bucket once for the whole batch instead of once per clip
+        ensure_bucket(s3)
+
+        # Inform the user that the feed retrieval process has started
+        print("Fetching highlights feed from S3...")
+
+        # Open the feed in S3; records are parsed as they arrive
+        highlights = iter_highlights(s3)
+
+        # Load the progress recorded by earlier runs
+        store = get_state_store()
+    except Exception as e:
+        # Catch any exceptions that occur while reading the input file and inform the user
+        print(f"Error reading highlights file: {e}")
+        return None
+
+    # Add the highlights that earlier runs fetched but never got into S3, then drop repeats
+    candidates = dedupe(itertools.chain(highlights, [record["entry"] for record in store.in_state(FETCHED)
+                                                     if record.get("entry")]))
+
+    # Inform the user that processing has started
+    print(f"Processing highlights with up to {max_workers} workers...")
+
+    uploaded = []
+    unchanged = []
+    skipped = []
+    failed = []
+
+    def collect(future, entry, key):
+        # Record the outcome of one transfer
+        try:
+            result = future.result()
+        except Exception as e:
+            # A failed clip must not abort the rest of the batch; it stays 'fetched' for the next run
+            print(f"Error processing {entry['url']}: {e}")
+            failed.append({"url": entry["url"], "key": key, "error": str(e)})
+            store.record(fetch.highlight_id(entry), FETCHED, entry=entry, error=str(e))
+            return
+
+        if result["skipped"]:
+            # Rejected clips are not retried by later runs
+            print(f"Video skipped, {result['skipped']}: {entry['url']}")
+            skipped.append({"url": entry["url"], "key": key, "reason": result["skipped"]})
+            store.record(fetch.highlight_id(entry), SKIPPED, entry=entry, reason=result["skipped"], error=None)
+            return
+
+        if result["unchanged"]:
+            print(f"Video unchanged, skipped upload: s3://{S3_BUCKET_NAME}/{key}")
+            unchanged.append(key)
+        else:
+            print(f"Video uploaded successfully: s3://{S3_BUCKET_NAME}/{key}")
+            uploaded.append(key)
+        store.record(fetch.highlight_id(entry), UPLOADED, entry=entry, video_key=key,
+                     unchanged=result["unchanged"], error=None)
+
+    # Run the transfers on a bounded thread pool
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {}
+        queued_ids = set()
+
+        for entry in candidates:
+            # Keep only the entries that carry a video URL and have not been uploaded yet
+            entry_id = fetch.highlight_id(entry)
+            record = store.get(entry_id)
+            if not entry.get("url") or entry_id in queued_ids or (record and record["state"] != FETCHED):
+                continue
+            queued_ids.add(entry_id)
+
+            # Submit the transfer and remember which highlight and key it belongs to
+            key = video_key_for(entry)
+            futures[executor.submit(transfer_and_record, s3, entry["url"], key)] = (entry, key)
+
+            # Wait for a transfer to finish before reading further, so the queue stays bounded
+            if len(futures) >= 2 * max(1, max_workers):
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future, *futures.pop(future))
+
+        # Collect the remaining results as soon as each transfer completes
+        for future in as_completed(futures):
+            collect(future, *futures[future])
+
+    # Persist the progress of the batch
+    store.flush()
+
+    # Print a summary of the batch
+    print(f"Batch complete: {len(uploaded)} uploaded, {len(unchanged)} unchanged, "
+          f"{len(skipped)} skipped, {len(failed)} failed.")
+
+    return {"uploaded": uploaded, "unchanged": unchanged, "skipped": skipped, "failed": failed}
+
 # Check if this script is being run as the main program
-# If so, execute the 'process_one_video' function
+# If so, process every highlight in batch mode, or only the first one otherwise,
+# and exit with a non-zero status on failure
 if __name__ == "__main__":
-    process_one_video()
\ No newline at end of file
+    result = process_all_videos() if BATCH_MODE else process_one_video()
+    sys.exit(0 if result is not None else 1)
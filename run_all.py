@@ -3,104 +3,244 @@
 # Import the 'subprocess' module to run external scripts as subprocesses
 import subprocess
 
-# Import the 'time' module to handle delays between script executions
+# Import the 'time' module to handle delays between retry attempts
 import time
 
+# Import the 'random' module to add jitter to retry delays
+import random
+
 # Import specific configuration variables from the 'config.py' module
 from config import (
     RETRY_COUNT,               # The number of retry attempts for failed scripts
-    RETRY_DELAY,               # The delay (in seconds) between retry attempts
-    WAIT_TIME_BETWEEN_SCRIPTS  # The waiting time (in seconds) between different scripts
+    RETRY_DELAY,               # The base delay (in seconds) between retry attempts
+    RETRY_MAX_DELAY,           # The maximum delay (in seconds) between retry attempts
+    BATCH_MODE,                # Whether process_one_video.py runs in batch mode
+    PIPELINE_MODE,             # Whether stages run in-process or as subprocesses
+    PREVIEW_ASSETS             # Whether poster frames, sprites and preview clips are generated
 )
 
-def run_script(script_name, retries=RETRY_COUNT, delay=RETRY_DELAY):
+# Import the shared S3 client
+from storage import get_s3_client
+
+# Import the run report that records stage timings and retries
+from metrics import get_report
+
+# Import the pipeline stages so they can be called in-process
+import fetch
+import process_one_video
+import transcoders
+import pipeline_async
+import previews
+
+def backoff_delay(attempt, base=RETRY_DELAY, cap=RETRY_MAX_DELAY):
     """
-    Run a script with retry logic and a delay.
-    
-    This function attempts to execute a given Python script using subprocess.
-    If the script fails, it retries the execution up to a specified number of times,
-    waiting for a specified delay between attempts.
-    
+    Compute a jittered exponential backoff delay.
+
+    The delay doubles with every attempt up to 'cap'; half of it is randomized
+    so that retries from concurrent runs do not hit the same service in lockstep.
+
     Args:
-        script_name (str): The name of the Python script to execute.
+        attempt (int): The number of attempts that have failed so far (1 for the first retry).
+        base (int, optional): The delay for the first retry in seconds. Defaults to RETRY_DELAY.
+        cap (int, optional): The largest delay in seconds. Defaults to RETRY_MAX_DELAY.
+
+    Returns:
+        float: The number of seconds to wait before the next attempt.
+    """
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def run_stage(stage_name, action, retries=RETRY_COUNT, delay=RETRY_DELAY):
+    """
+    Run a pipeline stage with retry logic and jittered exponential backoff.
+
+    'action' performs the stage and raises on failure. Every stage only returns
+    once its output has been written, so the next stage can start right away.
+    If the action fails, the stage is retried up to a specified number of times
+    with a growing, randomized delay between attempts.
+
+    Args:
+        stage_name (str): The name of the stage, used in progress messages.
+        action (callable): Runs the stage, raising an exception on failure.
         retries (int, optional): The maximum number of retry attempts. Defaults to RETRY_COUNT.
-        delay (int, optional): The delay in seconds between retry attempts. Defaults to RETRY_DELAY.
-    
+        delay (int, optional): The base delay in seconds between retry attempts. Defaults to RETRY_DELAY.
+
+    Returns:
+        The value returned by 'action'.
+
     Raises:
-        subprocess.CalledProcessError: If the script fails after all retry attempts.
+        Exception: The last error if the stage fails after all retry attempts.
     """
     # Initialize the attempt counter to zero
     attempt = 0
-    
-    # Continue attempting to run the script until the maximum number of retries is reached
+
+    # Continue attempting to run the stage until the maximum number of retries is reached
     while attempt < retries:
         try:
-            # Inform the user that the script is being run, including the current attempt number
-            print(f"Running {script_name} (attempt {attempt + 1}/{retries})...")
-            
-            # Execute the script as a subprocess
-            # 'check=True' ensures that a CalledProcessError is raised if the script exits with a non-zero status
-            subprocess.run(["python", script_name], check=True)
-            
-            # Inform the user that the script completed successfully
-            print(f"{script_name} completed successfully.")
-            
-            # Exit the function if the script ran successfully
-            return
-        except subprocess.CalledProcessError as e:
-            # Inform the user that an error occurred while running the script
-            print(f"Error running {script_name}: {e}")
-            
+            # Inform the user that the stage is being run, including the current attempt number
+            print(f"Running {stage_name} (attempt {attempt + 1}/{retries})...")
+
+            # Run the stage, timing it in the run report
+            with get_report().stage(stage_name):
+                result = action()
+
+            # Inform the user that the stage completed successfully
+            print(f"{stage_name} completed successfully.")
+
+            # Exit the function if the stage ran successfully
+            return result
+        except Exception as e:
+            # Inform the user that an error occurred while running the stage
+            print(f"Error running {stage_name}: {e}")
+
             # Increment the attempt counter
             attempt += 1
-            
+
             # Check if the maximum number of retries has not been reached
             if attempt < retries:
-                # Inform the user that the script will be retried after a delay
-                print(f"Retrying in {delay} seconds...")
-                
-                # Wait for the specified delay before retrying
-                time.sleep(delay)
+                # Count the retry in the run report
+                get_report().record_retry(stage_name)
+
+                # Compute a jittered exponential delay for this attempt
+                wait = backoff_delay(attempt, base=delay)
+
+                # Inform the user that the stage will be retried after a delay
+                print(f"Retrying in {wait:.1f} seconds...")
+
+                # Wait for the computed delay before retrying
+                time.sleep(wait)
             else:
-                # Inform the user that the script has failed after all retry attempts
-                print(f"{script_name} failed after {retries} attempts.")
-                
+                # Inform the user that the stage has failed after all retry attempts
+                print(f"{stage_name} failed after {retries} attempts.")
+
                 # Re-raise the exception to propagate the error
                 raise e
 
-def main():
+def run_script(script_name, retries=RETRY_COUNT, delay=RETRY_DELAY):
+    """
+    Run a script in a separate Python interpreter with retry logic.
+
+    Args:
+        script_name (str): The name of the Python script to execute.
+        retries (int, optional): The maximum number of retry attempts. Defaults to RETRY_COUNT.
+        delay (int, optional): The base delay in seconds between retry attempts. Defaults to RETRY_DELAY.
+
+    Raises:
+        subprocess.CalledProcessError: If the script fails after all retry attempts.
     """
-    Main function to orchestrate the execution of multiple scripts in a pipeline.
-    
-    This function runs a series of Python scripts in a specific order, introducing
-    delays between them to ensure that resources are stabilized before the next script runs.
-    It handles any exceptions that occur during the execution of the scripts.
+    # 'check=True' ensures that a CalledProcessError is raised if the script exits with a non-zero status
+    run_stage(
+        script_name,
+        lambda: subprocess.run(["python", script_name], check=True),
+        retries=retries,
+        delay=delay
+    )
+
+def run_function(stage_name, func, retries=RETRY_COUNT, delay=RETRY_DELAY):
     """
-    try:
-        # Step 1: Run fetch.py
-        run_script("fetch.py")
+    Run a stage function in the current process with retry logic.
+
+    The stage functions report failure by returning None, which is turned into
+    an exception here so that the stage is retried.
+
+    Args:
+        stage_name (str): The name of the stage, used in progress messages.
+        func (callable): The stage function, e.g. 'fetch.process_highlights'.
+        retries (int, optional): The maximum number of retry attempts. Defaults to RETRY_COUNT.
+        delay (int, optional): The base delay in seconds between retry attempts. Defaults to RETRY_DELAY.
+
+    Returns:
+        The value returned by 'func'.
+    """
+    def action():
+        result = func()
+        if result is None:
+            raise RuntimeError(f"{stage_name} reported a failure")
+        return result
+
+    return run_stage(stage_name, action, retries=retries, delay=delay)
+
+def run_in_process():
+    """
+    Run every stage as a direct function call in this process.
+
+    All stages share the process-wide boto3 session and clients from 'aws_clients',
+    so interpreter startup, imports and TLS connections are paid once per run.
+    A stage function only returns once its output has been written, so no
+    output checks are needed between stages.
+    """
+    # Step 1: Fetch the highlights and save them to S3
+    run_function("fetch", fetch.process_highlights)
+
+    # Step 2: Download the videos and upload them to S3
+    if BATCH_MODE:
+        run_function("process_videos", process_one_video.process_all_videos)
+    else:
+        run_function("process_one_video", process_one_video.process_one_video)
+
+    # Step 3: Transcode the videos with the configured backend and wait for the jobs
+    run_function("transcode", transcoders.transcode_all)
+
+    # Step 4: Generate the poster frames, thumbnail sprites and preview clips
+    if PREVIEW_ASSETS:
+        run_function("previews", previews.generate_all_previews)
+
+def run_in_subprocesses():
+    """
+    Run every stage as a separate script, starting each one as soon as the previous one exits.
 
-        # Buffer time between scripts to allow resources to stabilize
-        print("Waiting for resources to stabilize...")
-        time.sleep(WAIT_TIME_BETWEEN_SCRIPTS)
+    Every script writes its output synchronously and exits with a non-zero status
+    on failure, so a successful exit means the next stage can read that output.
+    Polling S3 instead would pass on objects left by earlier runs, and time out
+    on runs that have no new clips.
+    """
+    # Step 1: Run fetch.py to save the highlights to S3
+    run_script("fetch.py")
+
+    # Step 2: Run process_one_video.py to download the videos
+    run_script("process_one_video.py")
 
-        # Step 2: Run process_one_video.py
-        run_script("process_one_video.py")
+    # Step 3: Run transcoders.py, which waits for its jobs to complete
+    run_script("transcoders.py")
 
-        # Buffer time between scripts to allow resources to stabilize
-        print("Waiting for resources to stabilize...")
-        time.sleep(WAIT_TIME_BETWEEN_SCRIPTS)
+    # Step 4: Run previews.py to generate the preview assets of the transcoded clips
+    if PREVIEW_ASSETS:
+        run_script("previews.py")
+
+def main():
+    """
+    Main function to orchestrate the execution of the pipeline stages.
 
-        # Step 3: Run mediaconvert_process.py
-        run_script("mediaconvert_process.py")
+    By default the stages are called in-process (see 'run_in_process'). With
+    PIPELINE_MODE set to 'subprocess', each stage runs as its own script, started
+    as soon as the previous script exits (see 'run_in_subprocesses'). With PIPELINE_MODE set to 'async', every highlight
+    flows through all stages on its own (see 'pipeline_async'). It handles any exceptions that occur during the
+    execution of the stages.
+    """
+    try:
+        # Run the stages in the configured mode
+        if PIPELINE_MODE == "subprocess":
+            run_in_subprocesses()
+        elif PIPELINE_MODE == "async":
+            run_function("pipeline", pipeline_async.run_pipeline)
+            if PREVIEW_ASSETS:
+                run_function("previews", previews.generate_all_previews)
+        else:
+            run_in_process()
 
-        # Inform the user that all scripts have been executed successfully
+        # Inform the user that all stages have been executed successfully
         print("All scripts executed successfully.")
     except Exception as e:
         # Inform the user that the pipeline has failed and provide the error details
         print(f"Pipeline failed: {e}")
+    finally:
+        # Write the run report (and EMF metrics) whether or not the pipeline succeeded
+        try:
+            get_report().write(get_s3_client())
+        except Exception as e:
+            print(f"Error writing run report: {e}")
 
 # Check if this script is being run as the main program
 # If so, execute the 'main' function
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,206 @@
+# state_store.py
+
+# Import the 'json' module to serialize the state records
+import json
+
+# Import the 'os' module to create the directory of the SQLite file
+import os
+
+# Import the 'sqlite3' module for the local state backend
+import sqlite3
+
+# Import the 'threading' module because records are updated from worker threads
+import threading
+
+# Import 'datetime' to timestamp every state change
+from datetime import datetime, timezone
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME,   # The name of the S3 bucket used by the 's3' backend
+    STATE_BACKEND,    # Where the pipeline state is stored
+    STATE_KEY,        # The S3 key used by the 's3' backend
+    STATE_DB_PATH     # The SQLite file used by the 'sqlite' backend
+)
+
+# Import the shared S3 client and the lookup of objects that may not exist
+from storage import get_s3_client, get_object
+
+# The states of a highlight, in the order the pipeline moves it through them.
+# The download is streamed straight into S3, so a clip goes from 'fetched' to 'uploaded' in one step.
+# Clips rejected by the source rules (see 'filters.source_rejection') go from 'fetched' to 'skipped' and stay there.
+FETCHED = "fetched"
+UPLOADED = "uploaded"
+SUBMITTED = "submitted"
+COMPLETE = "complete"
+SKIPPED = "skipped"
+STATES = (FETCHED, UPLOADED, SUBMITTED, COMPLETE, SKIPPED)
+
+class NullStateBackend:
+    """
+    A state backend that stores nothing, used when resuming is disabled.
+    """
+
+    autoflush = False
+
+    def load(self):
+        return {}
+
+    def save(self, records, changed_ids):
+        pass
+
+class SqliteStateBackend:
+    """
+    A state backend that keeps one row per highlight in a local SQLite file.
+
+    Rows are written as soon as they change, so progress survives a crash of
+    the process. The file only outlives the container if it is on a mounted volume.
+    """
+
+    autoflush = True
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS highlights (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+
+    def load(self):
+        rows = self.connection.execute("SELECT id, data FROM highlights").fetchall()
+        return {row_id: json.loads(data) for row_id, data in rows}
+
+    def save(self, records, changed_ids):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO highlights (id, data) VALUES (?, ?)",
+                [(record_id, json.dumps(records[record_id])) for record_id in changed_ids]
+            )
+
+class S3StateBackend:
+    """
+    A state backend that keeps every record in one JSON object in S3.
+
+    This lets a new ECS task pick up where a failed one stopped. The object is
+    rewritten on every flush, which happens at the end of each stage.
+    """
+
+    autoflush = False
+
+    def __init__(self, key, s3=None):
+        self.key = key
+        self.s3 = s3 or get_s3_client()
+
+    def load(self):
+        response = get_object(self.s3, self.key)
+        if response is None:
+            return {}
+        return json.loads(response["Body"].read().decode("utf-8"))
+
+    def save(self, records, changed_ids):
+        self.s3.put_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=self.key,
+            Body=json.dumps(records),
+            ContentType="application/json"
+        )
+
+class StateStore:
+    """
+    The progress of every highlight through the pipeline.
+
+    Each record holds the highlight's 'state' (see STATES), its 'entry' from the
+    API, and whatever the stages learned about it: the 'video_key', the 'job_id'
+    and the last 'error'. Stages record progress as they go and 'flush()' when
+    they finish, so a run that fails halfway leaves a record of what is left to
+    do and the next run resumes from there instead of starting over.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self.records = backend.load()
+
+    def get(self, highlight_id):
+        """
+        Return a copy of a highlight's record, or None if it is unknown.
+        """
+        with self._lock:
+            record = self.records.get(str(highlight_id))
+            return dict(record) if record else None
+
+    def record(self, highlight_id, state, **fields):
+        """
+        Move a highlight to 'state' and update its record with 'fields'.
+
+        Args:
+            highlight_id (str): The highlight id (see 'fetch.highlight_id').
+            state (str): One of STATES.
+            **fields: Values to store on the record, e.g. video_key=... or error=None.
+        """
+        with self._lock:
+            record = self.records.setdefault(str(highlight_id), {"id": str(highlight_id)})
+            record.update(fields)
+            record["state"] = state
+            record["updated_at"] = datetime.now(timezone.utc).isoformat()
+            self._dirty.add(str(highlight_id))
+
+        if self.backend.autoflush:
+            self.flush()
+
+    def in_state(self, *states):
+        """
+        Return copies of the records currently in any of 'states'.
+        """
+        with self._lock:
+            return [dict(record) for record in self.records.values() if record.get("state") in states]
+
+    def by_video_key(self):
+        """
+        Return copies of the records that have a video key, indexed by that key.
+        """
+        with self._lock:
+            return {record["video_key"]: dict(record) for record in self.records.values()
+                    if record.get("video_key")}
+
+    def flush(self):
+        """
+        Persist the records changed since the last flush.
+
+        Failures are reported but never fail the pipeline; the changes stay
+        pending and are retried on the next flush.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            changed_ids, self._dirty = self._dirty, set()
+            snapshot = json.loads(json.dumps(self.records))
+
+        try:
+            self.backend.save(snapshot, changed_ids)
+        except Exception as e:
+            print(f"Warning: could not save pipeline state: {e}")
+            with self._lock:
+                self._dirty |= changed_ids
+
+# The process-wide state store, created on first use
+_store = None
+_store_lock = threading.Lock()
+
+def get_state_store():
+    """
+    Return the process-wide state store configured by STATE_BACKEND.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STATE_BACKEND == "s3":
+                backend = S3StateBackend(STATE_KEY)
+            elif STATE_BACKEND == "sqlite":
+                backend = SqliteStateBackend(STATE_DB_PATH)
+            else:
+                backend = NullStateBackend()
+            _store = StateStore(backend)
+        return _store
@@ -0,0 +1,139 @@
+# storage.py
+
+# Import the 'threading' module to guard the bucket validation cache
+import threading
+
+# Import the error raised by boto3 when an S3 request fails
+from botocore.exceptions import ClientError
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME,  # The name of the Amazon S3 bucket used for input/output data
+    AWS_REGION       # The AWS region where the S3 bucket is located
+)
+
+# Import the shared AWS client pool
+from aws_clients import get_s3_client
+
+# S3 error codes meaning that a bucket or object does not exist
+NOT_FOUND_CODES = ("404", "NoSuchKey", "NoSuchBucket", "NotFound")
+
+# S3 error codes meaning that the caller is not allowed to access a bucket or object
+FORBIDDEN_CODES = ("403", "AccessDenied", "Forbidden")
+
+# The buckets already validated in this process
+_validated_buckets = set()
+
+# Guards '_validated_buckets' so concurrent workers validate a bucket only once
+_bucket_lock = threading.Lock()
+
+class BucketAccessDenied(PermissionError):
+    """
+    Raised when a bucket exists but the current credentials may not access it.
+    """
+
+class BucketNotFound(LookupError):
+    """
+    Raised when a bucket does not exist and was not allowed to be created.
+    """
+
+def error_code(error):
+    """
+    Return the S3 error code of a boto3 ClientError, e.g. 'NoSuchKey' or '403'.
+    """
+    return error.response.get("Error", {}).get("Code", "")
+
+def is_not_found(error):
+    """
+    Return True if a boto3 ClientError means that the bucket or object does not exist.
+    """
+    return isinstance(error, ClientError) and error_code(error) in NOT_FOUND_CODES
+
+def ensure_bucket(s3=None, bucket=S3_BUCKET_NAME, create=False):
+    """
+    Make sure the bucket exists and is accessible, checking S3 at most once per process.
+
+    The result is memoized, so batch processing costs one 'head_bucket' call per
+    run instead of one per object. A missing bucket is created when 'create' is
+    True; a bucket that exists but is not accessible is reported as such instead
+    of being mistaken for a missing one.
+
+    Args:
+        s3 (optional): The S3 client to use. Defaults to the shared S3 client.
+        bucket (str, optional): The bucket to validate. Defaults to S3_BUCKET_NAME.
+        create (bool, optional): Whether to create the bucket if it does not exist. Defaults to False.
+
+    Raises:
+        BucketAccessDenied: If the bucket exists but access is forbidden.
+        BucketNotFound: If the bucket does not exist and 'create' is False.
+    """
+    with _bucket_lock:
+        if bucket in _validated_buckets:
+            return
+
+        s3 = s3 or get_s3_client()
+        try:
+            # Check if the bucket exists and is accessible
+            s3.head_bucket(Bucket=bucket)
+            print(f"Bucket {bucket} exists.")
+        except ClientError as e:
+            if error_code(e) in FORBIDDEN_CODES:
+                raise BucketAccessDenied(f"Access to bucket {bucket} is forbidden: {e}")
+            if error_code(e) not in NOT_FOUND_CODES:
+                raise
+            if not create:
+                raise BucketNotFound(f"Bucket {bucket} does not exist.")
+
+            # If the bucket does not exist, print a message indicating creation
+            print(f"Bucket {bucket} does not exist. Creating...")
+            if AWS_REGION == "us-east-1":
+                # For the 'us-east-1' region, the 'LocationConstraint' is not required
+                s3.create_bucket(Bucket=bucket)
+            else:
+                # For other regions, specify the 'LocationConstraint' during bucket creation
+                s3.create_bucket(
+                    Bucket=bucket,
+                    CreateBucketConfiguration={"LocationConstraint": AWS_REGION}
+                )
+            # Print a success message after creating the bucket
+            print(f"Bucket {bucket} created successfully.")
+
+        _validated_buckets.add(bucket)
+
+def head_object(s3, key, **kwargs):
+    """
+    Describe an object in S3 without raising when it does not exist.
+
+    Args:
+        s3: The boto3 S3 client.
+        key (str): The S3 key (path) to look up.
+        **kwargs: Extra arguments for 'head_object', e.g. ChecksumMode="ENABLED".
+
+    Returns:
+        dict or None: The 'head_object' response, or None if the object does not exist.
+    """
+    try:
+        return s3.head_object(Bucket=S3_BUCKET_NAME, Key=key, **kwargs)
+    except ClientError as e:
+        if is_not_found(e):
+            return None
+        raise
+
+def get_object(s3, key, **kwargs):
+    """
+    Read an object from S3 without raising when it does not exist.
+
+    Args:
+        s3: The boto3 S3 client.
+        key (str): The S3 key (path) to read.
+        **kwargs: Extra arguments for 'get_object', e.g. Range="bytes=0-1023".
+
+    Returns:
+        dict or None: The 'get_object' response, or None if the object does not exist.
+    """
+    try:
+        return s3.get_object(Bucket=S3_BUCKET_NAME, Key=key, **kwargs)
+    except ClientError as e:
+        if is_not_found(e):
+            return None
+        raise
@@ -35,7 +35,12 @@ data "aws_iam_role" "ecsTaskExecutionRole" {
 data "aws_iam_policy_document" "ecs_custom_doc" {
   # 1) S3 Permissions
   statement {
-    actions   = ["s3:GetObject", "s3:PutObject", "s3:CreateBucket", "s3:ListBucket"]
+    actions   = [
+      "s3:GetObject", "s3:PutObject", "s3:CreateBucket", "s3:ListBucket",
+      "s3:DeleteObject",             # Clear finished download state and evict cached API responses
+      "s3:AbortMultipartUpload",     # Discard the parts of failed or unchanged uploads
+      "s3:ListMultipartUploadParts"  # Find the parts an interrupted download already uploaded
+    ]
     effect    = "Allow"
     resources = [
       "arn:aws:s3:::${var.s3_bucket_name}",     # Bucket-level permissions
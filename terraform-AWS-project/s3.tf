@@ -4,4 +4,21 @@ resource "aws_s3_bucket" "highlights" {
   tags = {
     Name        = "GamesHighlights"
   }
-}
\ No newline at end of file
+}
+
+# Abort multipart uploads that were never completed (e.g. a ranged download whose ECS task was stopped
+# and never resumed), so their parts do not accrue storage charges
+resource "aws_s3_bucket_lifecycle_configuration" "highlights" {
+  bucket = aws_s3_bucket.highlights.id
+
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 7
+    }
+  }
+}
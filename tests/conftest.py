@@ -0,0 +1,8 @@
+# conftest.py
+
+# Import the 'os' and 'sys' modules to make the pipeline modules importable from the tests
+import os
+import sys
+
+# The pipeline modules live at the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
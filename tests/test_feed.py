@@ -0,0 +1,66 @@
+# test_feed.py
+
+# Import the 'json' module to build the expected results
+import json
+
+# Import 'pytest' to parametrize the documents
+import pytest
+
+# Import the incremental JSON array parser
+from feed import iter_json_array
+
+# Documents whose items can be split anywhere: numbers, literals, strings (with escapes and
+# non-ASCII characters), nested objects and arrays, and whitespace between the items
+DOCUMENTS = [
+    '{"data": [1500.0, -2]}',
+    '{"data": [1e3, -0.25, 12345678901234567890, 3.5E-2]}',
+    '{"data": [true, false, null, 7]}',
+    '{"data": [ "a, b]", "caf\\u00e9 \\"q\\"", "éè中" ] }',
+    '{"meta": {"count": 3}, "data": [{"id": 1, "url": "https://x/1.mp4", "size": 1500.5},'
+    ' {"id": 2, "tags": [1, 2.0, "x"]}, 42 , "end"]}',
+    '{"data": []}'
+]
+
+def split_into(doc, size):
+    """
+    Split the UTF-8 bytes of 'doc' into chunks of 'size' bytes.
+    """
+    raw = doc.encode("utf-8")
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+@pytest.mark.parametrize("doc", DOCUMENTS)
+def test_every_chunk_size(doc):
+    expected = json.loads(doc)["data"]
+    for size in range(1, len(doc.encode("utf-8")) + 1):
+        assert list(iter_json_array(split_into(doc, size))) == expected, f"chunk size {size}"
+
+@pytest.mark.parametrize("doc", DOCUMENTS)
+def test_every_split_offset(doc):
+    expected = json.loads(doc)["data"]
+    raw = doc.encode("utf-8")
+    for offset in range(len(raw) + 1):
+        assert list(iter_json_array([raw[:offset], raw[offset:]])) == expected, f"split at {offset}"
+
+def test_missing_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"other": [1, 2]}']))
+
+def test_unterminated_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array(split_into('{"data": [1, 2', 1)))
+
+@pytest.mark.parametrize("key", ["highlights/test_feed.json", "highlights/test_feed.ndjson"])
+def test_feed_is_read_in_the_format_it_was_written(key):
+    # Write and read the feed through the in-memory S3 of the benchmark, whatever HIGHLIGHTS_FORMAT is
+    pytest.importorskip("boto3")
+    import aws_clients
+    import fetch
+    from benchmark import FakeS3
+    from feed import iter_highlights
+
+    s3 = FakeS3()
+    aws_clients.set_client("s3", s3)
+    entries = [{"id": 1, "url": "https://x/1.mp4"}, {"id": 2, "url": "https://x/2.mp4"}]
+
+    assert fetch.save_to_s3({"data": entries}, key) == key
+    assert list(iter_highlights(s3, key)) == entries
@@ -0,0 +1,51 @@
+# test_pipeline_async.py
+
+# Import 'pytest' to skip the test when the AWS SDK is not installed
+import pytest
+
+pytest.importorskip("boto3")
+
+# Import the local stand-ins for the API, the video origin, S3 and MediaConvert
+from benchmark import FakeOrigin, FakeS3, FakeMediaConvert, start_origin, load_pipeline
+
+def test_async_run_resumes_highlights_fetched_by_a_sync_run():
+    origin = FakeOrigin(clips=2, clip_bytes=64 * 1024, latency=0, failure_rate=0)
+    server = start_origin(origin)
+    try:
+        modules = load_pipeline({
+            "API_URL": f"{origin.base_url}/highlights",
+            "RAPIDAPI_KEY": "test",
+            "S3_BUCKET_NAME": "test-bucket",
+            "HTTP_CACHE_BACKEND": "none",
+            "STATE_BACKEND": "s3",
+            "TRANSCODER_BACKEND": "mediaconvert",
+            "JOB_POLL_INITIAL_DELAY": "1",
+            "METRICS_REPORT_PATH": "",
+            "METRICS_REPORT_PREFIX": ""
+        })
+        s3 = FakeS3()
+        modules["aws_clients"].set_client("s3", s3)
+        modules["aws_clients"].set_client("mediaconvert", FakeMediaConvert(s3, "test-bucket", transcode_seconds=0))
+        process_one_video = modules["process_one_video"]
+
+        # A sync run fetches both highlights (marking them as seen), then every download fails
+        assert modules["fetch"].process_highlights() is not None
+        def offline(*args, **kwargs):
+            raise OSError("origin offline")
+
+        transfer = process_one_video.transfer_and_record
+        process_one_video.transfer_and_record = offline
+        try:
+            process_one_video.process_all_videos()
+        finally:
+            process_one_video.transfer_and_record = transfer
+        assert not any(key.startswith("videos/") for key in s3.objects)
+
+        # The next run is async and starts from the state saved in S3
+        modules["state_store"]._store = None
+        summary = modules["pipeline_async"].run_pipeline()
+    finally:
+        server.shutdown()
+
+    assert sorted(summary["uploaded"]) == ["videos/clip0.mp4", "videos/clip1.mp4"]
+    assert summary["failed"] == []
@@ -0,0 +1,261 @@
+# transcoders.py
+
+# Import the 'os' module to count the CPUs available to the container
+import os
+
+# Import the 'sys' module to report failure through the exit status
+import sys
+
+# Import the 'math' module to round CPU quotas up
+import math
+
+# Import the 'time' module to enforce the overall wait timeout
+import time
+
+# Import the 'shutil' module to check that ffmpeg is installed
+import shutil
+
+# Import the 'itertools' module to number local transcode jobs
+import itertools
+
+# Import the 'tempfile' module for the working directory of each local transcode
+import tempfile
+
+# Import the 'subprocess' module to run ffmpeg
+import subprocess
+
+# Import the 'posixpath' module to build output keys from clip keys
+import posixpath
+
+# Import the 'multiprocessing' module to start transcode workers with a clean interpreter
+import multiprocessing
+
+# Import 'datetime' to report MediaConvert-style job timings
+from datetime import datetime, timezone
+
+# Import the process pool used to transcode several clips at the same time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Import specific configuration variables from the 'config.py' module
+from config import (
+    S3_BUCKET_NAME,       # The name of the Amazon S3 bucket used for input/output data
+    TRANSCODER_BACKEND,   # Which backend transcodes the clips
+    TRANSCODE_WORKERS,    # The number of clips transcoded at the same time by ffmpeg
+    FFMPEG_PATH,          # The ffmpeg executable
+    QVBR_QUALITY_LEVEL,   # The QVBR quality level, mapped to an x264 CRF
+    JOB_POLL_TIMEOUT      # The maximum time (in seconds) to wait for all jobs
+)
+
+# Import the shared S3 client
+from storage import get_s3_client
+
+# Import the MP4 probe used to pick the renditions of each clip
+from media_probe import probe_clip
+
+# Import the MediaConvert backend and the helpers shared by every backend
+from mediaconvert_process import MediaConvertTranscoder, create_job, output_prefix_for, select_renditions
+
+def available_cpus():
+    """
+    Return the number of CPUs this process may use, honoring container CPU limits.
+
+    ECS and Docker limit CPUs with a cgroup quota rather than CPU affinity, so the
+    quota is read as well and the smaller of both counts is used.
+    """
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+
+    # cgroup v2 stores '<quota> <period>' (or 'max <period>'); cgroup v1 uses two files
+    quota = period = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as f:
+            values = f.read().split()
+        if values[0] != "max":
+            quota, period = int(values[0]), int(values[1])
+    except (OSError, ValueError, IndexError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", encoding="utf-8") as f:
+                quota = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", encoding="utf-8") as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            pass
+
+    if quota and period and quota > 0:
+        count = min(count, math.ceil(quota / period))
+    return max(1, count)
+
+def ffmpeg_command(input_path, output_dir, clip_name, renditions, threads=0):
+    """
+    Build one ffmpeg command that encodes every rendition of a clip.
+
+    The source is decoded once and encoded into one MP4 per rendition, with the
+    same settings as the MediaConvert jobs: H.264 Main with a quality target
+    capped at the rendition's maximum bitrate, a keyframe every 2 seconds, and
+    AAC stereo at 64 kbit/s and 48 kHz. Files are named like MediaConvert names
+    them ('<clip name><name modifier>.mp4').
+
+    Args:
+        input_path (str): The local path of the source clip.
+        output_dir (str): The local directory where the renditions are written.
+        clip_name (str): The clip's file name without extension.
+        renditions (list of dict): The renditions chosen by 'select_renditions'.
+        threads (int, optional): The encoder threads per rendition; 0 lets ffmpeg decide.
+
+    Returns:
+        list of str: The ffmpeg command line.
+    """
+    # QVBR levels 1-10 map onto x264 CRF 47-11; level 7 (the default) is CRF 23
+    crf = 51 - 4 * QVBR_QUALITY_LEVEL
+
+    command = [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", "-i", input_path]
+    for rendition in renditions:
+        command += [
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-c:v", "libx264", "-profile:v", "main", "-crf", str(crf),
+            "-maxrate", str(rendition["max_bitrate"]), "-bufsize", str(2 * rendition["max_bitrate"]),
+            "-force_key_frames", "expr:gte(t,n_forced*2)",
+            "-threads", str(threads)
+        ]
+        if rendition["height"]:
+            command += ["-vf", f"scale={rendition['width']}:{rendition['height']}"]
+        command += [
+            "-c:a", "aac", "-b:a", "64k", "-ac", "2", "-ar", "48000",
+            "-movflags", "+faststart",
+            os.path.join(output_dir, f"{clip_name}{rendition['name_modifier']}.mp4")
+        ]
+    return command
+
+def transcode_clip(key, threads=0):
+    """
+    Transcode one clip from S3 with ffmpeg and upload its renditions.
+
+    This runs in a worker process: it downloads the clip, encodes every rendition
+    in a single ffmpeg run and uploads the results to the clip's folder under
+    PROCESSED_PREFIX, exactly where MediaConvert would write them.
+
+    Args:
+        key (str): The S3 key of the source clip.
+        threads (int, optional): The encoder threads per rendition; 0 lets ffmpeg decide.
+
+    Returns:
+        dict: The uploaded output 'keys' and the job's 'StartTime' and 'FinishTime'.
+
+    Raises:
+        RuntimeError: If ffmpeg fails.
+    """
+    start = datetime.now(timezone.utc)
+    s3 = get_s3_client()
+
+    # Pick the renditions the same way as for MediaConvert
+    renditions = select_renditions(probe_clip(s3, key))
+    clip_name = posixpath.splitext(posixpath.basename(key))[0]
+    output_prefix = output_prefix_for(key)
+
+    with tempfile.TemporaryDirectory(prefix="transcode-") as workdir:
+        input_path = os.path.join(workdir, posixpath.basename(key))
+        output_dir = os.path.join(workdir, "out")
+        os.makedirs(output_dir)
+
+        s3.download_file(S3_BUCKET_NAME, key, input_path)
+
+        result = subprocess.run(ffmpeg_command(input_path, output_dir, clip_name, renditions, threads),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with status {result.returncode}: {result.stderr.strip()[-500:]}")
+
+        keys = []
+        for name in sorted(os.listdir(output_dir)):
+            output_key = f"{output_prefix}{name}"
+            s3.upload_file(os.path.join(output_dir, name), S3_BUCKET_NAME, output_key,
+                           ExtraArgs={"ContentType": "video/mp4"})
+            keys.append(output_key)
+
+    return {"keys": keys, "StartTime": start, "FinishTime": datetime.now(timezone.utc)}
+
+class FfmpegTranscoder:
+    """
+    Transcodes clips locally with ffmpeg, several at a time in worker processes.
+
+    It implements the same interface as 'MediaConvertTranscoder' and reports
+    MediaConvert-style job descriptions, so run summaries and run reports look
+    the same whichever backend did the work. Workers are started with a clean
+    interpreter ('spawn'), so no boto3 client is shared across processes.
+    """
+
+    name = "ffmpeg"
+    resumable = False
+
+    def __init__(self, max_workers=TRANSCODE_WORKERS):
+        if shutil.which(FFMPEG_PATH) is None:
+            raise RuntimeError(f"ffmpeg executable '{FFMPEG_PATH}' not found")
+
+        # One clip per CPU by default; split the CPUs between the encoders otherwise
+        cpus = available_cpus()
+        max_workers = max_workers or cpus
+        self.threads = max(1, cpus // max_workers)
+        self.executor = ProcessPoolExecutor(max_workers=max_workers,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        self.jobs = {}
+        self._ids = itertools.count(1)
+
+    def submit(self, key):
+        job_id = f"ffmpeg-{next(self._ids)}"
+        self.jobs[job_id] = (self.executor.submit(transcode_clip, key, self.threads),
+                             datetime.now(timezone.utc))
+        return job_id
+
+    def wait(self, job_ids, timeout=JOB_POLL_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        jobs = {}
+        for job_id in job_ids:
+            future, submitted = self.jobs[job_id]
+            job = {"Id": job_id, "Timing": {"SubmitTime": submitted}}
+            try:
+                result = future.result(timeout=max(0, deadline - time.monotonic()))
+                job["Status"] = "COMPLETE"
+                job["Timing"].update(StartTime=result["StartTime"], FinishTime=result["FinishTime"])
+            except FutureTimeoutError:
+                print(f"Timed out waiting for ffmpeg job {job_id}.")
+                job["Status"] = "PROGRESSING"
+            except Exception as e:
+                job["Status"] = "ERROR"
+                job["ErrorMessage"] = str(e)
+            jobs[job_id] = job
+        return jobs
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def get_transcoder(s3=None, mediaconvert=None):
+    """
+    Return the transcoder selected by TRANSCODER_BACKEND.
+
+    Args:
+        s3 (optional): The S3 client used by the MediaConvert backend. Defaults to the shared S3 client.
+        mediaconvert (optional): The MediaConvert client to use. Defaults to the shared client.
+    """
+    if TRANSCODER_BACKEND == "ffmpeg":
+        return FfmpegTranscoder()
+    return MediaConvertTranscoder(mediaconvert, s3)
+
+def transcode_all(s3=None):
+    """
+    Transcode every changed clip with the configured backend and wait for the results.
+
+    Returns:
+        dict or None: See 'mediaconvert_process.create_job'.
+    """
+    try:
+        transcoder = get_transcoder(s3)
+    except Exception as e:
+        print(f"Error starting {TRANSCODER_BACKEND} transcoder: {e}")
+        return None
+    return create_job(s3=s3, transcoder=transcoder)
+
+# Check if this script is being run as the main program
+# If so, transcode every clip and exit with a non-zero status on failure
+if __name__ == "__main__":
+    sys.exit(0 if transcode_all() is not None else 1)